@@ -0,0 +1,94 @@
+import hashlib
+import marshal
+import os
+import pickle
+import sys
+from types import CodeType
+
+from . import __version__
+from .parser.stmt.stmt import Stmt
+
+# like __pycache__, next to the script
+CACHE_DIR = "__hiemcache__"
+MAGIC = b"HIEM"
+
+# bump whenever the shape of the AST changes
+FORMAT = 10
+
+# bump whenever the code the transpiler generates changes
+CODE_FORMAT = 1
+
+VERSION = f"{__version__}-{FORMAT}-{sys.implementation.cache_tag}".encode()
+CODE_VERSION = f"{__version__}-{CODE_FORMAT}-{sys.implementation.cache_tag}".encode()
+
+
+def cache_path(path: str, suffix: str = "ast") -> str:
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(
+        directory, CACHE_DIR, f"{name}.{sys.implementation.cache_tag}.{suffix}"
+    )
+
+
+def code_path(path: str, level: int) -> str:
+    # named as CPython names its own, one file per optimization level
+    return cache_path(path, f"opt-{level}.pyc" if level else "pyc")
+
+
+def header(source: str, version: bytes = VERSION) -> bytes:
+    digest = hashlib.sha256(source.encode("utf-8")).digest()
+    return MAGIC + bytes([len(version)]) + version + digest
+
+
+def load(path: str, source: str) -> list[Stmt] | None:
+    """Parsed statements cached for this exact source, if any"""
+    expected = header(source)
+    try:
+        with open(cache_path(path), "rb") as file:
+            if file.read(len(expected)) != expected:
+                return None
+            return pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+
+
+def save(path: str, source: str, statements: list[Stmt]):
+    """Cache parsed statements, silently giving up when that's not possible"""
+    try:
+        data = pickle.dumps(statements, pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, RecursionError):
+        return
+    write(cache_path(path), header(source), data)
+
+
+def load_code(path: str, source: str, level: int) -> CodeType | None:
+    """Code transpiled at this level for this exact source, if any"""
+    expected = header(source, CODE_VERSION)
+    try:
+        with open(code_path(path, level), "rb") as file:
+            if file.read(len(expected)) != expected:
+                return None
+            code = marshal.load(file)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    return code if isinstance(code, CodeType) else None
+
+
+def save_code(path: str, source: str, level: int, code: CodeType):
+    """Cache transpiled code, silently giving up when that's not possible"""
+    write(code_path(path, level), header(source, CODE_VERSION), marshal.dumps(code))
+
+
+def write(target: str, head: bytes, data: bytes):
+    # written whole or not at all, even with other runs writing it too
+    temporary = f"{target}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(temporary, "wb") as file:
+            file.write(head)
+            file.write(data)
+        os.replace(temporary, target)
+    except OSError:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
@@ -0,0 +1,659 @@
+from typing import Callable
+
+from .interpreter import (
+    Interpreter,
+    InterpreterError,
+    BREAK,
+    CONTINUE,
+    RETURN,
+    TAIL_CALL,
+    depth_limit,
+    number_operators,
+)
+from .parser.expr.visitor import VisitorExpr
+from .parser.expr.expr import (
+    Expr,
+    BinaryExpr,
+    UnaryExpr,
+    LiteralExpr,
+    GroupingExpr,
+    VariableExpr,
+    AssignExpr,
+    LogicalExpr,
+    CallExpr,
+    InvariantExpr,
+    InlineExpr,
+    NumberBinaryExpr,
+    NumberUnaryExpr,
+)
+from .parser.stmt.visitor import VisitorStmt
+from .parser.stmt.stmt import (
+    Stmt,
+    PrintStmt,
+    ExprStmt,
+    VarStmt,
+    BlockStmt,
+    IfStmt,
+    WhileStmt,
+    ForStmt,
+    RangeStmt,
+    FuncStmt,
+    ReturnStmt,
+    BreakStmt,
+    ContinueStmt,
+)
+from .parser.stmt.environment import Cell, Environment
+from .parser.stmt.callable import HiEmFunction
+from .parser.node_kind import NodeKind, dispatch_table
+from .scanner.token import Token
+from .scanner.token_type import TokenType
+
+LITERAL = NodeKind.LITERAL.value
+CALL = NodeKind.CALL.value
+
+# a compiled node takes the innermost local scope, None at the top level:
+# an expression returns its value, a statement what `Interpreter.execute`
+# returns for it
+Code = Callable[[Environment | None], object]
+
+# operators of NumberBinaryExpr, over two compiled operands or a compiled
+# one and a constant
+number_code = {
+    TokenType.PLUS: lambda left, right: lambda env: left(env) + right(env),
+    TokenType.MINUS: lambda left, right: lambda env: left(env) - right(env),
+    TokenType.STAR: lambda left, right: lambda env: left(env) * right(env),
+    TokenType.SLASH: lambda left, right: lambda env: left(env) / right(env),
+    TokenType.GREATER: lambda left, right: lambda env: left(env) > right(env),
+    TokenType.GREATER_EQUAL: lambda left, right: lambda env: left(env) >= right(env),
+    TokenType.LESS: lambda left, right: lambda env: left(env) < right(env),
+    TokenType.LESS_EQUAL: lambda left, right: lambda env: left(env) <= right(env),
+}
+number_constant_code = {
+    TokenType.PLUS: lambda left, right: lambda env: left(env) + right,
+    TokenType.MINUS: lambda left, right: lambda env: left(env) - right,
+    TokenType.STAR: lambda left, right: lambda env: left(env) * right,
+    TokenType.SLASH: lambda left, right: lambda env: left(env) / right,
+    TokenType.GREATER: lambda left, right: lambda env: left(env) > right,
+    TokenType.GREATER_EQUAL: lambda left, right: lambda env: left(env) >= right,
+    TokenType.LESS: lambda left, right: lambda env: left(env) < right,
+    TokenType.LESS_EQUAL: lambda left, right: lambda env: left(env) <= right,
+}
+
+
+class ClosureCompiler(VisitorExpr, VisitorStmt):
+    """Compiles resolved nodes into Python closures that run them.
+
+    Each node becomes one closure over the closures of its children, chosen
+    for its operator, the shape of its operands and where its variable is
+    when it's compiled, so running it is a chain of direct calls. Values,
+    errors and the order things happen in are those of the interpreter it
+    compiles for: its globals, upvalues and runtime errors are used, and
+    expressions nested deeper than `depth_limit` are left to its visit
+    methods, as are the bodies of functions, compiled on their first call.
+    """
+
+    def __init__(self, interpreter: Interpreter) -> None:
+        self.interpreter = interpreter
+        self.depth = 0
+        self.dispatch = dispatch_table(self)
+
+    def expression(self, expr: Expr) -> Code:
+        if self.depth >= depth_limit:
+            return self.deep(expr)
+        self.depth += 1
+        try:
+            return self.dispatch[expr.kind](expr)
+        finally:
+            self.depth -= 1
+
+    def deep(self, expr: Expr) -> Code:
+        interpreter = self.interpreter
+
+        def deep(env):
+            previous = interpreter.env
+            interpreter.env = env
+            try:
+                return interpreter.evaluate(expr)
+            finally:
+                interpreter.env = previous
+
+        return deep
+
+    def statement(self, stmt: Stmt) -> Code:
+        return self.dispatch[stmt.kind](stmt)
+
+    def sequence(self, statements: list[Stmt]) -> Code:
+        codes = [self.statement(statement) for statement in statements]
+        if not codes:
+            return lambda env: None
+        if len(codes) == 1:
+            return codes[0]
+
+        def sequence(env):
+            for code in codes:
+                status = code(env)
+                if status is not None:
+                    return status
+            return None
+
+        return sequence
+
+    def values(self, exprs: list[Expr]) -> Callable[[Environment | None], list]:
+        codes = [self.expression(expr) for expr in exprs]
+        if not codes:
+            return lambda env: []
+        if len(codes) == 1:
+            first = codes[0]
+            return lambda env: [first(env)]
+        if len(codes) == 2:
+            first, second = codes
+            return lambda env: [first(env), second(env)]
+        return lambda env: [code(env) for code in codes]
+
+    # --------------------
+    # Expression
+    # --------------------
+
+    def visit_literal(self, expr: LiteralExpr):
+        value = expr.literal
+        return lambda env: value
+
+    def visit_grouping(self, expr: GroupingExpr):
+        return self.expression(expr.expr)
+
+    def visit_unary(self, expr: UnaryExpr):
+        operand = self.expression(expr.expr)
+        op, unary = expr.op, self.interpreter.unary
+
+        if op.type == TokenType.MINUS:
+
+            def negate(env):
+                value = operand(env)
+                if type(value) is float:
+                    return -value
+                return unary(op, value)
+
+            return negate
+
+        # truthy as `Interpreter.truthy`
+        def bang(env):
+            value = operand(env)
+            return value is None or value is False
+
+        return bang
+
+    visit_float_unary = visit_unary
+
+    def visit_number_unary(self, expr: NumberUnaryExpr):
+        operand = self.expression(expr.expr)
+        return lambda env: -operand(env)
+
+    def visit_binary(self, expr: BinaryExpr):
+        left, right = self.expression(expr.left), self.expression(expr.right)
+        op, binary = expr.op, self.interpreter.binary
+
+        if op.type == TokenType.EQUAL_EQUAL:
+            return lambda env: left(env) == right(env)
+        if op.type == TokenType.BANG_EQUAL:
+            return lambda env: not left(env) == right(env)
+
+        # numbers first, anything else checked and computed as the
+        # interpreter does
+        function = number_operators[op.type]
+
+        def arithmetic(env):
+            a = left(env)
+            b = right(env)
+            if type(a) is float and type(b) is float:
+                return function(a, b)
+            return binary(op, a, b)
+
+        return arithmetic
+
+    # nodes the interpreter specialized while it ran them compile as they
+    # were before
+    visit_float_binary = visit_string_binary = visit_binary
+
+    def visit_number_binary(self, expr: NumberBinaryExpr):
+        left = self.expression(expr.left)
+        if expr.right.kind == LITERAL:
+            return number_constant_code[expr.op.type](left, expr.right.literal)
+        return number_code[expr.op.type](left, self.expression(expr.right))
+
+    def visit_logical(self, expr: LogicalExpr):
+        left, right = self.expression(expr.left), self.expression(expr.right)
+
+        if expr.op.type == TokenType.OR:
+
+            def either(env):
+                value = left(env)
+                if value is not None and value is not False:
+                    return value
+                return right(env)
+
+            return either
+
+        def both(env):
+            value = left(env)
+            if value is None or value is False:
+                return value
+            return right(env)
+
+        return both
+
+    def visit_varexpr(self, expr: VariableExpr):
+        depth, slot = expr.depth, expr.slot
+        if depth == -1:
+            return self.global_load(expr.name)
+        if depth == -2:
+            interpreter = self.interpreter
+            return lambda env: interpreter.upvalues[slot].value
+
+        if expr.boxed:
+            if depth == 0:
+                return lambda env: env.values[slot].value
+            return lambda env: env.ancestor(depth).values[slot].value
+        if depth == 0:
+            return lambda env: env.values[slot]
+        if depth == 1:
+            return lambda env: env.enclosing.values[slot]
+        return lambda env: env.ancestor(depth).values[slot]
+
+    visit_local_varexpr = visit_global_varexpr = visit_varexpr
+
+    def visit_assignexpr(self, expr: AssignExpr):
+        value = self.expression(expr.value)
+        depth, slot = expr.depth, expr.slot
+        if depth == -1:
+            return self.global_store(expr.name, value)
+
+        if depth == -2:
+            interpreter = self.interpreter
+
+            def upvalue(env):
+                result = interpreter.upvalues[slot].value = value(env)
+                return result
+
+            return upvalue
+
+        if expr.boxed:
+
+            def boxed(env):
+                result = env.ancestor(depth).values[slot].value = value(env)
+                return result
+
+            return boxed
+
+        if depth == 0:
+
+            def local(env):
+                result = env.values[slot] = value(env)
+                return result
+
+            return local
+
+        def enclosing(env):
+            result = env.ancestor(depth).values[slot] = value(env)
+            return result
+
+        return enclosing
+
+    def global_load(self, name: Token) -> Code:
+        # the global's cell, valid while the version stays the same
+        globals_ = self.interpreter.globals
+        cell, version = None, -1
+
+        def load(env):
+            nonlocal cell, version
+            if version != globals_.version:
+                cell, version = globals_.cell(name), globals_.version
+            return cell.value
+
+        return load
+
+    def global_store(self, name: Token, value: Code) -> Code:
+        globals_ = self.interpreter.globals
+        cell, version = None, -1
+
+        def store(env):
+            nonlocal cell, version
+            result = value(env)
+            if version != globals_.version:
+                cell, version = globals_.cell(name), globals_.version
+            cell.value = result
+            return result
+
+        return store
+
+    def visit_invariant(self, expr: InvariantExpr):
+        # the loops reset the node as they do for the interpreter
+        code = self.expression(expr.expr)
+
+        def invariant(env):
+            if not expr.evaluated:
+                expr.value = code(env)
+                expr.evaluated = True
+            return expr.value
+
+        return invariant
+
+    def visit_inline(self, expr: InlineExpr):
+        arguments = self.values(expr.arguments)
+        body = self.expression(expr.expr)
+
+        def inline(env):
+            scope = Environment()
+            scope.values = arguments(env)
+            return body(scope)
+
+        return inline
+
+    def visit_call(self, expr: CallExpr):
+        calle = self.expression(expr.calle)
+        arguments = self.values(expr.arguments)
+        interpreter = self.interpreter
+        count = len(expr.arguments)
+
+        def call(env):
+            function = calle(env)
+            values = arguments(env)
+            if (
+                type(function) is HiEmFunction
+                and len(function.declaration.params) == count
+            ):
+                return function.call(interpreter, values)
+            # anything else is checked by the interpreter
+            return interpreter.call(expr, function, values)
+
+        return call
+
+    visit_direct_call = visit_call
+
+    # --------------------
+    # Statement
+    # --------------------
+
+    def visit_print(self, stmt: PrintStmt):
+        value = self.expression(stmt.expr)
+
+        def print_(env):
+            print(value(env))
+
+        return print_
+
+    def visit_expression(self, stmt: ExprStmt):
+        value = self.expression(stmt.expr)
+
+        def expression(env):
+            value(env)
+
+        return expression
+
+    def visit_varstmt(self, stmt: VarStmt):
+        if stmt.initializer is None:
+            value = lambda env: None
+        else:
+            value = self.expression(stmt.initializer)
+        slot = stmt.slot
+
+        if slot < 0:
+            globals_, name = self.interpreter.globals, stmt.name.lexeme
+
+            def define(env):
+                globals_.define(name, value(env))
+
+            return define
+
+        if stmt.boxed:
+
+            def boxed(env):
+                env.values[slot] = Cell(value(env))
+
+            return boxed
+
+        def local(env):
+            env.values[slot] = value(env)
+
+        return local
+
+    def visit_block(self, stmt: BlockStmt):
+        body, size = self.sequence(stmt.statements), stmt.size
+        if not size:
+            return body
+        return lambda env: body(Environment(env, size))
+
+    def visit_if(self, stmt: IfStmt):
+        condition = self.expression(stmt.condition)
+        then_branch = self.statement(stmt.then_branch)
+
+        if stmt.else_branch is None:
+
+            def if_(env):
+                value = condition(env)
+                if value is not None and value is not False:
+                    return then_branch(env)
+                return None
+
+            return if_
+
+        else_branch = self.statement(stmt.else_branch)
+
+        def if_else(env):
+            value = condition(env)
+            if value is not None and value is not False:
+                return then_branch(env)
+            return else_branch(env)
+
+        return if_else
+
+    def visit_while(self, stmt: WhileStmt):
+        condition, body = self.expression(stmt.condition), self.statement(stmt.body)
+        invariants = stmt.invariants
+
+        def while_(env):
+            for invariant in invariants:
+                invariant.evaluated = False
+            while True:
+                value = condition(env)
+                if value is None or value is False:
+                    return None
+                status = body(env)
+                if status is not None and status != CONTINUE:
+                    return None if status == BREAK else status
+
+        return while_
+
+    def visit_for(self, stmt: ForStmt):
+        initializer = None
+        if stmt.initializer is not None:
+            initializer = self.statement(stmt.initializer)
+        condition, body = self.expression(stmt.condition), self.statement(stmt.body)
+        increment = None
+        if stmt.increment is not None:
+            increment = self.expression(stmt.increment)
+        size, step, invariants = stmt.size, stmt.step, stmt.invariants
+
+        if step is not None:
+            # counted as `Interpreter.count` does
+            slot = stmt.initializer.slot
+            bound = self.expression(stmt.condition.right)
+            compare = number_operators[stmt.condition.op.type]
+
+        def for_(env):
+            for invariant in invariants:
+                invariant.evaluated = False
+            if size:
+                env = Environment(env, size)
+            if initializer is not None:
+                initializer(env)
+
+            if step is not None:
+                values = env.values
+                counter, limit = values[slot], bound(env)
+                if type(counter) is float and type(limit) is float:
+                    while compare(counter, limit):
+                        status = body(env)
+                        if status is not None and status != CONTINUE:
+                            return None if status == BREAK else status
+                        counter += step
+                        values[slot] = counter
+                    return None
+
+            while True:
+                value = condition(env)
+                if value is None or value is False:
+                    return None
+                status = body(env)
+                if status is not None and status != CONTINUE:
+                    return None if status == BREAK else status
+                if increment is not None:
+                    increment(env)
+
+        return for_
+
+    def visit_range(self, stmt: RangeStmt):
+        start, stop = self.expression(stmt.start), self.expression(stmt.stop)
+        step = None if stmt.step is None else self.expression(stmt.step)
+        body, boxed, invariants = self.statement(stmt.body), stmt.boxed, stmt.invariants
+        interpreter, keyword = self.interpreter, stmt.keyword
+
+        def range_(env):
+            for invariant in invariants:
+                invariant.evaluated = False
+
+            first, last = start(env), stop(env)
+            by = 1.0 if step is None else step(env)
+            interpreter.check_number(keyword, first, last, by)
+            if by == 0:
+                raise InterpreterError("Range step must not be zero.", keyword)
+
+            scope = Environment(env, 1)
+            values = scope.values
+            counter = first
+            if by > 0:
+                while counter < last:
+                    values[0] = Cell(counter) if boxed else counter
+                    status = body(scope)
+                    if status is not None and status != CONTINUE:
+                        return None if status == BREAK else status
+                    counter += by
+            else:
+                while counter > last:
+                    values[0] = Cell(counter) if boxed else counter
+                    status = body(scope)
+                    if status is not None and status != CONTINUE:
+                        return None if status == BREAK else status
+                    counter += by
+            return None
+
+        return range_
+
+    def visit_function(self, stmt: FuncStmt):
+        interpreter, slot, name = self.interpreter, stmt.slot, stmt.name.lexeme
+
+        def capture(env) -> list[Cell]:
+            # as `Interpreter.capture`, from the scope given
+            cells = []
+            for local, depth, index in stmt.upvalues:
+                if local:
+                    cells.append(env.ancestor(depth).values[index])
+                else:
+                    cells.append(interpreter.upvalues[index])
+            return cells
+
+        if slot < 0:
+            globals_ = interpreter.globals
+
+            def define(env):
+                globals_.define(name, HiEmFunction(stmt, capture(env)))
+
+            return define
+
+        if stmt.boxed:
+
+            def boxed(env):
+                # the function may capture itself, its cell is in place first
+                cell = env.values[slot] = Cell()
+                cell.value = HiEmFunction(stmt, capture(env))
+
+            return boxed
+
+        def local(env):
+            env.values[slot] = HiEmFunction(stmt, capture(env))
+
+        return local
+
+    def visit_return(self, stmt: ReturnStmt):
+        interpreter = self.interpreter
+        if stmt.value is None:
+
+            def return_nil(env):
+                interpreter.returned = None
+                return RETURN
+
+            return return_nil
+
+        if stmt.value.kind == CALL:
+            return self.tail(stmt.value)
+
+        value = self.expression(stmt.value)
+
+        def return_(env):
+            interpreter.returned = value(env)
+            return RETURN
+
+        return return_
+
+    def tail(self, expr: CallExpr) -> Code:
+        # as `Interpreter.tail`, the call is made by the caller's call
+        calle = self.expression(expr.calle)
+        arguments = self.values(expr.arguments)
+        interpreter = self.interpreter
+        count = len(expr.arguments)
+
+        def tail_call(env):
+            function = calle(env)
+            values = arguments(env)
+            if (
+                type(function) is HiEmFunction
+                and len(function.declaration.params) == count
+            ):
+                interpreter.tail_call = (function, values)
+                return TAIL_CALL
+            interpreter.returned = interpreter.call(expr, function, values)
+            return RETURN
+
+        return tail_call
+
+    def visit_break(self, stmt: BreakStmt):
+        return lambda env: BREAK
+
+    def visit_continue(self, stmt: ContinueStmt):
+        return lambda env: CONTINUE
+
+
+class ClosureInterpreter(Interpreter):
+    """Interpreter running programs compiled by `ClosureCompiler`, its
+    visit methods only evaluate what is too deep to compile"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.compiler = ClosureCompiler(self)
+        # function -> its compiled body, shared by all its closures
+        self.bodies: dict[FuncStmt, Code] = {}
+
+    def interpret(self, statements: list[Stmt]):
+        try:
+            status = self.compiler.sequence(statements)(None)
+            if status is not None:
+                self.leave(status)
+        except InterpreterError as err:
+            from .hi_em import HiEm
+
+            HiEm.error_runtime(err)
+
+    def execute_body(self, declaration: FuncStmt, env: Environment) -> int | None:
+        body = self.bodies.get(declaration)
+        if body is None:
+            body = self.bodies[declaration] = self.compiler.sequence(declaration.body)
+        return body(env)
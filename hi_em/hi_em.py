@@ -1,10 +1,31 @@
 import sys
+from typing import TextIO
 
+from . import cache
+from .scanner.token import Token
 from .scanner.token_type import TokenType
 from .scanner.scanner import Scanner
+from .scanner.stream import StreamScanner, TokenStream
 from .parser.parser import Parser
+from .parser.hashcons import hash_cons
 from .parser.ast_printer import ASTPrinter
+from .parser.stmt.stmt import Stmt
 from .interpreter import Interpreter
+from .closures import ClosureInterpreter
+from .vm.vm import VM
+from .transpiler import PythonInterpreter
+from .resolver import resolve
+from .optimizer import optimize
+from .inference import infer
+
+# what runs the resolved tree: `tree` walks it, `closure` compiles it into
+# Python closures first, `vm` into bytecode and `python` into Python code
+engines = {
+    "tree": Interpreter,
+    "closure": ClosureInterpreter,
+    "vm": VM,
+    "python": PythonInterpreter,
+}
 
 
 class HiEm:
@@ -18,23 +39,77 @@ class HiEm:
             return data
 
     @staticmethod
-    def run(source: str):
+    def run(source: str, lazy: bool = False, level: int = 0, engine: str = "tree"):
         scanner = Scanner(source)
-        parser = Parser(scanner.tokens)
-        statements = parser.parse()
-        interpreter = Interpreter()
+        HiEm.run_tokens(scanner.tokens, lazy, level, engine)
+
+    @staticmethod
+    def run_stream(
+        stream: TextIO, lazy: bool = False, level: int = 0, engine: str = "tree"
+    ):
+        # tokens are pulled by the parser as it goes, never all held at once
+        HiEm.run_tokens(TokenStream(StreamScanner(stream)), lazy, level, engine)
+
+    @staticmethod
+    def run_tokens(
+        tokens: list[Token] | TokenStream,
+        lazy: bool = False,
+        level: int = 0,
+        engine: str = "tree",
+    ):
+        parser = Parser(tokens, lazy)
+        statements = hash_cons(parser.parse())
+        HiEm.run_statements(statements, level, engine)
+
+    @staticmethod
+    def run_statements(
+        statements: list[Stmt],
+        level: int = 0,
+        engine: str = "tree",
+        script: tuple[str, str] | None = None,
+    ):
+        interpreter = engines[engine]()
+        if script is not None and isinstance(interpreter, PythonInterpreter):
+            # the path and source of the file, its code is cached next to it
+            interpreter.script = (*script, level)
 
         if HiEm.had_error:
             return
         if HiEm.had_runtime_error:
             return
 
+        # the cache keeps the tree as parsed, whatever the level
+        statements = optimize(statements, level)
+        resolve(statements)
+        if level > 0:
+            infer(statements)
         interpreter.interpret(statements)
 
     @staticmethod
-    def run_file(path: str):
-        source = HiEm.read_file(path)
-        HiEm.run(source)
+    def run_file(
+        path: str,
+        stream: bool = False,
+        use_cache: bool = True,
+        lazy: bool = False,
+        level: int = 0,
+        engine: str = "tree",
+    ):
+        if stream:
+            if path == "-":
+                HiEm.run_stream(sys.stdin, lazy, level, engine)
+            else:
+                with open(path, encoding="utf-8") as file:
+                    HiEm.run_stream(file, lazy, level, engine)
+        else:
+            source = HiEm.read_file(path)
+            statements = cache.load(path, source) if use_cache else None
+            if statements is None:
+                statements = hash_cons(Parser(Scanner(source).tokens, lazy).parse())
+                # errors in lazily parsed bodies aren't known yet
+                if use_cache and not lazy and not HiEm.had_error:
+                    cache.save(path, source, statements)
+            script = (path, source) if use_cache else None
+            HiEm.run_statements(statements, level, engine, script)
         if HiEm.had_error:
             sys.exit(65)
         if HiEm.had_runtime_error:
@@ -0,0 +1,327 @@
+from typing import Callable
+
+from .parser.expr.expr import (
+    Expr,
+    BinaryExpr,
+    UnaryExpr,
+    NumberBinaryExpr,
+    NumberUnaryExpr,
+    VariableExpr,
+)
+from .parser.node_kind import NodeKind
+from .parser.stmt.visitor import VisitorStmt
+from .parser.stmt.stmt import (
+    Stmt,
+    PrintStmt,
+    ExprStmt,
+    VarStmt,
+    BlockStmt,
+    IfStmt,
+    WhileStmt,
+    ForStmt,
+    RangeStmt,
+    FuncStmt,
+    ReturnStmt,
+    BreakStmt,
+    ContinueStmt,
+)
+from .parser.traversal import children, postorder
+from .scanner.token_type import TokenType
+
+BINARY = NodeKind.BINARY.value
+UNARY = NodeKind.UNARY.value
+GROUPING = NodeKind.GROUPING.value
+LITERAL = NodeKind.LITERAL.value
+VAREXPR = NodeKind.VAREXPR.value
+ASSIGNEXPR = NodeKind.ASSIGNEXPR.value
+LOGICAL = NodeKind.LOGICAL.value
+CALL = NodeKind.CALL.value
+INVARIANT = NodeKind.INVARIANT.value
+INLINE = NodeKind.INLINE.value
+NUMBER_BINARY = NodeKind.NUMBER_BINARY.value
+NUMBER_UNARY = NodeKind.NUMBER_UNARY.value
+
+# operators checking that their operands are numbers, with the type of
+# their value when they don't raise
+NUMBER = {
+    TokenType.MINUS: float,
+    TokenType.STAR: float,
+    TokenType.SLASH: float,
+    TokenType.GREATER: bool,
+    TokenType.GREATER_EQUAL: bool,
+    TokenType.LESS: bool,
+    TokenType.LESS_EQUAL: bool,
+}
+
+# the type of a value, None when it isn't known
+Type = type | None
+
+# types of the locals of each scope of the function analysed, innermost
+# last, and of the globals known since the last call
+State = tuple[list[list[Type]], dict[str, Type]]
+
+
+def infer(statements: list[Stmt]):
+    Inference().resolve(statements)
+
+
+class Inference(VisitorStmt):
+    """Finds the operators whose operands are numbers whenever they run and
+    turns them into their check-free variant, the others back into the
+    generic one. Runs on resolved statements.
+
+    Types flow through the statements in the order they run: a variable
+    has the type of the last value stored into it, the join of the types
+    of the branches that reach a point, and loops are analysed until the
+    types at their start stop changing, the last pass deciding: a `tiếp`
+    reaches the end of the round and a `dừng` the end of the loop. Locals
+    of the function are tracked by slot, those captured by closures are
+    unknown. Globals are tracked by name until the next call, which may
+    change them.
+    """
+
+    def __init__(self) -> None:
+        self.scopes: list[list[Type]] = []
+        self.globals: dict[str, Type] = {}
+        # states at the `dừng` and `tiếp` of the innermost loop
+        self.breaks: list[State] = []
+        self.continues: list[State] = []
+
+    def resolve(self, statements: list[Stmt]):
+        for statement in statements:
+            # statements that failed to parse are None
+            if statement is not None:
+                statement.accept(self)
+
+    # --------------------
+    # State
+    # --------------------
+
+    def state(self) -> State:
+        return [list(scope) for scope in self.scopes], dict(self.globals)
+
+    def restore(self, state: State):
+        self.scopes, self.globals = state
+
+    def join(self, state: State):
+        # what's known either way
+        for scope, other in zip(self.scopes, state[0]):
+            for slot, type_ in enumerate(other):
+                if scope[slot] is not type_:
+                    scope[slot] = None
+        self.globals = {
+            name: type_
+            for name, type_ in self.globals.items()
+            if type_ is not None and state[1].get(name) is type_
+        }
+
+    def load(self, expr: VariableExpr) -> Type:
+        if expr.depth == -1:
+            return self.globals.get(expr.name.lexeme)
+        if expr.depth < 0 or expr.boxed:
+            # upvalues and captured locals are shared with other functions
+            return None
+        return self.scopes[-1 - expr.depth][expr.slot]
+
+    def store(self, depth: int, slot: int, name: str, type_: Type):
+        if depth == -1:
+            self.globals[name] = type_
+        elif depth >= 0:
+            self.scopes[-1 - depth][slot] = type_
+
+    # --------------------
+    # Expressions
+    # --------------------
+
+    def expression(self, expr: Expr | None) -> Type:
+        if expr is None:
+            return type(None)
+
+        # assignments in the right operand of a logical may not happen
+        maybe = set()
+        stack = [(expr, False)]
+        while stack:
+            node, conditional = stack.pop()
+            if node.kind == ASSIGNEXPR and conditional:
+                maybe.add(id(node))
+            if node.kind == LOGICAL:
+                stack += ((node.left, conditional), (node.right, True))
+            else:
+                stack.extend((child, conditional) for child in children(node))
+
+        types: dict[int, Type] = {}
+        for node in postorder(expr):
+            kind = node.kind
+            if kind == LITERAL:
+                type_ = type(node.literal)
+            elif kind == VAREXPR:
+                type_ = self.load(node)
+            elif kind == GROUPING or kind == INVARIANT:
+                type_ = types[id(node.expr)]
+            elif kind == UNARY or kind == NUMBER_UNARY:
+                type_ = self.unary(node, types[id(node.expr)])
+            elif kind == BINARY or kind == NUMBER_BINARY:
+                type_ = self.binary(node, types[id(node.left)], types[id(node.right)])
+            elif kind == LOGICAL:
+                type_ = types[id(node.left)]
+                if type_ is not types[id(node.right)]:
+                    type_ = None
+            elif kind == ASSIGNEXPR:
+                type_ = types[id(node.value)]
+                stored = type_
+                if id(node) in maybe and self.load(node) is not type_:
+                    stored = None
+                self.store(node.depth, node.slot, node.name.lexeme, stored)
+            else:
+                # calls, inlined or not, may change any global
+                self.globals.clear()
+                type_ = None
+            types[id(node)] = type_
+        return types[id(expr)]
+
+    def unary(self, expr: UnaryExpr, operand: Type) -> Type:
+        if expr.op.type != TokenType.MINUS:
+            return bool
+        expr.__class__ = NumberUnaryExpr if operand is float else UnaryExpr
+        return float
+
+    def binary(self, expr: BinaryExpr, left: Type, right: Type) -> Type:
+        op = expr.op.type
+        numbers = left is float and right is float
+        if op in NUMBER:
+            expr.__class__ = NumberBinaryExpr if numbers else BinaryExpr
+            return NUMBER[op]
+        if op == TokenType.PLUS:
+            expr.__class__ = NumberBinaryExpr if numbers else BinaryExpr
+            # one operand decides the type of the other, or it raises
+            if float in (left, right):
+                return float
+            if str in (left, right):
+                return str
+            return None
+        return bool
+
+    # --------------------
+    # Statements
+    # --------------------
+
+    def visit_print(self, stmt: PrintStmt):
+        self.expression(stmt.expr)
+
+    def visit_expression(self, stmt: ExprStmt):
+        self.expression(stmt.expr)
+
+    def visit_varstmt(self, stmt: VarStmt):
+        type_ = self.expression(stmt.initializer)
+        if stmt.boxed:
+            type_ = None
+        self.store(-1 if stmt.slot < 0 else 0, stmt.slot, stmt.name.lexeme, type_)
+
+    def visit_block(self, stmt: BlockStmt):
+        if not stmt.size:
+            self.resolve(stmt.statements)
+            return
+
+        self.scopes.append([None] * stmt.size)
+        self.resolve(stmt.statements)
+        self.scopes.pop()
+
+    def visit_if(self, stmt: IfStmt):
+        self.expression(stmt.condition)
+        before = self.state()
+        stmt.then_branch.accept(self)
+        if stmt.else_branch is None:
+            self.join(before)
+            return
+
+        then = self.state()
+        self.restore(before)
+        stmt.else_branch.accept(self)
+        self.join(then)
+
+    def loop(self, iteration: Callable[[], None]) -> list[State]:
+        # until the types at the start of a round stop changing, the states
+        # at the `dừng` of the last pass are returned
+        outer = self.breaks, self.continues
+        start = self.state()
+        while True:
+            self.breaks, self.continues = [], []
+            iteration()
+            self.join(start)
+            if self.state() == start:
+                break
+            start = self.state()
+
+        breaks = self.breaks
+        self.breaks, self.continues = outer
+        return breaks
+
+    def body(self, stmt: Stmt):
+        stmt.accept(self)
+        for state in self.continues:
+            self.join(state)
+
+    def leave(self, breaks: list[State]):
+        for state in breaks:
+            self.join(state)
+
+    def visit_while(self, stmt: WhileStmt):
+        def iteration():
+            self.expression(stmt.condition)
+            self.body(stmt.body)
+
+        breaks = self.loop(iteration)
+        # the condition that ends the loop
+        self.expression(stmt.condition)
+        self.leave(breaks)
+
+    def visit_for(self, stmt: ForStmt):
+        def iteration():
+            self.expression(stmt.condition)
+            self.body(stmt.body)
+            self.expression(stmt.increment)
+
+        if stmt.size:
+            self.scopes.append([None] * stmt.size)
+        if stmt.initializer is not None:
+            stmt.initializer.accept(self)
+        breaks = self.loop(iteration)
+        self.expression(stmt.condition)
+        self.leave(breaks)
+        if stmt.size:
+            self.scopes.pop()
+
+    def visit_range(self, stmt: RangeStmt):
+        def iteration():
+            # each round starts with the next number
+            self.scopes[-1][0] = None if stmt.boxed else float
+            self.body(stmt.body)
+
+        self.expression(stmt.start)
+        self.expression(stmt.stop)
+        if stmt.step is not None:
+            self.expression(stmt.step)
+        self.scopes.append([None])
+        self.leave(self.loop(iteration))
+        self.scopes.pop()
+
+    def visit_function(self, stmt: FuncStmt):
+        self.store(-1 if stmt.slot < 0 else 0, stmt.slot, stmt.name.lexeme, None)
+        # a lazily parsed body is analysed once it's parsed and resolved
+        stmt.defer(self.function)
+
+    def function(self, stmt: FuncStmt):
+        # nothing is known of the arguments, or of globals
+        state = self.scopes, self.globals
+        self.scopes, self.globals = [[None] * stmt.size], {}
+        self.resolve(stmt.body)
+        self.scopes, self.globals = state
+
+    def visit_return(self, stmt: ReturnStmt):
+        self.expression(stmt.value)
+
+    def visit_break(self, stmt: BreakStmt):
+        self.breaks.append(self.state())
+
+    def visit_continue(self, stmt: ContinueStmt):
+        self.continues.append(self.state())
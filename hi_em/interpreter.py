@@ -1,3 +1,5 @@
+import operator
+
 from .scanner.token_type import TokenType
 from .scanner.token import Token
 from .parser.expr.visitor import VisitorExpr
@@ -11,6 +13,16 @@ from .parser.expr.expr import (
     AssignExpr,
     LogicalExpr,
     CallExpr,
+    InvariantExpr,
+    InlineExpr,
+    NumberBinaryExpr,
+    NumberUnaryExpr,
+    FloatBinaryExpr,
+    StringBinaryExpr,
+    FloatUnaryExpr,
+    LocalVariableExpr,
+    GlobalVariableExpr,
+    DirectCallExpr,
 )
 from .parser.stmt.visitor import VisitorStmt
 from .parser.stmt.stmt import (
@@ -21,12 +33,61 @@ from .parser.stmt.stmt import (
     BlockStmt,
     IfStmt,
     WhileStmt,
+    ForStmt,
+    RangeStmt,
     FuncStmt,
     ReturnStmt,
+    BreakStmt,
+    ContinueStmt,
 )
-from .parser.stmt.environment import Environment
+from .parser.stmt.environment import Cell, Environment, GlobalEnvironment
+from .parser.node_kind import NodeKind, dispatch_table
 from .parser.stmt.callable import HiEmCallable, HiEmFunction, ClockNative
 
+BINARY = NodeKind.BINARY.value
+UNARY = NodeKind.UNARY.value
+FLOAT_BINARY = NodeKind.FLOAT_BINARY.value
+STRING_BINARY = NodeKind.STRING_BINARY.value
+FLOAT_UNARY = NodeKind.FLOAT_UNARY.value
+GROUPING = NodeKind.GROUPING.value
+LOGICAL = NodeKind.LOGICAL.value
+CALL = NodeKind.CALL.value
+NUMBER_BINARY = NodeKind.NUMBER_BINARY.value
+NUMBER_UNARY = NodeKind.NUMBER_UNARY.value
+
+# kinds of the binary and unary operators, generic or specialized
+binary_kinds = (BINARY, NUMBER_BINARY, FLOAT_BINARY, STRING_BINARY)
+unary_kinds = (UNARY, NUMBER_UNARY, FLOAT_UNARY)
+
+# operators of NumberBinaryExpr, over floats
+number_operators = {
+    TokenType.PLUS: operator.add,
+    TokenType.MINUS: operator.sub,
+    TokenType.STAR: operator.mul,
+    TokenType.SLASH: operator.truediv,
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+    TokenType.LESS: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+}
+
+# what executing a statement returns when it leaves the enclosing loop's
+# round early or the function, statements that complete return None. A
+# function left with RETURN returns `Interpreter.returned`, one left with
+# TAIL_CALL what the call in `Interpreter.tail_call` returns
+BREAK = 1
+CONTINUE = 2
+RETURN = 3
+TAIL_CALL = 4
+
+# nesting of operators evaluated on the Python stack
+depth_limit = 100
+
+# evaluations of a node before it's specialized for what it evaluated to,
+# counted again from -backoff when it couldn't be or stopped being
+warmup = 8
+backoff = 64
+
 
 class InterpreterError(RuntimeError):
     """Runtime Error of Interpreter"""
@@ -36,23 +97,26 @@ class InterpreterError(RuntimeError):
         self.token = token
 
 
-class ReturnError(RuntimeError):
-    """Return Error"""
-
-    def __init__(self, value: object) -> None:
-        self.value = value
-
-
 class Interpreter(VisitorExpr, VisitorStmt):
     # --------------------
     # Expression
     # --------------------
     def __init__(self) -> None:
-        self.globals = Environment()
-        self.env = self.globals
+        self.globals = GlobalEnvironment()
+        # innermost local scope, None at the top level
+        self.env: Environment | None = None
+        # cells captured by the function running, empty at the top level
+        self.upvalues: list[Cell] = []
+        self.depth = 0
+        # what the function left last returns
+        self.returned: object = None
+        self.tail_call: tuple[HiEmFunction, list[object]] | None = None
 
         self.globals.define("đồng_hồ", ClockNative())
 
+        # node kind -> visit method, nodes are dispatched on their tag
+        self.dispatch = dispatch_table(self)
+
     def interpret(self, expr: Expr):
         try:
             value = self.evaluate(expr)
@@ -63,20 +127,178 @@ class Interpreter(VisitorExpr, VisitorStmt):
             HiEm.error_runtime(err)
 
     def evaluate(self, expr: Expr) -> object:
-        return expr.accept(self)
+        return self.dispatch[expr.kind](expr)
 
     def visit_literal(self, expr: LiteralExpr):
         return expr.literal
 
+    # operators are evaluated recursively up to `depth_limit` levels of
+    # nesting, deeper ones are handed to `evaluate_deep`
     def visit_grouping(self, expr: GroupingExpr):
-        return self.evaluate(expr.expr)
+        if self.depth >= depth_limit:
+            return self.evaluate_deep(expr)
+        self.depth += 1
+        try:
+            return self.evaluate(expr.expr)
+        finally:
+            self.depth -= 1
 
     def visit_unary(self, expr: UnaryExpr):
-        right = self.evaluate(expr.expr)
+        if self.depth >= depth_limit:
+            return self.evaluate_deep(expr)
+        self.depth += 1
+        try:
+            right = self.evaluate(expr.expr)
+        finally:
+            self.depth -= 1
+
+        expr.counter += 1
+        if expr.counter >= warmup:
+            self.quicken_unary(expr, right)
+        return self.unary(expr.op, right)
+
+    def visit_binary(self, expr: BinaryExpr):
+        if self.depth >= depth_limit:
+            return self.evaluate_deep(expr)
+        self.depth += 1
+        try:
+            left = self.evaluate(expr.left)
+            right = self.evaluate(expr.right)
+        finally:
+            self.depth -= 1
+
+        expr.counter += 1
+        if expr.counter >= warmup:
+            self.quicken_binary(expr, left, right)
+        return self.binary(expr.op, left, right)
+
+    def visit_number_unary(self, expr: NumberUnaryExpr):
+        if self.depth >= depth_limit:
+            return self.evaluate_deep(expr)
+        self.depth += 1
+        try:
+            return -self.evaluate(expr.expr)
+        finally:
+            self.depth -= 1
+
+    def visit_number_binary(self, expr: NumberBinaryExpr):
+        if self.depth >= depth_limit:
+            return self.evaluate_deep(expr)
+        self.depth += 1
+        try:
+            left = self.evaluate(expr.left)
+            right = self.evaluate(expr.right)
+        finally:
+            self.depth -= 1
+        return number_operators[expr.op.type](left, right)
+
+    # specialized operators check their operands are of the type they
+    # expect, the generic operator runs when they aren't
+    def visit_float_unary(self, expr: FloatUnaryExpr):
+        if self.depth >= depth_limit:
+            return self.evaluate_deep(expr)
+        self.depth += 1
+        try:
+            right = self.evaluate(expr.expr)
+        finally:
+            self.depth -= 1
+
+        if type(right) is float:
+            return -right
+        self.deoptimize(expr, UnaryExpr)
+        return self.unary(expr.op, right)
 
-        match expr.op.type:
+    def visit_float_binary(self, expr: FloatBinaryExpr):
+        if self.depth >= depth_limit:
+            return self.evaluate_deep(expr)
+        self.depth += 1
+        try:
+            left = self.evaluate(expr.left)
+            right = self.evaluate(expr.right)
+        finally:
+            self.depth -= 1
+
+        if type(left) is float and type(right) is float:
+            return number_operators[expr.op.type](left, right)
+        self.deoptimize(expr, BinaryExpr)
+        return self.binary(expr.op, left, right)
+
+    def visit_string_binary(self, expr: StringBinaryExpr):
+        if self.depth >= depth_limit:
+            return self.evaluate_deep(expr)
+        self.depth += 1
+        try:
+            left = self.evaluate(expr.left)
+            right = self.evaluate(expr.right)
+        finally:
+            self.depth -= 1
+
+        if type(left) is str and type(right) is str:
+            return left + right
+        self.deoptimize(expr, BinaryExpr)
+        return self.binary(expr.op, left, right)
+
+    def visit_logical(self, expr: LogicalExpr):
+        if self.depth >= depth_limit:
+            return self.evaluate_deep(expr)
+        self.depth += 1
+        try:
+            left = self.evaluate(expr.left)
+
+            if expr.op.type == TokenType.OR:
+                if self.truthy(left):
+                    return left
+            else:
+                if not self.truthy(left):
+                    return left
+
+            return self.evaluate(expr.right)
+        finally:
+            self.depth -= 1
+
+    # operators nested deeper than the Python stack goes are evaluated with
+    # explicit stacks: `todo` holds nodes to evaluate and, as 1-tuples, nodes
+    # whose operands are computed and on top of `values`
+    def evaluate_deep(self, expr: Expr):
+        dispatch = self.dispatch
+        todo: list[Expr | tuple[Expr]] = [expr]
+        values: list[object] = []
+
+        while todo:
+            node = todo.pop()
+
+            if type(node) is tuple:
+                node = node[0]
+                kind = node.kind
+                if kind in binary_kinds:
+                    right = values.pop()
+                    values[-1] = self.binary(node.op, values[-1], right)
+                elif kind in unary_kinds:
+                    values[-1] = self.unary(node.op, values[-1])
+                elif (node.op.type == TokenType.OR) != self.truthy(values[-1]):
+                    # the left operand doesn't decide, the right one is the value
+                    values.pop()
+                    todo.append(node.right)
+                continue
+
+            kind = node.kind
+            if kind in binary_kinds:
+                todo += ((node,), node.right, node.left)
+            elif kind == GROUPING:
+                todo.append(node.expr)
+            elif kind in unary_kinds:
+                todo += ((node,), node.expr)
+            elif kind == LOGICAL:
+                todo += ((node,), node.left)
+            else:
+                values.append(dispatch[kind](node))
+
+        return values[0]
+
+    def unary(self, op: Token, right: object):
+        match op.type:
             case TokenType.MINUS:
-                self.check_number(expr.op, right)
+                self.check_number(op, right)
                 return -float(right)
             case TokenType.BANG:
                 return not self.truthy(right)
@@ -84,27 +306,24 @@ class Interpreter(VisitorExpr, VisitorStmt):
         # unreachable
         return None
 
-    def visit_binary(self, expr: BinaryExpr):
-        left = self.evaluate(expr.left)
-        right = self.evaluate(expr.right)
-
+    def binary(self, op: Token, left: object, right: object):
         # check if number or string for plus
-        if expr.op.type is TokenType.PLUS:
-            self.check_plus(expr.op, left, right)
+        if op.type is TokenType.PLUS:
+            self.check_plus(op, left, right)
             if isinstance(left, float) and isinstance(right, float):
                 return float(left) + float(right)
             if isinstance(left, str) and isinstance(right, str):
                 return str(left) + str(right)
 
-        if expr.op.type is TokenType.EQUAL_EQUAL:
+        if op.type is TokenType.EQUAL_EQUAL:
             return left == right
 
-        if expr.op.type is TokenType.BANG_EQUAL:
+        if op.type is TokenType.BANG_EQUAL:
             return not left == right
 
         # all remain types are number
-        self.check_number(expr.op, left, right)
-        match expr.op.type:
+        self.check_number(op, left, right)
+        match op.type:
             case TokenType.MINUS:
                 return float(left) - float(right)
             case TokenType.STAR:
@@ -123,24 +342,79 @@ class Interpreter(VisitorExpr, VisitorStmt):
         return None
 
     def visit_varexpr(self, expr: VariableExpr):
-        return self.env.get(expr.name)
+        expr.counter += 1
+        if expr.counter >= warmup:
+            self.quicken_variable(expr)
+
+        depth = expr.depth
+        if depth < 0:
+            if depth == -2:
+                return self.upvalues[expr.slot].value
+            if expr.version != self.globals.version:
+                self.cache_global(expr)
+            return expr.cell.value
+
+        env = self.env
+        while depth:
+            env = env.enclosing
+            depth -= 1
+        if expr.boxed:
+            return env.values[expr.slot].value
+        return env.values[expr.slot]
+
+    def visit_local_varexpr(self, expr: LocalVariableExpr):
+        return self.env.values[expr.slot]
+
+    def visit_global_varexpr(self, expr: GlobalVariableExpr):
+        if expr.version != self.globals.version:
+            self.cache_global(expr)
+        return expr.cell.value
 
     def visit_assignexpr(self, expr: AssignExpr):
         value = self.evaluate(expr.value)
-        self.env.assign(expr.name, value)
-        return value
 
-    def visit_logical(self, expr: LogicalExpr):
-        left = self.evaluate(expr.left)
+        depth = expr.depth
+        if depth < 0:
+            if depth == -2:
+                self.upvalues[expr.slot].value = value
+                return value
+            if expr.version != self.globals.version:
+                self.cache_global(expr)
+            expr.cell.value = value
+            return value
 
-        if expr.op.type == TokenType.OR:
-            if self.truthy(left):
-                return left
+        env = self.env
+        while depth:
+            env = env.enclosing
+            depth -= 1
+        if expr.boxed:
+            env.values[expr.slot].value = value
         else:
-            if not self.truthy(left):
-                return left
+            env.values[expr.slot] = value
+        return value
+
+    def visit_invariant(self, expr: InvariantExpr):
+        if not expr.evaluated:
+            expr.value = self.evaluate(expr.expr)
+            expr.evaluated = True
+        return expr.value
+
+    def visit_inline(self, expr: InlineExpr):
+        # the call without the call: the arguments are the locals of a
+        # function that has no others, captures nothing and returns at once
+        env = Environment()
+        env.values = [self.evaluate(arg) for arg in expr.arguments]
+
+        previous = self.env
+        self.env = env
+        try:
+            return self.evaluate(expr.expr)
+        finally:
+            self.env = previous
 
-        return self.evaluate(expr.right)
+    def cache_global(self, expr: VariableExpr | AssignExpr):
+        expr.cell = self.globals.cell(expr.name)
+        expr.version = self.globals.version
 
     def visit_call(self, expr: CallExpr):
         calle = self.evaluate(expr.calle)
@@ -149,6 +423,22 @@ class Interpreter(VisitorExpr, VisitorStmt):
         for arg in expr.arguments:
             arguments.append(self.evaluate(arg))
 
+        expr.counter += 1
+        if expr.counter >= warmup:
+            self.quicken_call(expr, calle, arguments)
+        return self.call(expr, calle, arguments)
+
+    def visit_direct_call(self, expr: DirectCallExpr):
+        calle = self.evaluate(expr.calle)
+        arguments = [self.evaluate(arg) for arg in expr.arguments]
+
+        # a function of the declaration expected takes these arguments
+        if type(calle) is HiEmFunction and calle.declaration is expr.function:
+            return calle.call(self, arguments)
+        self.deoptimize(expr, CallExpr)
+        return self.call(expr, calle, arguments)
+
+    def call(self, expr: CallExpr, calle: object, arguments: list[object]):
         if not isinstance(calle, HiEmCallable):
             from .hi_em import HiEm
 
@@ -166,6 +456,47 @@ class Interpreter(VisitorExpr, VisitorStmt):
 
         return function.call(self, arguments)
 
+    # --------------------
+    # Specialization
+    # --------------------
+
+    # once evaluated `warmup` times, a node becomes the variant for the
+    # values it was last evaluated with, as long as they stay alike
+
+    def quicken_unary(self, expr: UnaryExpr, right: object):
+        if type(right) is float and expr.op.type is TokenType.MINUS:
+            expr.__class__ = FloatUnaryExpr
+        else:
+            expr.counter = -backoff
+
+    def quicken_binary(self, expr: BinaryExpr, left: object, right: object):
+        op = expr.op.type
+        if type(left) is float and type(right) is float and op in number_operators:
+            expr.__class__ = FloatBinaryExpr
+        elif type(left) is str and type(right) is str and op is TokenType.PLUS:
+            expr.__class__ = StringBinaryExpr
+        else:
+            expr.counter = -backoff
+
+    def quicken_variable(self, expr: VariableExpr):
+        if expr.depth == -1:
+            expr.__class__ = GlobalVariableExpr
+        elif expr.depth == 0 and not expr.boxed:
+            expr.__class__ = LocalVariableExpr
+        else:
+            expr.counter = -backoff
+
+    def quicken_call(self, expr: CallExpr, calle: object, arguments: list[object]):
+        if type(calle) is HiEmFunction and len(arguments) == calle.arity():
+            expr.function = calle.declaration
+            expr.__class__ = DirectCallExpr
+        else:
+            expr.counter = -backoff
+
+    def deoptimize(self, expr: Expr, generic: type):
+        expr.__class__ = generic
+        expr.counter = -backoff
+
     # --------------------
     # Statement
     # --------------------
@@ -173,14 +504,24 @@ class Interpreter(VisitorExpr, VisitorStmt):
     def interpret(self, statements: list[Stmt]):
         try:
             for statement in statements:
-                self.execute(statement)
+                status = self.execute(statement)
+                if status is not None:
+                    self.leave(status)
+                    break
         except InterpreterError as err:
             from .hi_em import HiEm
 
             HiEm.error_runtime(err)
 
-    def execute(self, stmt: Stmt):
-        stmt.accept(self)
+    def execute(self, stmt: Stmt) -> int | None:
+        return self.dispatch[stmt.kind](stmt)
+
+    def leave(self, status: int):
+        # `trả về` outside a function ends the script, once the call it
+        # returns is made
+        if status == TAIL_CALL:
+            function, arguments = self.tail_call
+            function.call(self, arguments)
 
     def visit_expression(self, stmt: ExprStmt):
         self.evaluate(stmt.expr)
@@ -195,51 +536,197 @@ class Interpreter(VisitorExpr, VisitorStmt):
         value = None
         if stmt.initializer is not None:
             value = self.evaluate(stmt.initializer)
-        self.env.define(stmt.name.lexeme, value)
+        if stmt.boxed:
+            value = Cell(value)
+        self.define(stmt.slot, stmt.name.lexeme, value)
         return None
 
     def visit_block(self, stmt: BlockStmt):
-        self.execute_block(stmt.statements, Environment(self.env))
+        if stmt.size:
+            return self.execute_block(stmt.statements, Environment(self.env, stmt.size))
+
+        dispatch = self.dispatch
+        for statement in stmt.statements:
+            status = dispatch[statement.kind](statement)
+            if status is not None:
+                return status
         return None
 
-    def execute_block(self, statements: list[Stmt], env: Environment):
+    def execute_block(self, statements: list[Stmt], env: Environment) -> int | None:
         previous = self.env
         try:
             self.env = env
+            dispatch = self.dispatch
             for statement in statements:
-                self.execute(statement)
+                status = dispatch[statement.kind](statement)
+                if status is not None:
+                    return status
         finally:
             self.env = previous
+        return None
+
+    def execute_body(self, declaration: FuncStmt, env: Environment) -> int | None:
+        return self.execute_block(declaration.body, env)
 
     def visit_if(self, stmt: IfStmt):
         if self.truthy(self.evaluate(stmt.condition)):
-            self.execute(stmt.then_branch)
-        elif stmt.else_branch is not None:
-            self.execute(stmt.else_branch)
+            return self.execute(stmt.then_branch)
+        if stmt.else_branch is not None:
+            return self.execute(stmt.else_branch)
         return None
 
     def visit_while(self, stmt: WhileStmt):
+        for invariant in stmt.invariants:
+            invariant.evaluated = False
         while self.truthy(self.evaluate(stmt.condition)):
-            self.execute(stmt.body)
+            status = self.execute(stmt.body)
+            if status is not None and status != CONTINUE:
+                return None if status == BREAK else status
+        return None
+
+    def visit_for(self, stmt: ForStmt):
+        for invariant in stmt.invariants:
+            invariant.evaluated = False
+
+        previous = self.env
+        if stmt.size:
+            self.env = Environment(previous, stmt.size)
+        try:
+            if stmt.initializer is not None:
+                self.execute(stmt.initializer)
+            if stmt.step is not None:
+                status = self.count(stmt)
+                if status is not False:
+                    return status
+
+            condition, increment, body = stmt.condition, stmt.increment, stmt.body
+            while self.truthy(self.evaluate(condition)):
+                status = self.execute(body)
+                if status is not None and status != CONTINUE:
+                    return None if status == BREAK else status
+                if increment is not None:
+                    self.evaluate(increment)
+        finally:
+            self.env = previous
+        return None
+
+    def count(self, stmt: ForStmt) -> int | None | bool:
+        # the resolver found that only the increment changes the counter and
+        # nothing changes the bound, but they must be numbers for the loop
+        # to run natively, the generic loop raises the errors otherwise: the
+        # loop's status when it ran, False when it couldn't
+        values = self.env.values
+        slot = stmt.initializer.slot
+        counter = values[slot]
+        bound = self.evaluate(stmt.condition.right)
+        if type(counter) is not float or type(bound) is not float:
+            return False
+
+        compare = number_operators[stmt.condition.op.type]
+        step, body, execute = stmt.step, stmt.body, self.execute
+        while compare(counter, bound):
+            status = execute(body)
+            if status is not None and status != CONTINUE:
+                return None if status == BREAK else status
+            counter += step
+            values[slot] = counter
+        return None
+
+    def visit_range(self, stmt: RangeStmt):
+        for invariant in stmt.invariants:
+            invariant.evaluated = False
+
+        start = self.evaluate(stmt.start)
+        stop = self.evaluate(stmt.stop)
+        step = 1.0 if stmt.step is None else self.evaluate(stmt.step)
+        self.check_number(stmt.keyword, start, stop, step)
+        if step == 0:
+            raise InterpreterError("Range step must not be zero.", stmt.keyword)
+
+        previous = self.env
+        self.env = Environment(previous, 1)
+        values = self.env.values
+        compare = operator.lt if step > 0 else operator.gt
+        body, execute = stmt.body, self.execute
+        try:
+            counter = start
+            while compare(counter, stop):
+                # each round has its own variable, closures keep theirs
+                values[0] = Cell(counter) if stmt.boxed else counter
+                status = execute(body)
+                if status is not None and status != CONTINUE:
+                    return None if status == BREAK else status
+                counter += step
+        finally:
+            self.env = previous
         return None
 
     def visit_function(self, stmt: FuncStmt):
-        function = HiEmFunction(stmt)
-        self.env.define(stmt.name.lexeme, function)
+        if not stmt.boxed:
+            self.define(
+                stmt.slot, stmt.name.lexeme, HiEmFunction(stmt, self.capture(stmt))
+            )
+            return None
+
+        # the function may capture itself, its cell is in place first
+        cell = Cell()
+        self.define(stmt.slot, stmt.name.lexeme, cell)
+        cell.value = HiEmFunction(stmt, self.capture(stmt))
         return None
 
+    def capture(self, stmt: FuncStmt) -> list[Cell]:
+        cells = []
+        for local, depth, slot in stmt.upvalues:
+            if local:
+                env = self.env
+                while depth:
+                    env = env.enclosing
+                    depth -= 1
+                cells.append(env.values[slot])
+            else:
+                cells.append(self.upvalues[slot])
+        return cells
+
     def visit_return(self, stmt: ReturnStmt):
-        value = None
+        value = stmt.value
+        if value is None:
+            self.returned = None
+            return RETURN
+        if value.kind == CALL:
+            return self.tail(value)
+
+        self.returned = self.evaluate(value)
+        return RETURN
+
+    def tail(self, expr: CallExpr) -> int:
+        # a function called in tail position is called by the call of the
+        # function returning, once its frame is gone: recursion through
+        # tail calls runs in constant stack
+        calle = self.evaluate(expr.calle)
+        arguments = [self.evaluate(arg) for arg in expr.arguments]
+        if type(calle) is HiEmFunction and len(arguments) == calle.arity():
+            self.tail_call = (calle, arguments)
+            return TAIL_CALL
 
-        if stmt.value is not None:
-            value = self.evaluate(stmt.value)
+        self.returned = self.call(expr, calle, arguments)
+        return RETURN
 
-        raise ReturnError(value)
+    def visit_break(self, stmt: BreakStmt):
+        return BREAK
+
+    def visit_continue(self, stmt: ContinueStmt):
+        return CONTINUE
 
     # --------------------
     # Utils
     # --------------------
 
+    def define(self, slot: int, name: str, value: object):
+        if slot < 0:
+            self.globals.define(name, value)
+        else:
+            self.env.values[slot] = value
+
     def truthy(self, value: object) -> bool:
         if value is None:
             return False
@@ -0,0 +1,355 @@
+from .interpreter import Interpreter
+from .parser.expr.expr import Expr, InlineExpr, InvariantExpr, LiteralExpr
+from .parser.node_kind import NodeKind
+from .parser.stmt.visitor import VisitorStmt
+from .parser.stmt.stmt import (
+    Stmt,
+    PrintStmt,
+    ExprStmt,
+    VarStmt,
+    BlockStmt,
+    IfStmt,
+    WhileStmt,
+    ForStmt,
+    RangeStmt,
+    FuncStmt,
+    ReturnStmt,
+    BreakStmt,
+    ContinueStmt,
+)
+from .parser.traversal import children, preorder, postorder, rewrite
+from .scanner.token_type import TokenType
+
+BINARY = NodeKind.BINARY.value
+UNARY = NodeKind.UNARY.value
+GROUPING = NodeKind.GROUPING.value
+LITERAL = NodeKind.LITERAL.value
+VAREXPR = NodeKind.VAREXPR.value
+ASSIGNEXPR = NodeKind.ASSIGNEXPR.value
+LOGICAL = NodeKind.LOGICAL.value
+CALL = NodeKind.CALL.value
+VARSTMT = NodeKind.VARSTMT.value
+FUNCTION = NodeKind.FUNCTION.value
+RANGE = NodeKind.RANGE.value
+INVARIANT = NodeKind.INVARIANT.value
+INLINE = NodeKind.INLINE.value
+RETURN = NodeKind.RETURN.value
+BREAK = NodeKind.BREAK.value
+CONTINUE = NodeKind.CONTINUE.value
+
+
+# most nodes in the body of a function inlined at its calls
+inline_size = 24
+
+
+def optimize(statements: list[Stmt], level: int = 1) -> list[Stmt]:
+    """Simplify `statements` before they are resolved: level 1 folds
+    constants and removes dead code, level 2 also hoists loop invariants
+    and inlines small functions"""
+    if level <= 0:
+        return statements
+    return Optimizer(level).program(statements)
+
+
+class Optimizer(VisitorStmt):
+    """Rewrites the tree into one that runs the same, faster.
+
+    Constant operators are evaluated by the interpreter's own operators,
+    those that would raise a runtime error are kept to raise it when they
+    run. Branches of constant conditions that can't be taken and statements
+    after a `trả về`, `dừng` or `tiếp` are dropped. Pure expressions of a
+    loop that calls nothing and doesn't change the variables they read are
+    evaluated once each time the loop is entered, on their first use, so
+    their errors are raised as before. Calls to a small global function
+    that only returns an expression, doesn't use itself and is never
+    declared again or assigned are replaced by its body over the arguments.
+    Each statement is replaced by what its visit method returns, None
+    removes it.
+    """
+
+    def __init__(self, level: int) -> None:
+        self.level = level
+        self.interpreter = Interpreter()
+        # global functions that may be inlined, once they are declared
+        self.candidates: dict[str, FuncStmt] = {}
+        self.inlined: dict[str, FuncStmt] = {}
+
+    def program(self, statements: list[Stmt]) -> list[Stmt]:
+        if self.level >= 2:
+            self.find_candidates(statements)
+        return self.statements(statements)
+
+    def statements(self, statements: list[Stmt]) -> list[Stmt]:
+        optimized = []
+        for statement in statements:
+            # statements that failed to parse are None
+            if statement is None:
+                optimized.append(None)
+                continue
+
+            statement = statement.accept(self)
+            if statement is not None:
+                optimized.append(statement)
+                if statement.kind in (RETURN, BREAK, CONTINUE):
+                    break
+        return optimized
+
+    def statement(self, stmt: Stmt) -> Stmt:
+        # where one statement is expected, a removed one is an empty block
+        stmt = stmt.accept(self)
+        return BlockStmt([]) if stmt is None else stmt
+
+    def expression(self, expr: Expr | None) -> Expr | None:
+        if expr is None:
+            return None
+        return rewrite(expr, self.fold)
+
+    def fold(self, expr: Expr) -> Expr:
+        kind = expr.kind
+        if kind == CALL:
+            return self.inline(expr)
+        if kind == GROUPING:
+            return expr.expr
+        if kind == LOGICAL and expr.left.kind == LITERAL:
+            # the left operand decides or the right one is the value
+            left = self.interpreter.truthy(expr.left.literal)
+            if left == (expr.op.type == TokenType.OR):
+                return expr.left
+            return expr.right
+
+        try:
+            if kind == UNARY and expr.expr.kind == LITERAL:
+                value = self.interpreter.unary(expr.op, expr.expr.literal)
+            elif kind == BINARY and expr.left.kind == expr.right.kind == LITERAL:
+                value = self.interpreter.binary(
+                    expr.op, expr.left.literal, expr.right.literal
+                )
+            else:
+                return expr
+        except Exception:
+            return expr
+        return LiteralExpr(value)
+
+    def constant(self, expr: Expr) -> bool:
+        return expr.kind == LITERAL
+
+    def visit_print(self, stmt: PrintStmt):
+        stmt.expr = self.expression(stmt.expr)
+        return stmt
+
+    def visit_expression(self, stmt: ExprStmt):
+        stmt.expr = self.expression(stmt.expr)
+        # a constant used for nothing
+        return None if self.constant(stmt.expr) else stmt
+
+    def visit_varstmt(self, stmt: VarStmt):
+        stmt.initializer = self.expression(stmt.initializer)
+        return stmt
+
+    def visit_block(self, stmt: BlockStmt):
+        stmt.statements = self.statements(stmt.statements)
+        return stmt if stmt.statements else None
+
+    def visit_if(self, stmt: IfStmt):
+        stmt.condition = self.expression(stmt.condition)
+        if self.constant(stmt.condition):
+            if self.interpreter.truthy(stmt.condition.literal):
+                return stmt.then_branch.accept(self)
+            if stmt.else_branch is not None:
+                return stmt.else_branch.accept(self)
+            return None
+
+        stmt.then_branch = self.statement(stmt.then_branch)
+        if stmt.else_branch is not None:
+            stmt.else_branch = stmt.else_branch.accept(self)
+        return stmt
+
+    def visit_while(self, stmt: WhileStmt):
+        stmt.condition = self.expression(stmt.condition)
+        if self.constant(stmt.condition) and not self.interpreter.truthy(
+            stmt.condition.literal
+        ):
+            return None
+
+        stmt.body = self.statement(stmt.body)
+        if self.level >= 2:
+            self.hoist(stmt)
+        return stmt
+
+    def visit_for(self, stmt: ForStmt):
+        if stmt.initializer is not None:
+            stmt.initializer = stmt.initializer.accept(self)
+        stmt.condition = self.expression(stmt.condition)
+        if self.constant(stmt.condition) and not self.interpreter.truthy(
+            stmt.condition.literal
+        ):
+            # the initializer still runs, its variable in a scope of its own
+            return None if stmt.initializer is None else BlockStmt([stmt.initializer])
+
+        stmt.increment = self.expression(stmt.increment)
+        stmt.body = self.statement(stmt.body)
+        if self.level >= 2:
+            self.hoist(stmt)
+        return stmt
+
+    def visit_range(self, stmt: RangeStmt):
+        stmt.start = self.expression(stmt.start)
+        stmt.stop = self.expression(stmt.stop)
+        stmt.step = self.expression(stmt.step)
+        stmt.body = self.statement(stmt.body)
+        if self.level >= 2:
+            self.hoist(stmt)
+        return stmt
+
+    def visit_function(self, stmt: FuncStmt):
+        # a lazily parsed body is optimized once it's parsed
+        stmt.defer(self.function)
+        return stmt
+
+    def function(self, stmt: FuncStmt):
+        stmt.body = self.statements(stmt.body)
+        if self.candidates.get(stmt.name.lexeme) is stmt and self.inlinable(stmt):
+            # calls after the declaration only, those before would fail
+            self.inlined[stmt.name.lexeme] = stmt
+
+    def visit_return(self, stmt: ReturnStmt):
+        stmt.value = self.expression(stmt.value)
+        return stmt
+
+    def visit_break(self, stmt: BreakStmt):
+        return stmt
+
+    def visit_continue(self, stmt: ContinueStmt):
+        return stmt
+
+    # --------------------
+    # Loop invariants
+    # --------------------
+
+    def hoist(self, loop: WhileStmt | ForStmt | RangeStmt):
+        # statements of the loop, the bodies of functions it declares only
+        # run when called
+        statements = []
+        stack: list[Stmt] = [loop]
+        while stack:
+            stmt = stack.pop()
+            statements.append(stmt)
+            if stmt.kind != FUNCTION:
+                stack.extend(node for node in children(stmt) if isinstance(node, Stmt))
+
+        # a call may change any variable, the loop must change them itself
+        changed = set()
+        for stmt in statements:
+            if stmt.kind in (VARSTMT, FUNCTION, RANGE):
+                changed.add(stmt.name.lexeme)
+            for _, expr in self.expressions(stmt):
+                for node in preorder(expr):
+                    if node.kind == CALL or node.kind == INLINE:
+                        return
+                    if node.kind == ASSIGNEXPR:
+                        changed.add(node.name.lexeme)
+
+        for stmt in statements:
+            for name, expr in self.expressions(stmt):
+                setattr(stmt, name, self.invariants(expr, changed, loop))
+
+    def expressions(self, stmt: Stmt) -> list[tuple[str, Expr]]:
+        # reading the body of a function would parse it
+        if stmt.kind == FUNCTION:
+            return []
+        return [
+            (name, getattr(stmt, name))
+            for name in stmt.fields
+            if isinstance(getattr(stmt, name), Expr)
+        ]
+
+    def invariants(
+        self, expr: Expr, changed: set[str], loop: WhileStmt | ForStmt | RangeStmt
+    ) -> Expr:
+        # ids of the nodes whose value can't change while the loop runs
+        fixed = set()
+        for node in postorder(expr):
+            kind = node.kind
+            if kind == LITERAL or (kind == VAREXPR and node.name.lexeme not in changed):
+                fixed.add(id(node))
+            elif kind == GROUPING or kind == UNARY or kind == INVARIANT:
+                if id(node.expr) in fixed:
+                    fixed.add(id(node))
+            elif kind == BINARY or kind == LOGICAL:
+                if id(node.left) in fixed and id(node.right) in fixed:
+                    fixed.add(id(node))
+
+        def hoisted(node: Expr) -> Expr | None:
+            # the largest operators only, reading a variable is as fast as
+            # reading a cached value
+            if id(node) not in fixed or node.kind in (LITERAL, VAREXPR):
+                return None
+            invariant = InvariantExpr(node)
+            loop.invariants.append(invariant)
+            return invariant
+
+        invariant = hoisted(expr)
+        if invariant is not None:
+            return invariant
+
+        stack = [expr]
+        while stack:
+            node = stack.pop()
+            for name in node.fields:
+                value = getattr(node, name)
+                if isinstance(value, Expr):
+                    invariant = hoisted(value)
+                    if invariant is None:
+                        stack.append(value)
+                    else:
+                        setattr(node, name, invariant)
+        return expr
+
+    # --------------------
+    # Inlining
+    # --------------------
+
+    def find_candidates(self, statements: list[Stmt]):
+        # names declared once, by a global function, and never assigned nor
+        # taken by a parameter or a range variable
+        declared: dict[str, int] = {}
+        for statement in statements:
+            if statement is None:
+                continue
+            for node in preorder(statement, parse=False):
+                kind = node.kind
+                if kind == FUNCTION and not node.parsed:
+                    # what lazily parsed bodies declare isn't known
+                    return
+                if kind in (VARSTMT, FUNCTION, ASSIGNEXPR, RANGE):
+                    name = node.name.lexeme
+                    declared[name] = declared.get(name, 0) + 1
+                if kind == FUNCTION:
+                    for param in node.params:
+                        declared[param.lexeme] = declared.get(param.lexeme, 0) + 1
+
+        for statement in statements:
+            if statement is not None and statement.kind == FUNCTION:
+                if declared[statement.name.lexeme] == 1:
+                    self.candidates[statement.name.lexeme] = statement
+
+    def inlinable(self, stmt: FuncStmt) -> bool:
+        body = stmt.body
+        if len(body) != 1 or body[0].kind != RETURN or body[0].value is None:
+            return False
+
+        size = 0
+        for node in preorder(body[0].value):
+            size += 1
+            if node.kind == VAREXPR and node.name.lexeme == stmt.name.lexeme:
+                return False
+        return size <= inline_size
+
+    def inline(self, expr: Expr) -> Expr:
+        calle = expr.calle
+        if calle.kind != VAREXPR:
+            return expr
+        function = self.inlined.get(calle.name.lexeme)
+        if function is None or len(function.params) != len(expr.arguments):
+            return expr
+        return InlineExpr(expr.arguments, function)
@@ -0,0 +1,151 @@
+from array import array
+
+from ..scanner.scanner import make_token
+from ..scanner.token import Token
+from ..scanner.token_buffer import token_types, type_codes
+from .expr import expr
+from .node_kind import NodeKind
+from .stmt import stmt
+from .traversal import postorder
+
+# node kind -> node class
+node_classes = [None] * len(NodeKind)
+for module in (expr, stmt):
+    for value in vars(module).values():
+        if isinstance(value, type) and "kind" in vars(value):
+            node_classes[value.kind] = value
+
+# an operand is a field value, tagged in its two lowest bits
+NODE, TOKEN, CONSTANT, LIST = range(4)
+
+
+class Arena:
+    """Flat encoding of an AST for very large programs.
+
+    Node i has kind `kinds[i]` and its fields, in `fields` order, are the
+    operands `operands[firsts[i] : firsts[i + 1]]`. A list field is a LIST
+    operand holding its length followed by its items. Tokens are stored the
+    same way in `token_types`/`token_lexemes`/`token_lines`, lexemes and
+    literal values go to the `constants` pool. Shared subtrees stay shared.
+    """
+
+    def __init__(self) -> None:
+        self.kinds = array("B")
+        self.firsts = array("l", [0])
+        self.operands = array("q")
+
+        self.token_types = array("B")
+        self.token_lexemes = array("l")
+        self.token_lines = array("l")
+
+        self.constants: list[object] = []
+        self.roots = array("l")
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    @classmethod
+    def encode(cls, statements: list[stmt.Stmt]) -> "Arena":
+        arena = cls()
+        encoder = Encoder(arena)
+        for statement in statements:
+            # statements that failed to parse are None
+            arena.roots.append(-1 if statement is None else encoder.node(statement))
+        return arena
+
+    def decode(self) -> list[stmt.Stmt]:
+        decoder = Decoder(self)
+        # children always come before their parent
+        for index in range(len(self)):
+            decoder.node(index)
+        return [None if root < 0 else decoder.nodes[root] for root in self.roots]
+
+
+class Encoder:
+    def __init__(self, arena: Arena) -> None:
+        self.arena = arena
+        self.seen: set[int] = set()
+        self.nodes: dict[int, int] = {}
+        self.tokens: dict[int, int] = {}
+        self.constants: dict[tuple[type, object], int] = {}
+
+    def node(self, root: expr.Expr | stmt.Stmt) -> int:
+        arena = self.arena
+        for node in postorder(root, self.seen):
+            operands = []
+            for name in node.fields:
+                self.operand(getattr(node, name), operands)
+
+            self.nodes[id(node)] = len(arena.kinds)
+            arena.kinds.append(node.kind)
+            arena.operands.extend(operands)
+            arena.firsts.append(len(arena.operands))
+        return self.nodes[id(root)]
+
+    def operand(self, value: object, operands: list[int]):
+        if isinstance(value, (expr.Expr, stmt.Stmt)):
+            # encoded already, children are walked first
+            operands.append(self.nodes[id(value)] << 2 | NODE)
+        elif isinstance(value, Token):
+            operands.append(self.token(value) << 2 | TOKEN)
+        elif isinstance(value, list):
+            operands.append(len(value) << 2 | LIST)
+            for item in value:
+                self.operand(item, operands)
+        else:
+            operands.append(self.constant(value) << 2 | CONSTANT)
+
+    def token(self, token: Token) -> int:
+        if id(token) not in self.tokens:
+            arena = self.arena
+            self.tokens[id(token)] = len(arena.token_types)
+            arena.token_types.append(type_codes[token.type])
+            arena.token_lexemes.append(self.constant(token.lexeme))
+            arena.token_lines.append(token.line)
+        return self.tokens[id(token)]
+
+    def constant(self, value: object) -> int:
+        # 1.0 == True, so the type is part of the key
+        key = (type(value), value)
+        if key not in self.constants:
+            self.constants[key] = len(self.arena.constants)
+            self.arena.constants.append(value)
+        return self.constants[key]
+
+
+class Decoder:
+    def __init__(self, arena: Arena) -> None:
+        self.arena = arena
+        self.nodes: list[expr.Expr | stmt.Stmt] = []
+        self.tokens: dict[int, Token] = {}
+
+    def node(self, index: int) -> expr.Expr | stmt.Stmt:
+        arena = self.arena
+        cls = node_classes[arena.kinds[index]]
+        operands = iter(arena.operands[arena.firsts[index] : arena.firsts[index + 1]])
+
+        # built as the parser builds it, what isn't a field gets its default
+        node = cls(*(self.operand(operand, operands) for operand in operands))
+
+        self.nodes.append(node)
+        return node
+
+    def operand(self, operand: int, operands) -> object:
+        tag, value = operand & 3, operand >> 2
+        if tag == NODE:
+            return self.nodes[value]
+        if tag == TOKEN:
+            return self.token(value)
+        if tag == LIST:
+            return [self.operand(next(operands), operands) for _ in range(value)]
+        return self.arena.constants[value]
+
+    def token(self, index: int) -> Token:
+        if index not in self.tokens:
+            arena = self.arena
+            token_type = token_types[arena.token_types[index]]
+            lexeme = arena.constants[arena.token_lexemes[index]]
+            self.tokens[index] = make_token(
+                token_type, lexeme, arena.token_lines[index]
+            )
+        return self.tokens[index]
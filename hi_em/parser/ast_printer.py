@@ -1,10 +1,16 @@
 from .expr.expr import Expr, BinaryExpr, GroupingExpr, LiteralExpr, UnaryExpr
 from .expr.visitor import VisitorExpr
+from .traversal import postorder
 
 
 class ASTPrinter(VisitorExpr):
     def get_expr(self, expr: Expr) -> str:
-        return expr.accept(self)
+        # operands are printed before their operator, onto a stack it pops
+        # them from, so deeply nested expressions print without recursion
+        self.printed: list[str] = []
+        for node in postorder(expr):
+            self.printed.append(node.accept(self))
+        return self.printed.pop()
 
     def visit_binary(self, expr: BinaryExpr) -> str:
         return self.parenthesize(expr.op.type.name, expr.left, expr.right)
@@ -21,8 +27,11 @@ class ASTPrinter(VisitorExpr):
         return self.parenthesize(expr.op.type.name, expr.expr)
 
     def parenthesize(self, name: str, *args: Expr) -> str:
+        operands = self.printed[len(self.printed) - len(args) :]
+        del self.printed[len(self.printed) - len(args) :]
+
         val = f"( {name}"
-        for expr in args:
-            val += f" {expr.accept(self)}"
+        for operand in operands:
+            val += f" {operand}"
         val += " )"
         return val
@@ -1,8 +1,14 @@
 from ...scanner.token import Token
+from ..node_kind import NodeKind
 from .visitor import VisitorExpr
 
 
 class Expr:
+    __slots__ = ()
+
+    kind: int
+    fields: tuple[str, ...]
+
     def accept(self, visitor: VisitorExpr):
         raise NotImplementedError
 
@@ -14,10 +20,16 @@ class Expr:
 
 
 class BinaryExpr(Expr):
+    __slots__ = ("left", "right", "op", "counter")
+    fields = ("left", "right", "op")
+    kind = NodeKind.BINARY.value
+
     def __init__(self, left: Expr, right: Expr, op: Token) -> None:
         self.left = left
         self.right = right
         self.op = op
+        # evaluations the interpreter counts before specializing the node
+        self.counter = 0
 
     def accept(self, visitor: VisitorExpr):
         return visitor.visit_binary(self)
@@ -27,9 +39,14 @@ class BinaryExpr(Expr):
 
 
 class UnaryExpr(Expr):
+    __slots__ = ("expr", "op", "counter")
+    fields = ("expr", "op")
+    kind = NodeKind.UNARY.value
+
     def __init__(self, expr: Expr, op: Token) -> None:
         self.expr = expr
         self.op = op
+        self.counter = 0
 
     def accept(self, visitor: VisitorExpr):
         return visitor.visit_unary(self)
@@ -38,7 +55,63 @@ class UnaryExpr(Expr):
         return f"<UnaryExpr(expr={repr(self.expr)}, op={repr(self.op)})>"
 
 
+class NumberBinaryExpr(BinaryExpr):
+    """BinaryExpr whose operands are known to be numbers, it runs without
+    checking them. Nodes are turned into it, and back, by type inference"""
+
+    __slots__ = ()
+    kind = NodeKind.NUMBER_BINARY.value
+
+    def accept(self, visitor: VisitorExpr):
+        return visitor.visit_number_binary(self)
+
+
+class NumberUnaryExpr(UnaryExpr):
+    """UnaryExpr whose operand is known to be a number"""
+
+    __slots__ = ()
+    kind = NodeKind.NUMBER_UNARY.value
+
+    def accept(self, visitor: VisitorExpr):
+        return visitor.visit_number_unary(self)
+
+
+class FloatBinaryExpr(BinaryExpr):
+    """BinaryExpr the interpreter saw compute over two numbers often enough
+    to expect them: it checks they are and turns back into a BinaryExpr
+    when they aren't. Nodes are only turned into it as they run"""
+
+    __slots__ = ()
+    kind = NodeKind.FLOAT_BINARY.value
+
+    def accept(self, visitor: VisitorExpr):
+        return visitor.visit_float_binary(self)
+
+
+class StringBinaryExpr(BinaryExpr):
+    """BinaryExpr the interpreter expects to concatenate two strings"""
+
+    __slots__ = ()
+    kind = NodeKind.STRING_BINARY.value
+
+    def accept(self, visitor: VisitorExpr):
+        return visitor.visit_string_binary(self)
+
+
+class FloatUnaryExpr(UnaryExpr):
+    """UnaryExpr the interpreter expects to negate a number"""
+
+    __slots__ = ()
+    kind = NodeKind.FLOAT_UNARY.value
+
+    def accept(self, visitor: VisitorExpr):
+        return visitor.visit_float_unary(self)
+
+
 class GroupingExpr(Expr):
+    __slots__ = fields = ("expr",)
+    kind = NodeKind.GROUPING.value
+
     def __init__(self, expr: Expr) -> None:
         self.expr = expr
 
@@ -50,6 +123,9 @@ class GroupingExpr(Expr):
 
 
 class LiteralExpr(Expr):
+    __slots__ = fields = ("literal",)
+    kind = NodeKind.LITERAL.value
+
     def __init__(self, literal: object) -> None:
         self.literal = literal
 
@@ -61,8 +137,21 @@ class LiteralExpr(Expr):
 
 
 class VariableExpr(Expr):
+    __slots__ = ("name", "depth", "slot", "boxed", "cell", "version", "counter")
+    fields = ("name",)
+    kind = NodeKind.VAREXPR.value
+
     def __init__(self, name: Token) -> None:
         self.name = name
+        # where the resolver found the variable: a depth of -1 is a global,
+        # -2 an upvalue, and a boxed local is kept in a cell
+        self.depth = -1
+        self.slot = -1
+        self.boxed = False
+        # cell of the global, valid while the globals are at this version
+        self.cell = None
+        self.version = -1
+        self.counter = 0
 
     def accept(self, visitor: VisitorExpr):
         return visitor.visit_varexpr(self)
@@ -71,10 +160,41 @@ class VariableExpr(Expr):
         return f"<VariableExpr(name={repr(self.name)})>"
 
 
+class LocalVariableExpr(VariableExpr):
+    """VariableExpr the interpreter found in the innermost scope, not
+    boxed, which it then reads with no lookup"""
+
+    __slots__ = ()
+    kind = NodeKind.LOCAL_VAREXPR.value
+
+    def accept(self, visitor: VisitorExpr):
+        return visitor.visit_local_varexpr(self)
+
+
+class GlobalVariableExpr(VariableExpr):
+    """VariableExpr the interpreter found to be a global, read from its
+    cached cell"""
+
+    __slots__ = ()
+    kind = NodeKind.GLOBAL_VAREXPR.value
+
+    def accept(self, visitor: VisitorExpr):
+        return visitor.visit_global_varexpr(self)
+
+
 class AssignExpr(Expr):
+    __slots__ = ("name", "value", "depth", "slot", "boxed", "cell", "version")
+    fields = ("name", "value")
+    kind = NodeKind.ASSIGNEXPR.value
+
     def __init__(self, name: Token, value: Expr) -> None:
         self.name = name
         self.value = value
+        self.depth = -1
+        self.slot = -1
+        self.boxed = False
+        self.cell = None
+        self.version = -1
 
     def accept(self, visitor: VisitorExpr):
         return visitor.visit_assignexpr(self)
@@ -84,6 +204,9 @@ class AssignExpr(Expr):
 
 
 class LogicalExpr(Expr):
+    __slots__ = fields = ("left", "op", "right")
+    kind = NodeKind.LOGICAL.value
+
     def __init__(self, left: Expr, op: Token, right: Expr) -> None:
         self.left = left
         self.op = op
@@ -97,10 +220,17 @@ class LogicalExpr(Expr):
 
 
 class CallExpr(Expr):
+    __slots__ = ("calle", "paren", "arguments", "function", "counter")
+    fields = ("calle", "paren", "arguments")
+    kind = NodeKind.CALL.value
+
     def __init__(self, calle: Expr, paren: Token, arguments: list[Expr]) -> None:
         self.calle = calle
         self.paren = paren
         self.arguments = arguments
+        # declaration of the functions a specialized call expects
+        self.function = None
+        self.counter = 0
 
     def accept(self, visitor: VisitorExpr):
         return visitor.visit_call(self)
@@ -110,3 +240,56 @@ class CallExpr(Expr):
         for arg in self.arguments:
             res += f"\n\targ={repr(arg)}"
         return res + ")>"
+
+
+class DirectCallExpr(CallExpr):
+    """CallExpr the interpreter saw call the same function declaration
+    often enough to expect it: it checks the callee is a function of that
+    declaration and calls it with no other check"""
+
+    __slots__ = ()
+    kind = NodeKind.DIRECT_CALL.value
+
+    def accept(self, visitor: VisitorExpr):
+        return visitor.visit_direct_call(self)
+
+
+class InvariantExpr(Expr):
+    __slots__ = ("expr", "value", "evaluated")
+    fields = ("expr",)
+    kind = NodeKind.INVARIANT.value
+
+    def __init__(self, expr: Expr) -> None:
+        self.expr = expr
+        # value of the first evaluation since the loop was entered
+        self.value = None
+        self.evaluated = False
+
+    def accept(self, visitor: VisitorExpr):
+        return visitor.visit_invariant(self)
+
+    def __repr__(self):
+        return f"<InvariantExpr(expr={repr(self.expr)})>"
+
+
+class InlineExpr(Expr):
+    __slots__ = ("arguments", "function", "expr")
+    fields = ("arguments",)
+    kind = NodeKind.INLINE.value
+
+    def __init__(self, arguments: list[Expr], function) -> None:
+        self.arguments = arguments
+        # the global function called, whose body is a single `trả về expr`:
+        # `expr` is evaluated with the arguments as the function's locals.
+        # It's resolved along with the function, so isn't a field
+        self.function = function
+        self.expr: Expr = function.body[0].value
+
+    def accept(self, visitor: VisitorExpr):
+        return visitor.visit_inline(self)
+
+    def __repr__(self):
+        res = f"<InlineExpr(\n\tfunction={self.function.name.lexeme}"
+        for arg in self.arguments:
+            res += f"\n\targ={repr(arg)}"
+        return res + ")>"
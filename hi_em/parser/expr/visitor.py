@@ -22,3 +22,33 @@ class VisitorExpr:
 
     def visit_call(self, expr):
         raise NotImplementedError
+
+    def visit_invariant(self, expr):
+        raise NotImplementedError
+
+    def visit_inline(self, expr):
+        raise NotImplementedError
+
+    def visit_number_binary(self, expr):
+        raise NotImplementedError
+
+    def visit_number_unary(self, expr):
+        raise NotImplementedError
+
+    def visit_float_binary(self, expr):
+        raise NotImplementedError
+
+    def visit_string_binary(self, expr):
+        raise NotImplementedError
+
+    def visit_float_unary(self, expr):
+        raise NotImplementedError
+
+    def visit_local_varexpr(self, expr):
+        raise NotImplementedError
+
+    def visit_global_varexpr(self, expr):
+        raise NotImplementedError
+
+    def visit_direct_call(self, expr):
+        raise NotImplementedError
@@ -0,0 +1,109 @@
+from ..interpreter import Interpreter
+from .expr.expr import Expr, BinaryExpr, LiteralExpr, LogicalExpr, UnaryExpr
+from .node_kind import NodeKind
+from .stmt.stmt import Stmt, FuncStmt
+from .traversal import rewrite
+
+LITERAL = NodeKind.LITERAL.value
+GROUPING = NodeKind.GROUPING.value
+UNARY = NodeKind.UNARY.value
+BINARY = NodeKind.BINARY.value
+LOGICAL = NodeKind.LOGICAL.value
+FUNCTION = NodeKind.FUNCTION.value
+
+
+def literal_key(value: object) -> tuple:
+    # 1.0 == True and 0.0 == -0.0, so the type and the exact bits are the key
+    if isinstance(value, float):
+        return (float, value.hex())
+    return (type(value), value)
+
+
+def hash_cons(statements: list[Stmt]) -> list[Stmt]:
+    """Share every repeated constant subtree of `statements`, in place"""
+    return HashConser().statements(statements)
+
+
+class HashConser:
+    """Replaces constant expressions by one shared instance per distinct tree.
+
+    A constant is a literal, or a grouping, unary, binary or logical
+    expression over constants. Only constants that evaluate without a
+    runtime error are shared: the error of one that doesn't reports the
+    line of its operator, which must stay its own. Function bodies that
+    aren't parsed yet are processed once they are.
+    """
+
+    def __init__(self) -> None:
+        # structural key -> shared node, children of a key are shared nodes
+        self.nodes: dict[tuple, Expr] = {}
+        # id of a shared node -> its value
+        self.values: dict[int, object] = {}
+        self.interpreter = Interpreter()
+
+    def statements(self, statements: list[Stmt]) -> list[Stmt]:
+        return [self.node(statement) for statement in statements]
+
+    def node(self, root: Expr | Stmt | None) -> Expr | Stmt | None:
+        if root is None:
+            return None
+        # children come first, their parent then points at what replaced them
+        return rewrite(root, self.replace, parse=False)
+
+    def replace(self, node: Expr | Stmt) -> Expr | Stmt:
+        if node.kind == FUNCTION and not node.parsed:
+            node.defer(self.function)
+        elif isinstance(node, Expr):
+            return self.constant(node)
+        return node
+
+    def function(self, function: FuncStmt):
+        function.body = self.statements(function.body)
+
+    def constant(self, expr: Expr) -> Expr:
+        values = self.values
+        kind = expr.kind
+        if kind == LITERAL:
+            key = (LITERAL, *literal_key(expr.literal))
+        elif kind == GROUPING and id(expr.expr) in values:
+            key = (GROUPING, id(expr.expr))
+        elif kind == UNARY and id(expr.expr) in values:
+            key = (UNARY, expr.op.type, id(expr.expr))
+        elif kind in (BINARY, LOGICAL) and (
+            id(expr.left) in values and id(expr.right) in values
+        ):
+            key = (kind, expr.op.type, id(expr.left), id(expr.right))
+        else:
+            return expr
+
+        shared = self.nodes.get(key)
+        if shared is not None:
+            return shared
+
+        try:
+            value = self.evaluate(expr)
+        except Exception:
+            return expr
+
+        self.nodes[key] = expr
+        values[id(expr)] = value
+        return expr
+
+    def evaluate(self, expr: Expr) -> object:
+        # operands are known already, evaluate the node over literals of them
+        values = self.values
+        interpreter = self.interpreter
+        kind = expr.kind
+        if kind == LITERAL:
+            return expr.literal
+        if kind == GROUPING:
+            return values[id(expr.expr)]
+        if kind == UNARY:
+            operand = LiteralExpr(values[id(expr.expr)])
+            return interpreter.visit_unary(UnaryExpr(operand, expr.op))
+
+        left = LiteralExpr(values[id(expr.left)])
+        right = LiteralExpr(values[id(expr.right)])
+        if kind == BINARY:
+            return interpreter.visit_binary(BinaryExpr(left, right, expr.op))
+        return interpreter.visit_logical(LogicalExpr(left, expr.op, right))
@@ -0,0 +1,174 @@
+from ..scanner.scanner import Scanner, lookahead, make_token
+from ..scanner.token import Token
+from ..scanner.token_type import TokenType
+from .parser import Parser
+from .stmt.stmt import Stmt
+
+
+class SpanScanner(Scanner):
+    """Scanner starting anywhere in the source and recording
+    the offsets of every token, scanning is driven by the caller"""
+
+    def __init__(self, source: str, start: int = 0, line: int = 1) -> None:
+        self.start = start
+        self.current = start
+        self.line = line
+
+        self.source = source
+        self.tokens: list[Token] = []
+        self.spans: list[tuple[int, int]] = []
+
+    def add_token(self, token_type: TokenType):
+        text = self.source[self.start : self.current]
+        self.tokens.append(make_token(token_type, text, self.line))
+        self.spans.append((self.start, self.current))
+
+
+class Declaration:
+    """Top-level statement with the tokens it was parsed from,
+    token spans are relative to `start` so shifting it moves them all"""
+
+    __slots__ = ("stmt", "start", "tokens", "spans")
+
+    def __init__(
+        self, stmt: Stmt, start: int, tokens: list[Token], spans: list[tuple[int, int]]
+    ) -> None:
+        self.stmt = stmt
+        self.start = start
+        self.tokens = tokens
+        self.spans = spans
+
+    @property
+    def end(self) -> int:
+        return self.start + self.spans[-1][1]
+
+
+class TokenChain:
+    """Tokens of a rescanned region followed, on demand, by those of the
+    untouched declarations after it, for `Parser` to run into"""
+
+    def __init__(
+        self,
+        tokens: list[Token],
+        spans: list[tuple[int, int]],
+        declarations: list[Declaration],
+        line: int,
+    ) -> None:
+        self.tokens = tokens
+        self.spans = spans
+        self.declarations = declarations
+        self.pulled = 0
+        self.eof = Token(TokenType.EOF, "", None, line)
+
+        # token index -> untouched declaration starting there
+        self.boundaries = {len(tokens): 0}
+
+    def __getitem__(self, index: int) -> Token:
+        while index >= len(self.tokens) and self.pulled < len(self.declarations):
+            declaration = self.declarations[self.pulled]
+            self.tokens.extend(declaration.tokens)
+            self.spans.extend(
+                (declaration.start + start, declaration.start + end)
+                for start, end in declaration.spans
+            )
+            self.pulled += 1
+            self.boundaries[len(self.tokens)] = self.pulled
+
+        if index >= len(self.tokens):
+            return self.eof
+        return self.tokens[index]
+
+
+class IncrementalParser:
+    """Front end for editors: after an edit only the top-level declarations
+    around it are scanned and parsed again, the others are reused as is"""
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+
+        scanner = SpanScanner(source)
+        for token_type in scanner.lex():
+            scanner.add_token(token_type)
+        self.declarations = self.parse(
+            TokenChain(scanner.tokens, scanner.spans, [], scanner.line)
+        )
+
+    @property
+    def statements(self) -> list[Stmt]:
+        return [declaration.stmt for declaration in self.declarations]
+
+    def edit(self, start: int, end: int, text: str) -> list[Stmt]:
+        """Replace `source[start:end]` with `text`, return the new statements"""
+        old = self.declarations
+        self.source = self.source[:start] + text + self.source[end:]
+        delta = len(text) - (end - start)
+
+        # declarations touching the edited range, [first, last); a lexeme
+        # ending just before it may grow into a multi-word keyword, and the
+        # declaration before that may have peeked at the changed tokens
+        first = 0
+        while first < len(old) and old[first].end < start - lookahead:
+            first += 1
+        last = first
+        while last < len(old) and old[last].start <= end:
+            last += 1
+        first = max(first - 1, 0)
+
+        region_start = old[first - 1].end if first > 0 else 0
+        line = old[first - 1].tokens[-1].line if first > 0 else 1
+
+        # rescan up to the first untouched declaration whose first token
+        # comes out of the scanner unchanged
+        scanner = SpanScanner(self.source, region_start, line)
+        for token_type in scanner.lex():
+            while last < len(old) and scanner.start > old[last].start + delta:
+                last += 1
+            if last < len(old) and scanner.start == old[last].start + delta:
+                break
+            scanner.add_token(token_type)
+        else:
+            last = len(old)
+
+        # the untouched declarations move with the edit, their tokens are
+        # only visited when the number of lines changed
+        line_delta = scanner.line - old[last].tokens[0].line if last < len(old) else 0
+        for declaration in old[last:]:
+            declaration.start += delta
+            if line_delta:
+                for token in declaration.tokens:
+                    token.line += line_delta
+
+        chain = TokenChain(scanner.tokens, scanner.spans, old[last:], scanner.line)
+        self.declarations = old[:first] + self.parse(chain)
+        return self.statements
+
+    def parse(self, chain: TokenChain) -> list[Declaration]:
+        """Parse declarations from the chain until one ends
+        where an untouched declaration starts, then reuse the rest"""
+        parser = Parser(chain)
+
+        declarations = []
+        while parser.current not in chain.boundaries:
+            begin = parser.current
+            stmt = parser.declaration()
+            if parser.current == begin:
+                # nothing could be parsed here, skip the offending token
+                parser.advance()
+
+            offset = chain.spans[begin][0]
+            declarations.append(
+                Declaration(
+                    stmt,
+                    offset,
+                    chain.tokens[begin : parser.current],
+                    [
+                        (start - offset, end - offset)
+                        for start, end in chain.spans[begin : parser.current]
+                    ],
+                )
+            )
+
+            if parser.is_end():
+                return declarations
+
+        return declarations + chain.declarations[chain.boundaries[parser.current] :]
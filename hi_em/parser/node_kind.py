@@ -0,0 +1,48 @@
+from enum import IntEnum
+
+
+class NodeKind(IntEnum):
+    """Integer tag of every AST node class,
+    `visit_<name in lower case>` is the visitor method for it"""
+
+    # expression
+    BINARY = 0
+    UNARY = 1
+    GROUPING = 2
+    LITERAL = 3
+    VAREXPR = 4
+    ASSIGNEXPR = 5
+    LOGICAL = 6
+    CALL = 7
+    INVARIANT = 8
+    INLINE = 9
+    NUMBER_BINARY = 10
+    NUMBER_UNARY = 11
+
+    # statement
+    PRINT = 12
+    VARSTMT = 13
+    EXPRESSION = 14
+    BLOCK = 15
+    IF = 16
+    WHILE = 17
+    FOR = 18
+    RANGE = 19
+    FUNCTION = 20
+    RETURN = 21
+    BREAK = 22
+    CONTINUE = 23
+
+    # expressions the interpreter specialized for the values it saw them
+    # evaluate to, until they evaluate to others
+    FLOAT_BINARY = 24
+    STRING_BINARY = 25
+    FLOAT_UNARY = 26
+    LOCAL_VAREXPR = 27
+    GLOBAL_VAREXPR = 28
+    DIRECT_CALL = 29
+
+
+def dispatch_table(visitor: object) -> list:
+    """Visit methods of `visitor` indexed by node kind"""
+    return [getattr(visitor, f"visit_{kind.name.lower()}", None) for kind in NodeKind]
@@ -1,5 +1,11 @@
+from enum import IntEnum
+from types import GeneratorType
+from typing import Generator
+
 from ..scanner.token import Token
+from ..scanner.stream import TokenStream
 from ..scanner.token_type import TokenType
+from .hashcons import literal_key
 from .expr.expr import (
     Expr,
     BinaryExpr,
@@ -19,8 +25,12 @@ from .stmt.stmt import (
     BlockStmt,
     IfStmt,
     WhileStmt,
+    ForStmt,
+    RangeStmt,
     FuncStmt,
     ReturnStmt,
+    BreakStmt,
+    ContinueStmt,
 )
 
 
@@ -28,10 +38,33 @@ class ParserError(RuntimeError):
     """Error when parsing"""
 
 
+class Precedence(IntEnum):
+    NONE = 0
+    ASSIGNMENT = 1  # =
+    OR = 2  # hoặc
+    AND = 3  # và
+    EQUALITY = 4  # == !=
+    COMPARISON = 5  # < > <= >=
+    TERM = 6  # + -
+    FACTOR = 7  # * /
+    UNARY = 8  # ! -
+    CALL = 9  # ()
+
+
+no_rule = (None, None, Precedence.NONE)
+
+
 class Parser:
-    def __init__(self, tokens: list[Token]) -> None:
+    def __init__(self, tokens: list[Token] | TokenStream, lazy: bool = False) -> None:
         self.tokens = tokens
         self.current = 0
+        # only brace-match function bodies, they are parsed on first use
+        self.lazy = lazy
+        # number of loops around the statement being parsed, in its function
+        self.loops = 0
+
+        # literals are immutable, one node per distinct value is enough
+        self.literals: dict[tuple, LiteralExpr] = {}
 
     def parse(self) -> list[Stmt]:
         # try:
@@ -48,106 +81,125 @@ class Parser:
     # Expression
     # --------------------
 
-    # expression     → equality ;
+    # expression     → assignment ;
     def expression(self) -> Expr:
-        return self.assignment()
-
-    #     assignment     → IDENTIFIER "=" assignment
-    #                    | logic_or ;
-    def assignment(self) -> Expr:
-        expr = self.logic_or()
-
-        if self.match(TokenType.EQUAL):
-            token = self.previous()
-            value = self.assignment()
+        return self.parse_precedence(Precedence.ASSIGNMENT)
+
+    # every operator is parsed here: a prefix rule for the first token,
+    # then infix rules for as long as they bind at least as tight as `precedence`.
+    # A rule needing an operand is a generator: it yields the precedence to
+    # parse the operand at and gets the operand sent back. Meanwhile it waits
+    # on `pending` with the precedence it was called at, so nesting costs
+    # no Python stack however deep it goes
+    def parse_precedence(self, precedence: Precedence) -> Expr:
+        rules = self.rules
+        pending: list[tuple[Precedence, Generator]] = []
 
-            if isinstance(expr, VariableExpr):
-                name = expr.name
-                return AssignExpr(name, value)
-            else:
-                from hi_em.hi_em import HiEm
-
-                HiEm.error_token(token, "Invalid assignment target.")
+        while True:
+            token = self.peek()
+            prefix = rules.get(token.type, no_rule)[0]
+            if prefix is None:
+                self.error(token, "Expect expression.")
+
+            self.advance()
+            expr = prefix(self)
+
+            while True:
+                if type(expr) is GeneratorType:
+                    rule, operand = expr, None
+                else:
+                    infix = rules.get(self.peek().type, no_rule)
+                    if precedence <= infix[2]:
+                        self.advance()
+                        expr = infix[1](self, expr)
+                        continue
+
+                    if not pending:
+                        return expr
+                    precedence, rule = pending.pop()
+                    operand = expr
+
+                try:
+                    operand_precedence = rule.send(operand)
+                except StopIteration as done:
+                    expr = done.value
+                    continue
+
+                pending.append((precedence, rule))
+                precedence = operand_precedence
+                break
 
+    # primary        → NUMBER | STRING | "true" | "false" | "nil"
+    #                | IDENTIFIER ;
+    def primary(self) -> Expr:
+        token = self.previous()
+        match token.type:
+            case TokenType.NIL:
+                return self.literal(None)
+            case TokenType.TRUE:
+                return self.literal(True)
+            case TokenType.FALSE:
+                return self.literal(False)
+            case TokenType.IDENTIFIER:
+                return VariableExpr(token)
+        return self.literal(token.literal)
+
+    def literal(self, value: object) -> LiteralExpr:
+        key = literal_key(value)
+        expr = self.literals.get(key)
+        if expr is None:
+            expr = self.literals[key] = LiteralExpr(value)
         return expr
 
-    # equality       → comparison ( ( "!=" | "==" ) comparison )* ;
-    def equality(self) -> Expr:
-        expr = self.comparision()
-
-        while self.match(TokenType.BANG_EQUAL, TokenType.EQUAL_EQUAL):
-            op = self.previous()
-            right = self.comparision()
-            expr = BinaryExpr(expr, right, op)
+    # grouping       → "(" expression ")" ;
+    def grouping(self) -> Generator:
+        expr = yield Precedence.ASSIGNMENT
+        self.consume(TokenType.RIGHT_BRACE, "Expect ')' after expression.")
+        return GroupingExpr(expr)
 
-        return expr
+    # unary          → ( "!" | "-" ) unary | call ;
+    def unary(self) -> Generator:
+        op = self.previous()
+        expr = yield Precedence.UNARY
+        return UnaryExpr(expr, op)
 
+    # equality       → comparison ( ( "!=" | "==" ) comparison )* ;
     # comparison     → term ( ( ">" | ">=" | "<" | "<=" ) term )* ;
-    def comparision(self) -> Expr:
-        expr = self.term()
-
-        while self.match(
-            TokenType.LESS,
-            TokenType.LESS_EQUAL,
-            TokenType.GREATER,
-            TokenType.GREATER_EQUAL,
-        ):
-            op = self.previous()
-            right = self.term()
-            expr = BinaryExpr(expr, right, op)
-
-        return expr
-
     # term           → factor ( ( "-" | "+" ) factor )* ;
-    def term(self) -> Expr:
-        expr = self.factor()
-
-        while self.match(TokenType.MINUS, TokenType.PLUS):
-            op = self.previous()
-            right = self.factor()
-            expr = BinaryExpr(expr, right, op)
-
-        return expr
-
     # factor         → unary ( ( "/" | "*" ) unary )* ;
-    def factor(self) -> Expr:
-        expr = self.unary()
-
-        while self.match(TokenType.SLASH, TokenType.STAR):
-            op = self.previous()
-            right = self.unary()
-            expr = BinaryExpr(expr, right, op)
+    def binary(self, left: Expr) -> Generator:
+        op = self.previous()
+        right = yield self.rules[op.type][2] + 1
+        return BinaryExpr(left, right, op)
 
-        return expr
-
-    # unary          → ( "!" | "-" ) unary
-    #                | primary ;
-    def unary(self) -> Expr:
-        if self.match(TokenType.BANG, TokenType.MINUS):
-            op = self.previous()
-            expr = self.unary()
-            return UnaryExpr(expr, op)
+    # logic_or       → logic_and ( "or" logic_and )* ;
+    # logic_and      → equality ( "and" equality )* ;
+    def logical(self, left: Expr) -> Generator:
+        op = self.previous()
+        right = yield self.rules[op.type][2] + 1
+        return LogicalExpr(left, op, right)
 
-        return self.call()
+    # assignment     → IDENTIFIER "=" assignment
+    #                | logic_or ;
+    def assignment(self, target: Expr) -> Generator:
+        token = self.previous()
+        value = yield Precedence.ASSIGNMENT
 
-    # call           → primary ( "(" arguments? ")" )* ;
-    def call(self) -> Expr:
-        expr = self.primary()
+        if isinstance(target, VariableExpr):
+            return AssignExpr(target.name, value)
 
-        while True:
-            if self.match(TokenType.LEFT_BRACE):
-                expr = self.finish_call(expr)
-            else:
-                break
+        from ..hi_em import HiEm
 
-        return expr
+        HiEm.error_token(token, "Invalid assignment target.")
+        return target
 
+    # call           → primary ( "(" arguments? ")" )* ;
     # arguments      → expression ( "," expression )* ;
-    def finish_call(self, calle: Expr):
+    def call(self, calle: Expr) -> Generator:
         arguments = []
 
         if not self.check(TokenType.RIGHT_BRACE):
-            arguments.append(self.expression())
+            arguments.append((yield Precedence.ASSIGNMENT))
 
             while self.match(TokenType.COMMA):
 
@@ -156,59 +208,37 @@ class Parser:
 
                     HiEm.error_token(self.peek(), "Can't have more than 10 arguments.")
 
-                arguments.append(self.expression())
+                arguments.append((yield Precedence.ASSIGNMENT))
 
         paren = self.consume(TokenType.RIGHT_BRACE, "Expected ')' after arguments.")
 
         return CallExpr(calle, paren, arguments)
 
-    # primary        → NUMBER | STRING | "true" | "false" | "nil"
-    #                | "(" expression ")" ;
-    #                | IDENTIFIER ;
-    def primary(self) -> Expr:
-        if self.match(TokenType.NIL):
-            return LiteralExpr(None)
-
-        if self.match(TokenType.TRUE):
-            return LiteralExpr(True)
-
-        if self.match(TokenType.FALSE):
-            return LiteralExpr(False)
-
-        if self.match(TokenType.NUMBER, TokenType.STRING):
-            return LiteralExpr(self.previous().literal)
-
-        if self.match(TokenType.LEFT_BRACE):
-            expr = self.expression()
-            self.consume(TokenType.RIGHT_BRACE, "Expect ')' after expression.")
-            return GroupingExpr(expr)
-
-        if self.match(TokenType.IDENTIFIER):
-            return VariableExpr(self.previous())
-
-        self.error(self.peek(), "Expect expression.")
-
-    # logic_or       → logic_and ( "or" logic_and )* ;
-    def logic_or(self):
-        expr = self.logic_and()
-
-        if self.match(TokenType.OR):
-            op = self.previous()
-            right = self.logic_and()
-            expr = LogicalExpr(expr, op, right)
-
-        return expr
-
-    # logic_and      → equality ( "and" equality )* ;
-    def logic_and(self):
-        expr = self.equality()
-
-        if self.match(TokenType.AND):
-            op = self.previous()
-            right = self.equality()
-            expr = LogicalExpr(expr, op, right)
-
-        return expr
+    # token type → (prefix rule, infix rule, precedence of the infix rule),
+    # the one place to add an operator
+    rules = {
+        TokenType.LEFT_BRACE: (grouping, call, Precedence.CALL),
+        TokenType.MINUS: (unary, binary, Precedence.TERM),
+        TokenType.PLUS: (None, binary, Precedence.TERM),
+        TokenType.SLASH: (None, binary, Precedence.FACTOR),
+        TokenType.STAR: (None, binary, Precedence.FACTOR),
+        TokenType.BANG: (unary, None, Precedence.NONE),
+        TokenType.BANG_EQUAL: (None, binary, Precedence.EQUALITY),
+        TokenType.EQUAL: (None, assignment, Precedence.ASSIGNMENT),
+        TokenType.EQUAL_EQUAL: (None, binary, Precedence.EQUALITY),
+        TokenType.GREATER: (None, binary, Precedence.COMPARISON),
+        TokenType.GREATER_EQUAL: (None, binary, Precedence.COMPARISON),
+        TokenType.LESS: (None, binary, Precedence.COMPARISON),
+        TokenType.LESS_EQUAL: (None, binary, Precedence.COMPARISON),
+        TokenType.AND: (None, logical, Precedence.AND),
+        TokenType.OR: (None, logical, Precedence.OR),
+        TokenType.IDENTIFIER: (primary, None, Precedence.NONE),
+        TokenType.STRING: (primary, None, Precedence.NONE),
+        TokenType.NUMBER: (primary, None, Precedence.NONE),
+        TokenType.TRUE: (primary, None, Precedence.NONE),
+        TokenType.FALSE: (primary, None, Precedence.NONE),
+        TokenType.NIL: (primary, None, Precedence.NONE),
+    }
 
     # --------------------
     # Statement
@@ -255,13 +285,21 @@ class Parser:
 
         # body
         self.consume(TokenType.LEFT_PAREN, "Expect '{' after " + f"{kind} body")
-        body = self.block()
+        if self.lazy:
+            return FuncStmt(name, params, None, self.skip_block())
+        # loops around the declaration aren't around the body
+        loops, self.loops = self.loops, 0
+        try:
+            body = self.block()
+        finally:
+            self.loops = loops
 
         return FuncStmt(name, params, body)
 
     # varDecl        → "var" IDENTIFIER ( "=" expression )? ";" ;
-    def var_declaration(self):
-        name = self.consume(TokenType.IDENTIFIER, "Expect variable name.")
+    def var_declaration(self, name: Token | None = None):
+        if name is None:
+            name = self.consume(TokenType.IDENTIFIER, "Expect variable name.")
 
         initializer = None
         if self.match(TokenType.EQUAL):
@@ -293,6 +331,9 @@ class Parser:
         if self.match(TokenType.RETURN):
             return self.return_statement()
 
+        if self.match(TokenType.BREAK, TokenType.CONTINUE):
+            return self.jump_statement()
+
         return self.expr_statement()
 
     # printStmt      → "print" expression ";" ;
@@ -315,6 +356,28 @@ class Parser:
         self.consume(TokenType.RIGHT_PAREN, "Expect '}' after block.")
         return statements
 
+    # tokens of a block up to its closing "}", followed by an EOF for
+    # the parser that will parse them
+    def skip_block(self) -> list[Token]:
+        tokens = []
+        depth = 1
+        token = self.peek()
+        while token.type is not TokenType.EOF:
+            tokens.append(token)
+            self.current += 1
+
+            if token.type is TokenType.LEFT_PAREN:
+                depth += 1
+            elif token.type is TokenType.RIGHT_PAREN:
+                depth -= 1
+                if depth == 0:
+                    tokens.append(Token(TokenType.EOF, "", None, token.line))
+                    return tokens
+
+            token = self.peek()
+
+        self.consume(TokenType.RIGHT_PAREN, "Expect '}' after block.")
+
     # ifStmt         → "if" "(" expression ")" statement
     #            ( "else" statement )? ;
     def if_statement(self):
@@ -335,12 +398,15 @@ class Parser:
         self.consume(TokenType.LEFT_BRACE, "Expect '(' after 'while'")
         condition = self.expression()
         self.consume(TokenType.RIGHT_BRACE, "Expect ')' after while loop")
-        body = self.statement()
+        body = self.loop_body()
         return WhileStmt(condition, body)
 
     # forStmt      → "for" "(" ( varDecl | exprStmt | ";" )
     #              expression? ";"
-    #              expression? ")" statement ;
+    #              expression? ")" statement
+    #              | "for" "(" "var" IDENTIFIER "range"
+    #              "(" expression "," expression ( "," expression )? ")"
+    #              ")" statement ;
     def for_statement(self):
         self.consume(TokenType.LEFT_BRACE, "Expect '(' after 'for'")
 
@@ -348,7 +414,10 @@ class Parser:
         if self.match(TokenType.SEMICOLON):
             initializer = None
         elif self.match(TokenType.VAR):
-            initializer = self.var_declaration()
+            name = self.consume(TokenType.IDENTIFIER, "Expect variable name.")
+            if self.match(TokenType.RANGE):
+                return self.range_statement(name)
+            initializer = self.var_declaration(name)
         else:
             initializer = self.statement()
 
@@ -362,19 +431,26 @@ class Parser:
             increment = self.expression()
         self.consume(TokenType.RIGHT_BRACE, "Expect ')' after for clauses.")
 
-        body = self.statement()
-
-        if increment is not None:
-            body = BlockStmt([body, ExprStmt(increment)])
+        body = self.loop_body()
 
         if condition is None:
-            condition = LiteralExpr(True)
-        body = WhileStmt(condition, body)
+            condition = self.literal(True)
+        return ForStmt(initializer, condition, increment, body)
 
-        if initializer is not None:
-            body = BlockStmt([initializer, body])
+    def range_statement(self, name: Token):
+        keyword = self.previous()
+        self.consume(TokenType.LEFT_BRACE, "Expect '(' after 'range'.")
+        start = self.expression()
+        self.consume(TokenType.COMMA, "Expect ',' after range start.")
+        stop = self.expression()
+        step = None
+        if self.match(TokenType.COMMA):
+            step = self.expression()
+        self.consume(TokenType.RIGHT_BRACE, "Expect ')' after range.")
+        self.consume(TokenType.RIGHT_BRACE, "Expect ')' after for clauses.")
 
-        return body
+        body = self.loop_body()
+        return RangeStmt(name, keyword, start, stop, step, body)
 
     def return_statement(self):
         keyword = self.previous()
@@ -386,6 +462,28 @@ class Parser:
         self.consume(TokenType.SEMICOLON, "Expected ';' after return value.")
         return ReturnStmt(keyword, value)
 
+    def loop_body(self) -> Stmt:
+        self.loops += 1
+        try:
+            return self.statement()
+        finally:
+            self.loops -= 1
+
+    # breakStmt      → "break" ";" ;
+    # continueStmt   → "continue" ";" ;
+    def jump_statement(self):
+        keyword = self.previous()
+        if not self.loops:
+            from ..hi_em import HiEm
+
+            HiEm.error_token(
+                keyword, f"Can't use '{keyword.lexeme}' outside of a loop."
+            )
+        self.consume(TokenType.SEMICOLON, f"Expect ';' after '{keyword.lexeme}'.")
+        if keyword.type == TokenType.BREAK:
+            return BreakStmt(keyword)
+        return ContinueStmt(keyword)
+
     # --------------------
     # Utils
     # --------------------
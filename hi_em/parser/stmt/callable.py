@@ -1,7 +1,8 @@
 from .stmt import FuncStmt
-from .environment import Environment
+from .environment import Cell, Environment
 
 from datetime import datetime
+from itertools import repeat
 
 
 class HiEmCallable:
@@ -22,24 +23,66 @@ class HiEmCallable:
             return calle
 
 
+# frames kept for reuse by each function, enough for shallow recursion
+max_free_frames = 16
+
+
 class HiEmFunction(HiEmCallable):
-    def __init__(self, declaration: FuncStmt) -> None:
+    def __init__(self, declaration: FuncStmt, upvalues: list[Cell] = None) -> None:
         self.declaration = declaration
+        # cells of the variables of enclosing functions the body uses
+        self.upvalues: list[Cell] = upvalues or []
+        # frames of returned calls: nothing outlives a call that could still
+        # reach them, so they are reset and handed to the next call
+        self.free_frames: list[Environment] = []
 
     def call(self, interpreter, arguments: list[object]) -> object:
-        environment = Environment()
-
-        for i in range(len(self.declaration.params)):
-            environment.define(self.declaration.params[i].lexeme, arguments[i])
-
-        from ...interpreter import ReturnError
-
+        from ...interpreter import RETURN, TAIL_CALL
+
+        function = self
+        while True:
+            status = function.run(interpreter, arguments)
+            if status != TAIL_CALL:
+                return interpreter.returned if status == RETURN else None
+            # the call the body returns, made in place of this one
+            function, arguments = interpreter.tail_call
+
+    def run(self, interpreter, arguments: list[object]) -> int | None:
+        if not self.declaration.parsed:
+            self.parse_body()
+
+        # globals are found by name and captured variables in upvalues, the
+        # function's scope encloses nothing
+        if self.free_frames:
+            environment = self.free_frames.pop()
+        else:
+            environment = Environment(None, self.declaration.size)
+        values = environment.values
+        values[: len(arguments)] = arguments
+        for slot in self.declaration.cells:
+            values[slot] = Cell(values[slot])
+
+        upvalues = interpreter.upvalues
+        interpreter.upvalues = self.upvalues
         try:
-            interpreter.execute_block(self.declaration.body, environment)
-        except ReturnError as err:
-            return err.value
-
-        return None
+            return interpreter.execute_body(self.declaration, environment)
+        finally:
+            interpreter.upvalues = upvalues
+            if len(self.free_frames) < max_free_frames:
+                # don't keep the locals of the call alive
+                values[:] = repeat(None, len(values))
+                self.free_frames.append(environment)
+
+    def parse_body(self):
+        from ...hi_em import HiEm
+        from ...interpreter import InterpreterError
+
+        # the errors are reported as the body is parsed
+        self.declaration.body
+        if HiEm.had_error:
+            raise InterpreterError(
+                "Function body has syntax errors.", self.declaration.name
+            )
 
     def arity(self) -> int:
         return len(self.declaration.params)
@@ -1,35 +1,74 @@
 from __future__ import annotations
+from itertools import count
+
 from ...scanner.token import Token
 
 
 class Environment:
-    def __init__(self, enclosing: Environment = None) -> None:
-        self.values: dict[str, object] = {}
+    """Variables of one local scope, in the slots the resolver gave them"""
+
+    __slots__ = ("values", "enclosing")
+
+    def __init__(self, enclosing: Environment = None, size: int = 0) -> None:
+        self.values: list[object] = [None] * size
         self.enclosing: Environment = enclosing
 
-    def define(self, name: str, value: object):
-        self.values[name] = value
+    def ancestor(self, depth: int) -> Environment:
+        env = self
+        for _ in range(depth):
+            env = env.enclosing
+        return env
 
-    def get(self, name: Token):
-        if name.lexeme in self.values:
-            return self.values[name.lexeme]
+    def get_at(self, depth: int, slot: int) -> object:
+        return self.ancestor(depth).values[slot]
 
-        if self.enclosing is not None:
-            return self.enclosing.get(name)
+    def assign_at(self, depth: int, slot: int, value: object):
+        self.ancestor(depth).values[slot] = value
 
-        from ...interpreter import InterpreterError
 
-        raise InterpreterError(f"Undefined variable '{name.lexeme}'.", name)
+class Cell:
+    """Box holding one variable, for those referred to from elsewhere"""
 
-    def assign(self, name: Token, value: object):
-        if name.lexeme in self.values:
-            self.values[name.lexeme] = value
-            return
+    __slots__ = ("value",)
+
+    def __init__(self, value: object = None) -> None:
+        self.value = value
+
+
+# every version of every global environment is a different number
+versions = count()
 
-        if self.enclosing is not None:
-            self.enclosing.assign(name, value)
-            return
 
-        from ...interpreter import InterpreterError
+class GlobalEnvironment:
+    """Top-level variables, by name: functions may use them before they
+    are declared, so they can't be given slots up front. Each has a cell
+    that uses may cache, they stay valid for as long as `version` doesn't
+    change, that is until a new name is defined"""
 
-        raise InterpreterError(f"Undefined variable '{name.lexeme}'.", name)
+    __slots__ = ("cells", "version")
+
+    def __init__(self) -> None:
+        self.cells: dict[str, Cell] = {}
+        self.version = next(versions)
+
+    def define(self, name: str, value: object):
+        cell = self.cells.get(name)
+        if cell is None:
+            self.cells[name] = Cell(value)
+            self.version = next(versions)
+        else:
+            cell.value = value
+
+    def cell(self, name: Token) -> Cell:
+        cell = self.cells.get(name.lexeme)
+        if cell is None:
+            from ...interpreter import InterpreterError
+
+            raise InterpreterError(f"Undefined variable '{name.lexeme}'.", name)
+        return cell
+
+    def get(self, name: Token):
+        return self.cell(name).value
+
+    def assign(self, name: Token, value: object):
+        self.cell(name).value = value
@@ -1,9 +1,17 @@
-from ..expr.expr import Expr
+from typing import Callable
+
+from ..expr.expr import Expr, InvariantExpr
+from ..node_kind import NodeKind
 from .visitor import VisitorStmt
 from ...scanner.token import Token
 
 
 class Stmt:
+    __slots__ = ()
+
+    kind: int
+    fields: tuple[str, ...]
+
     def accept(self, visitor: VisitorStmt):
         raise NotImplementedError
 
@@ -15,6 +23,9 @@ class Stmt:
 
 
 class PrintStmt(Stmt):
+    __slots__ = fields = ("expr",)
+    kind = NodeKind.PRINT.value
+
     def __init__(self, expr: Expr) -> None:
         self.expr = expr
 
@@ -26,9 +37,17 @@ class PrintStmt(Stmt):
 
 
 class VarStmt(Stmt):
+    __slots__ = ("name", "initializer", "slot", "boxed")
+    fields = ("name", "initializer")
+    kind = NodeKind.VARSTMT.value
+
     def __init__(self, name: Token, initializer: Expr) -> None:
         self.initializer = initializer
         self.name = name
+        # slot given by the resolver, -1 declares a global, and whether
+        # the variable is captured and so kept in a cell
+        self.slot = -1
+        self.boxed = False
 
     def accept(self, visitor: VisitorStmt):
         return visitor.visit_varstmt(self)
@@ -38,6 +57,9 @@ class VarStmt(Stmt):
 
 
 class ExprStmt(Stmt):
+    __slots__ = fields = ("expr",)
+    kind = NodeKind.EXPRESSION.value
+
     def __init__(self, expr: Expr) -> None:
         self.expr = expr
 
@@ -49,8 +71,15 @@ class ExprStmt(Stmt):
 
 
 class BlockStmt(Stmt):
+    __slots__ = ("statements", "size")
+    fields = ("statements",)
+    kind = NodeKind.BLOCK.value
+
     def __init__(self, statements: list[Stmt]) -> None:
         self.statements = statements
+        # number of variables declared in the block, counted by the resolver,
+        # a block declaring none has no environment of its own
+        self.size = 0
 
     def accept(self, visitor: VisitorStmt):
         return visitor.visit_block(self)
@@ -63,6 +92,9 @@ class BlockStmt(Stmt):
 
 
 class IfStmt(Stmt):
+    __slots__ = fields = ("condition", "then_branch", "else_branch")
+    kind = NodeKind.IF.value
+
     def __init__(self, condition: Expr, then_branch: Stmt, else_branch: Stmt) -> None:
         self.condition = condition
         self.then_branch = then_branch
@@ -76,9 +108,16 @@ class IfStmt(Stmt):
 
 
 class WhileStmt(Stmt):
+    __slots__ = ("condition", "body", "invariants")
+    fields = ("condition", "body")
+    kind = NodeKind.WHILE.value
+
     def __init__(self, condition: Expr, body: Stmt) -> None:
         self.condition = condition
         self.body = body
+        # expressions the optimizer found not to change while the loop runs,
+        # evaluated again each time it's entered
+        self.invariants: list[InvariantExpr] = []
 
     def accept(self, visitor: VisitorStmt):
         return visitor.visit_while(self)
@@ -87,20 +126,199 @@ class WhileStmt(Stmt):
         return f"<WhileStmt(condition={repr(self.condition)}, body={repr(self.body)})>"
 
 
+class ForStmt(Stmt):
+    __slots__ = (
+        "initializer",
+        "condition",
+        "increment",
+        "body",
+        "size",
+        "step",
+        "invariants",
+    )
+    fields = ("initializer", "condition", "increment", "body")
+    kind = NodeKind.FOR.value
+
+    def __init__(
+        self,
+        initializer: Stmt | None,
+        condition: Expr,
+        increment: Expr | None,
+        body: Stmt,
+    ) -> None:
+        self.initializer = initializer
+        self.condition = condition
+        self.increment = increment
+        self.body = body
+        # given by the resolver: the number of variables the initializer
+        # declares, and the step of a loop counting a number up or down
+        # to a bound it can read once, None for other loops
+        self.size = 0
+        self.step: float | None = None
+        self.invariants: list[InvariantExpr] = []
+
+    def accept(self, visitor: VisitorStmt):
+        return visitor.visit_for(self)
+
+    def __repr__(self):
+        return (
+            f"<ForStmt(initializer={repr(self.initializer)}, "
+            f"condition={repr(self.condition)}, increment={repr(self.increment)}, "
+            f"body={repr(self.body)})>"
+        )
+
+
+class RangeStmt(Stmt):
+    __slots__ = (
+        "name",
+        "keyword",
+        "start",
+        "stop",
+        "step",
+        "body",
+        "boxed",
+        "invariants",
+    )
+    fields = ("name", "keyword", "start", "stop", "step", "body")
+    kind = NodeKind.RANGE.value
+
+    def __init__(
+        self,
+        name: Token,
+        keyword: Token,
+        start: Expr,
+        stop: Expr,
+        step: Expr | None,
+        body: Stmt,
+    ) -> None:
+        self.name = name
+        self.keyword = keyword
+        self.start = start
+        self.stop = stop
+        self.step = step
+        self.body = body
+        # the variable is alone in the loop's scope, whether it's captured
+        self.boxed = False
+        self.invariants: list[InvariantExpr] = []
+
+    def accept(self, visitor: VisitorStmt):
+        return visitor.visit_range(self)
+
+    def __repr__(self):
+        return (
+            f"<RangeStmt(name={repr(self.name)}, start={repr(self.start)}, "
+            f"stop={repr(self.stop)}, step={repr(self.step)}, body={repr(self.body)})>"
+        )
+
+
 class FuncStmt(Stmt):
-    def __init__(self, name: Token, params: list[Token], body: list[Stmt]) -> None:
+    __slots__ = (
+        "name",
+        "params",
+        "_body",
+        "tokens",
+        "hooks",
+        "slot",
+        "boxed",
+        "size",
+        "cells",
+        "upvalues",
+    )
+    fields = ("name", "params", "body")
+    kind = NodeKind.FUNCTION.value
+
+    def __init__(
+        self,
+        name: Token,
+        params: list[Token],
+        body: list[Stmt] | None,
+        tokens: list[Token] | None = None,
+    ) -> None:
         self.name = name
         self.params = params
-        self.body = body
+        # a lazily parsed body is only its tokens until it's first used
+        self._body = body
+        self.tokens = tokens
+        self.hooks: list[Callable[["FuncStmt"], None]] = []
+        # given by the resolver: the slot of the function's name and whether
+        # it's captured, the number of variables of its scope (parameters
+        # first), the slots of captured parameters, and where to find the
+        # cells of the variables it captures when it's declared, each as
+        # (True, depth, slot) of a local or (False, 0, index) of an upvalue
+        # of the enclosing function
+        self.slot = -1
+        self.boxed = False
+        self.size = len(params)
+        self.cells: list[int] = []
+        self.upvalues: list[tuple[bool, int, int]] = []
+
+    @property
+    def parsed(self) -> bool:
+        return self._body is not None
+
+    @property
+    def body(self) -> list[Stmt]:
+        if self._body is None:
+            from ..parser import Parser
+
+            self._body = Parser(self.tokens, lazy=True).block()
+            self.tokens = None
+
+            hooks, self.hooks = self.hooks, []
+            for hook in hooks:
+                hook(self)
+        return self._body
+
+    @body.setter
+    def body(self, body: list[Stmt]):
+        self._body = body
+        self.tokens = None
+
+    def defer(self, hook: Callable[["FuncStmt"], None]):
+        """Run `hook(self)` once the body is parsed, right away if it is"""
+        if self._body is None:
+            self.hooks.append(hook)
+        else:
+            hook(self)
+
+    def __getstate__(self):
+        # hooks belong to the passes of the current run
+        state = {name: getattr(self, name) for name in self.__slots__}
+        return None, {**state, "hooks": []}
 
     def accept(self, visitor: VisitorStmt):
         return visitor.visit_function(self)
 
 
 class ReturnStmt(Stmt):
+    __slots__ = fields = ("keyword", "value")
+    kind = NodeKind.RETURN.value
+
     def __init__(self, keyword: Token, value: Expr) -> None:
         self.value = value
         self.keyword = keyword
 
     def accept(self, visitor: VisitorStmt):
         return visitor.visit_return(self)
+
+
+class BreakStmt(Stmt):
+    __slots__ = fields = ("keyword",)
+    kind = NodeKind.BREAK.value
+
+    def __init__(self, keyword: Token) -> None:
+        self.keyword = keyword
+
+    def accept(self, visitor: VisitorStmt):
+        return visitor.visit_break(self)
+
+
+class ContinueStmt(Stmt):
+    __slots__ = fields = ("keyword",)
+    kind = NodeKind.CONTINUE.value
+
+    def __init__(self, keyword: Token) -> None:
+        self.keyword = keyword
+
+    def accept(self, visitor: VisitorStmt):
+        return visitor.visit_continue(self)
@@ -26,5 +26,17 @@ class VisitorStmt:
     def visit_while(self, stmt):
         raise NotImplementedError
 
+    def visit_for(self, stmt):
+        raise NotImplementedError
+
+    def visit_range(self, stmt):
+        raise NotImplementedError
+
     def visit_return(self, stmt):
         raise NotImplementedError
+
+    def visit_break(self, stmt):
+        raise NotImplementedError
+
+    def visit_continue(self, stmt):
+        raise NotImplementedError
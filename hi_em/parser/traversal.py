@@ -0,0 +1,85 @@
+from typing import Callable, Iterator
+
+from .expr.expr import Expr
+from .node_kind import NodeKind
+from .stmt.stmt import Stmt
+
+FUNCTION = NodeKind.FUNCTION.value
+
+Node = Expr | Stmt
+
+
+def children(node: Node, parse: bool = True) -> list[Node]:
+    """Nodes directly under `node`, in field order. Unless `parse`,
+    a function body that isn't parsed yet is left out"""
+    if not parse and node.kind == FUNCTION and not node.parsed:
+        return []
+
+    nodes = []
+    for name in node.fields:
+        value = getattr(node, name)
+        if isinstance(value, (Expr, Stmt)):
+            nodes.append(value)
+        elif isinstance(value, list):
+            nodes.extend(item for item in value if isinstance(item, (Expr, Stmt)))
+    return nodes
+
+
+def preorder(root: Node, parse: bool = True) -> Iterator[Node]:
+    """Every node under `root`, each before its children, without recursion"""
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(children(node, parse)))
+
+
+def postorder(
+    root: Node, seen: set[int] | None = None, parse: bool = True
+) -> Iterator[Node]:
+    """Every node under `root`, each after its children, without recursion.
+    With `seen`, nodes whose id is in it are skipped along with their
+    children, and the id of every node walked is added to it"""
+    stack = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            yield node
+            continue
+
+        if seen is not None:
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(children(node, parse)))
+
+
+def rewrite(root: Node, replace: Callable[[Node], Node], parse: bool = True) -> Node:
+    """`root` with every node under it replaced by `replace(node)`, called on
+    each node after its children, once its fields point at what replaced
+    them. Fields are updated in place, without recursion"""
+    # the replaced node is kept alive so its id isn't reused
+    replaced: dict[int, tuple[Node, Node]] = {}
+    for node in postorder(root, parse=parse):
+        if replaced:
+            for name in node.fields:
+                value = getattr(node, name)
+                if isinstance(value, list):
+                    setattr(
+                        node,
+                        name,
+                        [
+                            replaced[id(item)][1] if id(item) in replaced else item
+                            for item in value
+                        ],
+                    )
+                elif id(value) in replaced:
+                    setattr(node, name, replaced[id(value)][1])
+
+        new = replace(node)
+        if new is not node:
+            replaced[id(node)] = (node, new)
+
+    return replaced[id(root)][1] if id(root) in replaced else root
@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+from .parser.expr.expr import (
+    Expr,
+    VariableExpr,
+    AssignExpr,
+    BinaryExpr,
+    UnaryExpr,
+    CallExpr,
+)
+from .parser.node_kind import NodeKind
+from .parser.stmt.visitor import VisitorStmt
+from .parser.stmt.stmt import (
+    Stmt,
+    PrintStmt,
+    ExprStmt,
+    VarStmt,
+    BlockStmt,
+    IfStmt,
+    WhileStmt,
+    ForStmt,
+    RangeStmt,
+    FuncStmt,
+    ReturnStmt,
+    BreakStmt,
+    ContinueStmt,
+)
+from .parser.traversal import preorder
+from .scanner.token_type import TokenType
+
+VAREXPR = NodeKind.VAREXPR.value
+ASSIGNEXPR = NodeKind.ASSIGNEXPR.value
+CALL = NodeKind.CALL.value
+VARSTMT = NodeKind.VARSTMT.value
+FUNCTION = NodeKind.FUNCTION.value
+BINARY = NodeKind.BINARY.value
+NUMBER_BINARY = NodeKind.NUMBER_BINARY.value
+LITERAL = NodeKind.LITERAL.value
+INVARIANT = NodeKind.INVARIANT.value
+INLINE = NodeKind.INLINE.value
+UNARY = NodeKind.UNARY.value
+
+# nodes the interpreter specialized, and what they were before
+specialized = {
+    NodeKind.FLOAT_BINARY.value: BinaryExpr,
+    NodeKind.STRING_BINARY.value: BinaryExpr,
+    NodeKind.FLOAT_UNARY.value: UnaryExpr,
+    NodeKind.LOCAL_VAREXPR.value: VariableExpr,
+    NodeKind.GLOBAL_VAREXPR.value: VariableExpr,
+    NodeKind.DIRECT_CALL.value: CallExpr,
+}
+
+COMPARISONS = (
+    TokenType.LESS,
+    TokenType.LESS_EQUAL,
+    TokenType.GREATER,
+    TokenType.GREATER_EQUAL,
+)
+
+
+def resolve(statements: list[Stmt]):
+    resolver = Resolver()
+    resolver.resolve(statements)
+    resolver.count(resolver.context)
+
+
+class Variable:
+    """A local variable while its function is resolved"""
+
+    __slots__ = ("slot", "boxed", "owner", "declarations", "uses")
+
+    def __init__(self, slot: int, owner: FuncStmt | None = None) -> None:
+        self.slot = slot
+        # captured by a nested function, so kept in a cell
+        self.boxed = False
+        # function the variable is a parameter of
+        self.owner = owner
+        self.declarations: list[VarStmt | FuncStmt] = []
+        self.uses: list[VariableExpr | AssignExpr] = []
+
+    def capture(self):
+        if self.boxed:
+            return
+        # uses and declarations seen so far go through the cell too
+        self.boxed = True
+        for node in self.uses:
+            node.boxed = True
+        for node in self.declarations:
+            node.boxed = True
+        if self.owner is not None:
+            self.owner.cells.append(self.slot)
+
+
+class Context:
+    """The function being resolved, or the script itself"""
+
+    def __init__(
+        self, enclosing: Context | None = None, function: FuncStmt | None = None
+    ) -> None:
+        self.enclosing = enclosing
+        self.function = function
+        # scopes innermost last, and the number of slots taken in each
+        self.scopes: list[dict[str, Variable]] = []
+        self.sizes: list[int] = []
+        # name -> index of the function's upvalue for it
+        self.upvalues: dict[str, int] = {}
+        # for loops that may count, known once the whole function is
+        # resolved: a function declared after one may capture its bound
+        self.loops: list[ForStmt] = []
+
+    def local(self, name: str) -> tuple[int, Variable] | None:
+        scopes = self.scopes
+        for depth in range(len(scopes)):
+            variable = scopes[-1 - depth].get(name)
+            if variable is not None:
+                return depth, variable
+        return None
+
+
+class Resolver(VisitorStmt):
+    """Gives every local variable a slot in the environment of its scope
+    and every use of one the (depth, slot) to find it at, counting depth in
+    scopes from the use. A function sees its own locals and, as upvalues,
+    the locals of enclosing functions its body uses: those are captured in
+    cells when the function is declared, only them and not the scopes they
+    are in. Any other name is a global, looked up by name. Inline caches
+    are emptied and nodes the interpreter specialized made generic again.
+    """
+
+    def __init__(self) -> None:
+        self.context = Context()
+
+    def resolve(self, statements: list[Stmt]):
+        for statement in statements:
+            # statements that failed to parse are None
+            if statement is not None:
+                statement.accept(self)
+
+    def expression(self, expr: Expr):
+        # expressions declare nothing, the order variables are found in
+        # doesn't matter
+        for node in preorder(expr):
+            if node.kind in specialized:
+                node.__class__ = specialized[node.kind]
+
+            if node.kind == VAREXPR:
+                self.lookup(node)
+                node.cell, node.version, node.counter = None, -1, 0
+            elif node.kind == ASSIGNEXPR:
+                self.lookup(node)
+                node.cell, node.version = None, -1
+            elif node.kind == CALL:
+                node.function, node.counter = None, 0
+            elif node.kind == BINARY or node.kind == UNARY:
+                node.counter = 0
+
+    def lookup(self, node: VariableExpr | AssignExpr):
+        name = node.name.lexeme
+        found = self.context.local(name)
+        if found is not None:
+            depth, variable = found
+            node.depth, node.slot, node.boxed = depth, variable.slot, variable.boxed
+            variable.uses.append(node)
+            return
+
+        index = self.upvalue(self.context, name)
+        node.depth, node.slot = (-1, -1) if index is None else (-2, index)
+        node.boxed = False
+
+    def upvalue(self, context: Context, name: str) -> int | None:
+        index = context.upvalues.get(name)
+        if index is not None or context.function is None:
+            return index
+
+        # a local of the enclosing function, or one of its own upvalues
+        found = context.enclosing.local(name)
+        if found is not None:
+            depth, variable = found
+            variable.capture()
+            upvalue = (True, depth, variable.slot)
+        else:
+            index = self.upvalue(context.enclosing, name)
+            if index is None:
+                return None
+            upvalue = (False, 0, index)
+
+        upvalues = context.function.upvalues
+        index = context.upvalues[name] = len(upvalues)
+        upvalues.append(upvalue)
+        return index
+
+    def declare(self, name: str, node: VarStmt | FuncStmt) -> int:
+        context = self.context
+        if not context.scopes:
+            node.boxed = False
+            return -1
+
+        # declaring a name again in the same scope reuses its slot
+        scope = context.scopes[-1]
+        variable = scope.get(name)
+        if variable is None:
+            variable = scope[name] = Variable(context.sizes[-1])
+            context.sizes[-1] += 1
+        variable.declarations.append(node)
+        node.boxed = variable.boxed
+        return variable.slot
+
+    def visit_print(self, stmt: PrintStmt):
+        self.expression(stmt.expr)
+
+    def visit_expression(self, stmt: ExprStmt):
+        self.expression(stmt.expr)
+
+    def visit_varstmt(self, stmt: VarStmt):
+        # the initializer still sees the variables the name may shadow
+        if stmt.initializer is not None:
+            self.expression(stmt.initializer)
+        stmt.slot = self.declare(stmt.name.lexeme, stmt)
+
+    def visit_block(self, stmt: BlockStmt):
+        # declarations are only ever direct children of a block, one without
+        # any gets no scope of its own and runs in the enclosing one
+        if not any(
+            statement is not None and statement.kind in (VARSTMT, FUNCTION)
+            for statement in stmt.statements
+        ):
+            stmt.size = 0
+            self.resolve(stmt.statements)
+            return
+
+        context = self.context
+        context.scopes.append({})
+        context.sizes.append(0)
+        self.resolve(stmt.statements)
+        context.scopes.pop()
+        stmt.size = context.sizes.pop()
+
+    def visit_if(self, stmt: IfStmt):
+        self.expression(stmt.condition)
+        stmt.then_branch.accept(self)
+        if stmt.else_branch is not None:
+            stmt.else_branch.accept(self)
+
+    def visit_while(self, stmt: WhileStmt):
+        self.expression(stmt.condition)
+        stmt.body.accept(self)
+
+    def visit_for(self, stmt: ForStmt):
+        # a declared variable is in a scope of its own around the loop
+        context = self.context
+        declares = stmt.initializer is not None and stmt.initializer.kind == VARSTMT
+        if declares:
+            context.scopes.append({})
+            context.sizes.append(0)
+
+        if stmt.initializer is not None:
+            stmt.initializer.accept(self)
+        self.expression(stmt.condition)
+        if stmt.increment is not None:
+            self.expression(stmt.increment)
+        stmt.body.accept(self)
+
+        stmt.size = 0
+        if declares:
+            context.scopes.pop()
+            stmt.size = context.sizes.pop()
+        stmt.step = None
+        context.loops.append(stmt)
+
+    def count(self, context: Context):
+        # every capture in the function is known
+        for loop in context.loops:
+            loop.step = self.counted(loop)
+        context.loops = []
+
+    def counted(self, stmt: ForStmt) -> float | None:
+        initializer, condition, increment = (
+            stmt.initializer,
+            stmt.condition,
+            stmt.increment,
+        )
+        if initializer is None or initializer.kind != VARSTMT or initializer.boxed:
+            return None
+
+        def counter(expr: Expr) -> bool:
+            return (
+                expr.kind in (VAREXPR, ASSIGNEXPR)
+                and expr.depth == 0
+                and expr.slot == initializer.slot
+            )
+
+        # counter < bound, or <=, > and >=
+        if condition.kind not in (BINARY, NUMBER_BINARY):
+            return None
+        if condition.op.type not in COMPARISONS or not counter(condition.left):
+            return None
+
+        # counter = counter + step, step + counter or counter - step
+        if increment is None or increment.kind != ASSIGNEXPR or not counter(increment):
+            return None
+        value = increment.value
+        if value.kind not in (BINARY, NUMBER_BINARY):
+            return None
+        left, right = value.left, value.right
+        if value.op.type == TokenType.PLUS and left.kind == LITERAL:
+            left, right = right, left
+        if value.op.type not in (TokenType.PLUS, TokenType.MINUS):
+            return None
+        if (
+            not counter(left)
+            or right.kind != LITERAL
+            or type(right.literal) is not float
+        ):
+            return None
+        step = right.literal if value.op.type == TokenType.PLUS else -right.literal
+
+        # the bound is read once, nothing in the loop may change it
+        bound = condition.right
+        names = {initializer.name.lexeme}
+        if bound.kind == VAREXPR:
+            if bound.depth == -2 or bound.boxed:
+                return None
+            names.add(bound.name.lexeme)
+        elif bound.kind not in (LITERAL, INVARIANT):
+            return None
+        # a call may change a global
+        calls = bound.kind == VAREXPR and bound.depth == -1
+
+        for node in preorder(stmt.body, parse=False):
+            if node.kind == ASSIGNEXPR and node.name.lexeme in names:
+                return None
+            if calls and node.kind in (CALL, INLINE):
+                return None
+        return step
+
+    def visit_range(self, stmt: RangeStmt):
+        # the bounds don't see the variable
+        self.expression(stmt.start)
+        self.expression(stmt.stop)
+        if stmt.step is not None:
+            self.expression(stmt.step)
+
+        context = self.context
+        context.scopes.append({})
+        context.sizes.append(0)
+        self.declare(stmt.name.lexeme, stmt)
+        stmt.body.accept(self)
+        context.scopes.pop()
+        context.sizes.pop()
+
+    def visit_function(self, stmt: FuncStmt):
+        stmt.slot = self.declare(stmt.name.lexeme, stmt)
+        if self.context.function is None and not self.context.scopes:
+            # a global function can only capture globals, its lazily parsed
+            # body is resolved once it's parsed
+            stmt.defer(self.function)
+        else:
+            # what it captures must be known before the enclosing scope runs
+            self.function(stmt, self.context)
+
+    def function(self, stmt: FuncStmt, enclosing: Context | None = None):
+        previous = self.context
+        self.context = context = Context(enclosing or Context(), stmt)
+        stmt.cells, stmt.upvalues = [], []
+
+        # parameters take the first slots, in order
+        context.scopes.append(
+            {
+                param.lexeme: Variable(slot, stmt)
+                for slot, param in enumerate(stmt.params)
+            }
+        )
+        context.sizes.append(len(stmt.params))
+        self.resolve(stmt.body)
+        stmt.size = context.sizes[0]
+        self.count(context)
+
+        self.context = previous
+
+    def visit_return(self, stmt: ReturnStmt):
+        if stmt.value is not None:
+            self.expression(stmt.value)
+
+    def visit_break(self, stmt: BreakStmt):
+        pass
+
+    def visit_continue(self, stmt: ContinueStmt):
+        pass
@@ -1,6 +1,61 @@
+import re
+from sys import intern
+from typing import Iterator
+
 from .token import Token
 from .token_type import TokenType, keyword_map
 
+# multi-word keywords are matched as a whole before identifiers,
+# longest first so that "lớp hiện tại" wins over "lớp"
+multi_word_keywords = sorted(
+    (keyword for keyword in keyword_map if " " in keyword), key=len, reverse=True
+)
+
+# one master pattern for every lexeme, tried in order at each position;
+# blanks in front of a lexeme are skipped as part of its match
+token_pattern = re.compile(
+    r"[ \t\r]*(?:"
+    + "|".join(
+        [
+            r"(?P<NEWLINE>\n)",
+            r"(?P<COMMENT>//[^\n]*)",
+            r'(?P<STRING>"[^"]*")',
+            r'(?P<UNTERMINATED>"[^"]*)',
+            r"(?P<NUMBER>\d+(?:\.\d+)?)",
+            "(?P<KEYWORD>"
+            + "|".join(re.escape(keyword) for keyword in multi_word_keywords)
+            + r")(?!\w)",
+            r"(?P<IDENTIFIER>[^\W\d_]\w*)",
+            r"(?P<OPERATOR>[!=<>]=?|[{}(),.;*/+-])",
+            r"(?P<ERROR>[^ \t\r])",
+        ]
+    )
+    + ")",
+    re.DOTALL,
+)
+
+# how far a lexeme may still extend past the end of a partial source,
+# e.g. "trả" followed by " về" in the next chunk
+lookahead = max(len(keyword) for keyword in keyword_map) + 1
+
+# operator lexemes are the values of their token types
+operator_map = {token_type.value: token_type for token_type in TokenType}
+
+
+def token_literal(token_type: TokenType, text: str) -> object:
+    if token_type is TokenType.NUMBER:
+        return float(text)
+    if token_type is TokenType.STRING:
+        return text[1:-1]
+    return None
+
+
+def make_token(token_type: TokenType, text: str, line: int) -> Token:
+    # identifier names are interned so environment lookups compare by identity
+    if token_type is TokenType.IDENTIFIER:
+        return Token(token_type, intern(text), None, line)
+    return Token(token_type, text, token_literal(token_type, text), line)
+
 
 class Scanner:
     def __init__(self, source: str) -> None:
@@ -15,172 +70,47 @@ class Scanner:
         self.scan_tokens()
 
     def scan_tokens(self):
-        while not self.is_end():
-            self.start = self.current
-            self.scan_token()
-        self.tokens.append(Token(TokenType.EOF, "", None, self.line))
-
-    def scan_token(self):
-        val = self.advance()
-        match val:
-            case "}":
-                self.add_token(TokenType.RIGHT_PAREN)
-            case "{":
-                self.add_token(TokenType.LEFT_PAREN)
-            case ")":
-                self.add_token(TokenType.RIGHT_BRACE)
-            case "(":
-                self.add_token(TokenType.LEFT_BRACE)
-            case ",":
-                self.add_token(TokenType.COMMA)
-            case ".":
-                self.add_token(TokenType.DOT)
-            case "-":
-                self.add_token(TokenType.MINUS)
-            case "+":
-                self.add_token(TokenType.PLUS)
-            case ";":
-                self.add_token(TokenType.SEMICOLON)
-            case "*":
-                self.add_token(TokenType.STAR)
-            case "/":
-                if self.match("/"):
-                    while (self.peek() != "\n") and (not self.is_end()):
-                        self.advance()
-                else:
-                    self.add_token(TokenType.SLASH)
-            case "!":
-                (
-                    self.add_token(TokenType.BANG_EQUAL)
-                    if self.match("=")
-                    else self.add_token(TokenType.BANG)
-                )
-            case "=":
-                (
-                    self.add_token(TokenType.EQUAL_EQUAL)
-                    if self.match("=")
-                    else self.add_token(TokenType.EQUAL)
-                )
-            case ">":
-                (
-                    self.add_token(TokenType.GREATER_EQUAL)
-                    if self.match("=")
-                    else self.add_token(TokenType.GREATER)
-                )
-            case "<":
-                (
-                    self.add_token(TokenType.LESS_EQUAL)
-                    if self.match("=")
-                    else self.add_token(TokenType.LESS)
-                )
-            case " ":  # ignore
-                pass
-            case "\r":
-                pass
-            case "\t":
-                pass
-            case "\n":
-                self.line += 1
-            case '"':  # string
-                self.add_string()
-            case _:  # default case
-                if val.isdigit():  # number case
-                    self.add_number()
-                elif val.isalpha():
-                    self.add_identifier()
-                else:
+        source = self.source
+        append = self.tokens.append
+        for token_type in self.lex():
+            append(make_token(token_type, source[self.start : self.current], self.line))
+        append(Token(TokenType.EOF, "", None, self.line))
+
+    def lex(self, final: bool = True) -> Iterator[TokenType]:
+        """Yield the type of every token from `self.current` onward,
+        with `self.start`/`self.current` spanning its lexeme.
+        Unless `final`, stop before a lexeme that may continue past the end
+        of the source, leaving `self.current` at its start"""
+        limit = len(self.source) if final else len(self.source) - lookahead
+        for match in token_pattern.finditer(self.source, self.current):
+            if match.end() > limit:
+                return
+
+            kind = match.lastgroup
+            self.start, self.current = match.span(kind)
+
+            match kind:
+                case "IDENTIFIER":
+                    yield keyword_map.get(match[kind], TokenType.IDENTIFIER)
+                case "OPERATOR":
+                    yield operator_map[match[kind]]
+                case "NEWLINE":
+                    self.line += 1
+                case "NUMBER":
+                    yield TokenType.NUMBER
+                case "COMMENT":
+                    pass
+                case "STRING":
+                    self.line += match[kind].count("\n")
+                    yield TokenType.STRING
+                case "KEYWORD":
+                    yield keyword_map[match[kind]]
+                case "UNTERMINATED":
                     from ..hi_em import HiEm
 
-                    HiEm.error(line=self.line, message="Unexpected character")
+                    self.line += match[kind].count("\n")
+                    HiEm.error(self.line, "Unterminated string")
+                case _:
+                    from ..hi_em import HiEm
 
-    def is_end(self) -> bool:
-        return self.current >= len(self.source)
-
-    def match(self, expected: str) -> bool:
-        if self.is_end():
-            return False
-        if self.source[self.current] != expected:
-            return False
-        self.current += 1
-        return True
-
-    def peek(self, n: int = 0) -> str:
-        idx = self.current + n
-        if idx >= len(self.source):
-            return "\0"
-        return self.source[idx]
-
-    def peek_next(self) -> str:
-        return self.peek(1)
-
-    def advance(self) -> str:
-        res = self.source[self.current]
-        self.current += 1
-        return res
-
-    def add_token(self, token_type: TokenType, literal: object = None):
-        text = self.source[self.start : self.current]
-        self.tokens.append(Token(token_type, text, literal, self.line))
-
-    def add_string(self):
-        while (self.peek() != '"') and (not self.is_end()):
-            if self.peek() == "\n":
-                self.line += 1
-            self.advance()
-
-        if self.is_end():
-            from ..hi_em import HiEm
-
-            HiEm.error(self.line, "Unterminated string")
-            return
-
-        self.advance()  # closing "
-
-        self.add_token(TokenType.STRING, self.source[self.start + 1 : self.current - 1])
-
-    def add_number(self):
-        while self.peek().isdigit():
-            self.advance()
-
-        if (self.peek() == ".") and (self.peek_next().isdigit()):
-            # consume the "."
-            self.advance()
-            # consume fraction part
-            while self.peek().isdigit():
-                self.advance()
-
-        self.add_token(TokenType.NUMBER, float(self.source[self.start : self.current]))
-
-    def is_alpha_numeric(self) -> bool:
-        return self.peek().isdigit() or self.peek().isalpha() or self.peek() == "_"
-
-    def add_identifier(self):
-        def get_text():
-            self.advance()  # get " "
-            while self.is_alpha_numeric():
-                self.advance()
-            return self.source[self.start : self.current]
-
-        while self.is_alpha_numeric():
-            self.advance()
-
-        # don't worry about wtf is this
-        # just some magic and it works
-        text = self.source[self.start : self.current]
-        if text in ["còn", "trả", "trong"]:
-            text = get_text()
-        elif text == "lớp":
-            if self.peek_next() == "c":
-                text = get_text()
-            elif self.peek_next() == "h":
-                text = get_text()
-                text = get_text()
-            else:
-                # TODO: put error here
-                pass
-
-        (
-            self.add_token(keyword_map[text])
-            if text in keyword_map
-            else self.add_token(TokenType.IDENTIFIER)
-        )
+                    HiEm.error(line=self.line, message="Unexpected character")
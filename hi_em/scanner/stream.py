@@ -0,0 +1,63 @@
+from collections import deque
+from typing import Iterable, Iterator, TextIO
+
+from .scanner import Scanner, make_token
+from .token import Token
+from .token_type import TokenType
+
+
+class StreamScanner(Scanner):
+    """Scanner reading its source from a text stream one chunk at a time,
+    only the unfinished tail of a chunk is kept between reads"""
+
+    def __init__(self, stream: TextIO, chunk_size: int = 1 << 16) -> None:
+        self.start = 0
+        self.current = 0
+        self.line = 1
+
+        self.source = ""
+        self.stream = stream
+        self.chunk_size = chunk_size
+
+    def __iter__(self) -> Iterator[Token]:
+        final = False
+        while not final:
+            chunk = self.stream.read(self.chunk_size)
+            final = not chunk
+
+            self.source = self.source[self.current :] + chunk
+            self.current = 0
+
+            for token_type in self.lex(final):
+                text = self.source[self.start : self.current]
+                yield make_token(token_type, text, self.line)
+
+        yield Token(TokenType.EOF, "", None, self.line)
+
+
+class TokenStream:
+    """List-like view of a token iterator for `Parser`,
+    tokens more than `keep` behind the last requested index are dropped"""
+
+    def __init__(self, tokens: Iterable[Token], keep: int = 2) -> None:
+        self.tokens = iter(tokens)
+        self.buffer: deque[Token] = deque()
+        self.offset = 0  # index of buffer[0]
+        self.keep = keep
+
+    def __getitem__(self, index: int) -> Token:
+        # the parser never looks further back than `keep` tokens
+        index = max(index, self.offset)
+
+        while index - self.offset >= len(self.buffer):
+            token = next(self.tokens, None)
+            if token is None:
+                # past EOF, keep answering with it
+                token = self.buffer[-1]
+            self.buffer.append(token)
+
+        while index - self.offset > self.keep:
+            self.buffer.popleft()
+            self.offset += 1
+
+        return self.buffer[index - self.offset]
@@ -2,6 +2,8 @@ from .token_type import TokenType
 
 
 class Token:
+    __slots__ = ("type", "lexeme", "literal", "line")
+
     def __init__(
         self, token_type: TokenType, lexeme: str, literal: object, line: int
     ) -> None:
@@ -0,0 +1,97 @@
+from array import array
+from sys import intern
+
+from .scanner import Scanner, token_literal
+from .token_type import TokenType
+
+# token types are stored as their index in this list
+token_types = list(TokenType)
+type_codes = {token_type: code for code, token_type in enumerate(token_types)}
+
+
+class TokenBuffer(Scanner):
+    """Struct-of-arrays token store: one small integer per field and token,
+    lexemes and literals are sliced from the source only when asked for.
+    Indexing returns a `TokenView`, so a buffer can be handed to `Parser`"""
+
+    def __init__(self, source: str) -> None:
+        # the last views returned at an even and an odd index: the parser
+        # peeks at the current token and the previous one again and again
+        self.views: list[TokenView | None] = [None, None]
+        self.types = array("B")
+        self.starts = array("q")
+        self.ends = array("q")
+        self.lines = array("l")
+
+        super().__init__(source)
+
+    def scan_tokens(self):
+        types, starts, ends, lines = self.types, self.starts, self.ends, self.lines
+        for token_type in self.lex():
+            types.append(type_codes[token_type])
+            starts.append(self.start)
+            ends.append(self.current)
+            lines.append(self.line)
+
+        types.append(type_codes[TokenType.EOF])
+        starts.append(len(self.source))
+        ends.append(len(self.source))
+        lines.append(self.line)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> "TokenView":
+        if index < 0:
+            index += len(self.types)
+        if not 0 <= index < len(self.types):
+            raise IndexError("token index out of range")
+
+        view = self.views[index & 1]
+        if view is None or view.index != index:
+            view = self.views[index & 1] = TokenView(self, index)
+        return view
+
+    def token_type(self, index: int) -> TokenType:
+        return token_types[self.types[index]]
+
+    def lexeme(self, index: int) -> str:
+        text = self.source[self.starts[index] : self.ends[index]]
+        if self.types[index] == type_codes[TokenType.IDENTIFIER]:
+            return intern(text)
+        return text
+
+    def literal(self, index: int) -> object:
+        return token_literal(self.token_type(index), self.lexeme(index))
+
+
+class TokenView:
+    """`Token` look-alike reading its fields from a `TokenBuffer`"""
+
+    __slots__ = ("buffer", "index")
+
+    def __init__(self, buffer: TokenBuffer, index: int) -> None:
+        self.buffer = buffer
+        self.index = index
+
+    @property
+    def type(self) -> TokenType:
+        return self.buffer.token_type(self.index)
+
+    @property
+    def lexeme(self) -> str:
+        return self.buffer.lexeme(self.index)
+
+    @property
+    def literal(self) -> object:
+        return self.buffer.literal(self.index)
+
+    @property
+    def line(self) -> int:
+        return self.buffer.lines[self.index]
+
+    def __repr__(self) -> str:
+        return f"<Token(type = {self.type.value}, lexeme = {self.lexeme}, literal = {self.literal}, line = {self.line})>"
+
+    def __str__(self) -> str:
+        return f"Token(type = {self.type.value}, lexeme = {self.lexeme}, literal = {self.literal}, line = {self.line})"
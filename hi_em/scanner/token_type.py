@@ -47,6 +47,9 @@ class TokenType(Enum):
     TRUE = "true"
     VAR = "variable"
     WHILE = "while"
+    RANGE = "range"
+    BREAK = "break"
+    CONTINUE = "continue"
 
     # eof
     EOF = "eof"
@@ -69,4 +72,7 @@ keyword_map = {
     "đúng": TokenType.TRUE,
     "đặt": TokenType.VAR,
     "trong khi": TokenType.WHILE,
+    "khoảng": TokenType.RANGE,
+    "dừng": TokenType.BREAK,
+    "tiếp": TokenType.CONTINUE,
 }
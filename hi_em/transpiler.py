@@ -0,0 +1,904 @@
+import ast
+import math
+import operator
+import re
+import traceback
+from types import CodeType, FunctionType
+
+from . import cache
+from .interpreter import Interpreter, InterpreterError
+from .parser.expr.visitor import VisitorExpr
+from .parser.expr.expr import (
+    Expr,
+    BinaryExpr,
+    UnaryExpr,
+    LiteralExpr,
+    GroupingExpr,
+    VariableExpr,
+    AssignExpr,
+    LogicalExpr,
+    CallExpr,
+    InvariantExpr,
+    InlineExpr,
+    NumberBinaryExpr,
+    NumberUnaryExpr,
+)
+from .parser.stmt.visitor import VisitorStmt
+from .parser.stmt.stmt import (
+    Stmt,
+    PrintStmt,
+    ExprStmt,
+    VarStmt,
+    BlockStmt,
+    IfStmt,
+    WhileStmt,
+    ForStmt,
+    RangeStmt,
+    FuncStmt,
+    ReturnStmt,
+    BreakStmt,
+    ContinueStmt,
+)
+from .parser.stmt.environment import Cell
+from .parser.stmt.callable import HiEmCallable, ClockNative
+from .parser.node_kind import NodeKind, dispatch_table
+from .scanner.token import Token
+from .scanner.token_type import TokenType
+
+BINARY = NodeKind.BINARY.value
+UNARY = NodeKind.UNARY.value
+GROUPING = NodeKind.GROUPING.value
+LITERAL = NodeKind.LITERAL.value
+LOGICAL = NodeKind.LOGICAL.value
+ASSIGNEXPR = NodeKind.ASSIGNEXPR.value
+NUMBER_BINARY = NodeKind.NUMBER_BINARY.value
+
+# the function the top-level statements are the body of
+SCRIPT = "_script"
+
+python_operators = {
+    TokenType.PLUS: ast.Add,
+    TokenType.MINUS: ast.Sub,
+    TokenType.STAR: ast.Mult,
+    TokenType.SLASH: ast.Div,
+}
+python_comparisons = {
+    TokenType.GREATER: ast.Gt,
+    TokenType.GREATER_EQUAL: ast.GtE,
+    TokenType.LESS: ast.Lt,
+    TokenType.LESS_EQUAL: ast.LtE,
+    TokenType.EQUAL_EQUAL: ast.Eq,
+    TokenType.BANG_EQUAL: ast.NotEq,
+}
+
+
+def transpile(statements: list[Stmt]) -> ast.Module:
+    """Python module running resolved top-level statements, the functions
+    whose bodies aren't parsed yet are left to `Deferred`"""
+    return Transpiler().module(statements)
+
+
+# --------------------
+# Names
+# --------------------
+
+escapes = re.compile(r"__|_([0-9a-f]+)_")
+
+
+def mangle(name: str) -> str:
+    """Python name of a global: ASCII letters and digits are kept, `_` is
+    doubled and any other character is written as `_<code point in hex>_`,
+    so no two names meet and none is a keyword or builtin"""
+    return "h_" + "".join(
+        c if c.isascii() and c.isalnum() else "__" if c == "_" else f"_{ord(c):x}_"
+        for c in name
+    )
+
+
+def demangle(name: str) -> str:
+    return escapes.sub(
+        lambda match: "_" if match[1] is None else chr(int(match[1], 16)), name[2:]
+    )
+
+
+def load(name: str, line: int | None = None) -> ast.Name:
+    node = ast.Name(name, ast.Load())
+    if line is not None:
+        node.lineno = line
+    return node
+
+
+def store(name: str) -> ast.Name:
+    return ast.Name(name, ast.Store())
+
+
+def call(function: str, *arguments: ast.expr) -> ast.Call:
+    return ast.Call(load(function), list(arguments), [])
+
+
+def compare(left: ast.expr, op: ast.cmpop, right: ast.expr) -> ast.Compare:
+    return ast.Compare(left, [op], [right])
+
+
+def is_float(value: ast.expr) -> ast.Compare:
+    return compare(call("type", value), ast.Is(), load("float"))
+
+
+def locate(tree: ast.AST, line: int = 1):
+    """Give every node the line of its closest ancestor that has one, on
+    a single line, as the compiler wants them all located"""
+    todo = [(tree, line)]
+    while todo:
+        node, line = todo.pop()
+        if "lineno" in node._attributes:
+            if getattr(node, "lineno", None) is None:
+                node.lineno = line
+            line = node.end_lineno = node.lineno
+            node.col_offset = node.end_col_offset = 0
+        todo += ((child, line) for child in ast.iter_child_nodes(node))
+
+
+def boolean(expr: Expr) -> bool:
+    """Whether `expr` can only evaluate to True or False, which Python then
+    tests as `Interpreter.truthy` would"""
+    kind = expr.kind
+    if kind == BINARY or kind == NUMBER_BINARY:
+        return expr.op.type in python_comparisons
+    if kind == UNARY:
+        return expr.op.type == TokenType.BANG
+    if kind == GROUPING:
+        return boolean(expr.expr)
+    if kind == LOGICAL:
+        return boolean(expr.left) and boolean(expr.right)
+    if kind == LITERAL:
+        return type(expr.literal) is bool
+    return False
+
+
+class Transpiler(VisitorExpr, VisitorStmt):
+    """Translates resolved nodes into a Python module.
+
+    The top-level statements become the body of one function and every
+    hi_em function a nested `def`, so locals are Python locals: each scope
+    the resolver gave slots to is laid out after the scopes enclosing it,
+    as the VM does, and a (depth, slot) becomes the local `v<slot of the
+    function>`. Captured variables hold cells, a function is given those it
+    captures as the defaults `u<index>` of keyword-only parameters when
+    it's declared. Globals are Python globals under their mangled name.
+
+    Numbers stay floats and the operands of operators are checked, those
+    that aren't floats are handed to the interpreter, as are calls of
+    anything but a function of the right arity, so values and errors are
+    the interpreter's. Nodes are located at the line of their tokens.
+    """
+
+    def __init__(self) -> None:
+        # first slot of each open scope, innermost last, and the first free
+        self.scopes: list[int] = []
+        self.top = 0
+        # the increment of each loop, run again before a `tiếp`, with the
+        # scopes it's in
+        self.loops: list[tuple[Expr | None, list[int]]] = []
+        # InvariantExpr id -> name holding its value
+        self.invariants: dict[int, str] = {}
+        # globals the function transpiled assigns
+        self.globals: set[str] = set()
+        # global functions whose bodies aren't parsed yet, by index
+        self.deferred: list[FuncStmt] = []
+        self.temps = 0
+        self.dispatch = dispatch_table(self)
+
+    def module(self, statements: list[Stmt]) -> ast.Module:
+        self.scopes.append(0)
+        body = self.statements(statements)
+        script = self.function(SCRIPT, [], [], body)
+        tree = ast.Module([script, ast.Expr(call(SCRIPT))], [])
+        locate(tree)
+        return tree
+
+    def global_function(self, stmt: FuncStmt) -> ast.Module:
+        # a deferred function, on its own
+        tree = ast.Module(self.visit_function(stmt)[:1], [])
+        locate(tree)
+        return tree
+
+    def function(
+        self,
+        name: str,
+        params: list[str],
+        upvalues: list[ast.expr],
+        body: list[ast.stmt],
+    ) -> ast.FunctionDef:
+        if self.globals:
+            body.insert(0, ast.Global(sorted(self.globals)))
+        arguments = ast.arguments(
+            posonlyargs=[ast.arg(param) for param in params],
+            args=[],
+            vararg=None,
+            kwonlyargs=[ast.arg(f"u{index}") for index in range(len(upvalues))],
+            kw_defaults=upvalues,
+            kwarg=None,
+            defaults=[],
+        )
+        return ast.FunctionDef(name, arguments, body or [ast.Pass()], [], None)
+
+    def temp(self) -> str:
+        self.temps += 1
+        return f"_t{self.temps}"
+
+    def reserve(self, size: int) -> int:
+        base = self.top
+        self.top += size
+        return base
+
+    def local(self, depth: int, slot: int) -> str:
+        return f"v{self.scopes[-1 - depth] + slot}"
+
+    def variable(self, expr: VariableExpr | AssignExpr) -> tuple[str, bool]:
+        # the local holding the variable or its cell, and whether it's a cell
+        if expr.depth == -2:
+            return f"u{expr.slot}", True
+        return self.local(expr.depth, expr.slot), expr.boxed
+
+    # --------------------
+    # Expression
+    # --------------------
+
+    def expression(self, expr: Expr) -> ast.expr:
+        return self.dispatch[expr.kind](expr)
+
+    def truthy(self, expr: Expr) -> ast.expr:
+        # as `Interpreter.truthy`: everything but nil and sai
+        if boolean(expr):
+            return self.expression(expr)
+        value = self.temp()
+        return ast.BoolOp(
+            ast.And(),
+            [
+                compare(
+                    ast.NamedExpr(store(value), self.expression(expr)),
+                    ast.IsNot(),
+                    ast.Constant(None),
+                ),
+                compare(load(value), ast.IsNot(), ast.Constant(False)),
+            ],
+        )
+
+    def operator(self, op: Token, left: ast.expr, right: ast.expr) -> ast.expr:
+        if op.type in python_operators:
+            return ast.BinOp(left, python_operators[op.type](), right)
+        return compare(left, python_comparisons[op.type](), right)
+
+    def visit_literal(self, expr: LiteralExpr):
+        return ast.Constant(expr.literal)
+
+    def visit_grouping(self, expr: GroupingExpr):
+        return self.expression(expr.expr)
+
+    def visit_unary(self, expr: UnaryExpr):
+        if expr.op.type == TokenType.BANG:
+            if boolean(expr.expr):
+                return ast.UnaryOp(ast.Not(), self.expression(expr.expr))
+            value = self.temp()
+            return ast.BoolOp(
+                ast.Or(),
+                [
+                    compare(
+                        ast.NamedExpr(store(value), self.expression(expr.expr)),
+                        ast.Is(),
+                        ast.Constant(None),
+                    ),
+                    compare(load(value), ast.Is(), ast.Constant(False)),
+                ],
+            )
+
+        value = self.temp()
+        return ast.IfExp(
+            is_float(ast.NamedExpr(store(value), self.expression(expr.expr))),
+            ast.UnaryOp(ast.USub(), load(value)),
+            call(
+                "_unary",
+                ast.Constant(expr.op.type.value),
+                ast.Constant(expr.op.line),
+                load(value),
+            ),
+        )
+
+    def visit_number_unary(self, expr: NumberUnaryExpr):
+        return ast.UnaryOp(ast.USub(), self.expression(expr.expr))
+
+    def visit_binary(self, expr: BinaryExpr):
+        op = expr.op
+        if op.type in (TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL):
+            left, right = self.expression(expr.left), self.expression(expr.right)
+            return self.operator(op, left, right)
+
+        slow = ("_binary", ast.Constant(op.type.value), ast.Constant(op.line))
+        operands = (expr.left, expr.right)
+        if any(
+            operand.kind == LITERAL and type(operand.literal) is not float
+            for operand in operands
+        ):
+            # never two numbers
+            return call(*slow, *(self.expression(operand) for operand in operands))
+
+        # floats computed by Python, checked first unless they're constants
+        checks, values = [], []
+        for operand in operands:
+            if operand.kind == LITERAL:
+                values.append(ast.Constant(operand.literal))
+                continue
+            value = self.temp()
+            checks.append(
+                is_float(ast.NamedExpr(store(value), self.expression(operand)))
+            )
+            values.append(load(value))
+        fast = self.operator(op, *values)
+        if not checks:
+            return fast
+        # `&` evaluates both operands, whatever the first is
+        check = (
+            checks[0]
+            if len(checks) == 1
+            else ast.BinOp(checks[0], ast.BitAnd(), checks[1])
+        )
+        return ast.IfExp(check, fast, call(*slow, *values))
+
+    def visit_number_binary(self, expr: NumberBinaryExpr):
+        left, right = self.expression(expr.left), self.expression(expr.right)
+        return self.operator(expr.op, left, right)
+
+    def visit_logical(self, expr: LogicalExpr):
+        left, right = self.expression(expr.left), self.expression(expr.right)
+        if boolean(expr.left):
+            # Python's own `or` and `and` then give the same value
+            if expr.op.type == TokenType.OR:
+                return ast.BoolOp(ast.Or(), [left, right])
+            return ast.BoolOp(ast.And(), [left, right])
+
+        # the left operand is the value if it decides
+        value = self.temp()
+        test = ast.BoolOp(
+            ast.And(),
+            [
+                compare(
+                    ast.NamedExpr(store(value), left), ast.IsNot(), ast.Constant(None)
+                ),
+                compare(load(value), ast.IsNot(), ast.Constant(False)),
+            ],
+        )
+        if expr.op.type == TokenType.OR:
+            return ast.IfExp(test, load(value), right)
+        return ast.IfExp(test, right, load(value))
+
+    def visit_varexpr(self, expr: VariableExpr):
+        if expr.depth == -1:
+            return load(mangle(expr.name.lexeme), expr.name.line)
+        name, boxed = self.variable(expr)
+        if boxed:
+            return ast.Attribute(load(name), "value", ast.Load())
+        return load(name)
+
+    def visit_assignexpr(self, expr: AssignExpr):
+        value = self.expression(expr.value)
+        if expr.depth == -1:
+            name = self.assign_global(expr)
+            return ast.NamedExpr(store(name), self.checked(expr, value))
+
+        name, boxed = self.variable(expr)
+        if boxed:
+            return call("_store", load(name), value)
+        return ast.NamedExpr(store(name), value)
+
+    def assign_global(self, expr: AssignExpr) -> str:
+        name = mangle(expr.name.lexeme)
+        self.globals.add(name)
+        return name
+
+    def checked(self, expr: AssignExpr, value: ast.expr) -> ast.expr:
+        # the value, once the global is found to be defined
+        return ast.Subscript(
+            ast.Tuple(
+                [value, load(mangle(expr.name.lexeme), expr.name.line)], ast.Load()
+            ),
+            ast.Constant(0),
+            ast.Load(),
+        )
+
+    def visit_invariant(self, expr: InvariantExpr):
+        name = self.invariants.get(id(expr))
+        if name is None:
+            return self.expression(expr.expr)
+
+        # the value once computed since the loop was entered
+        return ast.IfExp(
+            compare(load(name), ast.IsNot(), load("_unset")),
+            load(name),
+            ast.NamedExpr(store(name), self.expression(expr.expr)),
+        )
+
+    def visit_inline(self, expr: InlineExpr):
+        # the arguments are the only locals the body sees
+        base = self.reserve(len(expr.arguments))
+        steps = [
+            ast.NamedExpr(store(f"v{base + slot}"), self.expression(argument))
+            for slot, argument in enumerate(expr.arguments)
+        ]
+        scopes, self.scopes = self.scopes, [base]
+        value = self.expression(expr.expr)
+        self.scopes = scopes
+        self.top = base
+
+        if not steps:
+            return value
+        return ast.Subscript(
+            ast.Tuple(steps + [value], ast.Load()), ast.Constant(-1), ast.Load()
+        )
+
+    def visit_call(self, expr: CallExpr):
+        # the callee and arguments are evaluated in order first, a function
+        # of the right arity is then called directly
+        callee = self.temp()
+        steps = [ast.NamedExpr(store(callee), self.expression(expr.calle))]
+        values = []
+        for argument in expr.arguments:
+            if argument.kind == LITERAL:
+                values.append(ast.Constant(argument.literal))
+                continue
+            value = self.temp()
+            steps.append(ast.NamedExpr(store(value), self.expression(argument)))
+            values.append(load(value))
+
+        arity = ast.Attribute(
+            ast.Attribute(load(callee), "__code__", ast.Load()),
+            "co_argcount",
+            ast.Load(),
+        )
+        checks = [
+            compare(call("type", load(callee)), ast.Is(), load("_function")),
+            compare(arity, ast.Eq(), ast.Constant(len(values))),
+        ]
+        if len(steps) == 1:
+            checks[0] = compare(call("type", steps[0]), ast.Is(), load("_function"))
+        else:
+            checks.insert(0, ast.Tuple(steps, ast.Load()))
+
+        return ast.IfExp(
+            ast.BoolOp(ast.And(), checks),
+            ast.Call(load(callee), values, []),
+            call("_call", ast.Constant(expr.paren.line), load(callee), *values),
+        )
+
+    # --------------------
+    # Statement
+    # --------------------
+
+    def statements(self, statements: list[Stmt]) -> list[ast.stmt]:
+        code = []
+        for statement in statements:
+            code += self.dispatch[statement.kind](statement)
+        return code
+
+    def statement(self, stmt: Stmt) -> list[ast.stmt]:
+        return self.dispatch[stmt.kind](stmt) or [ast.Pass()]
+
+    def effect(self, expr: Expr) -> list[ast.stmt]:
+        # an expression evaluated for what it does, assignments as statements
+        if expr.kind != ASSIGNEXPR:
+            return [ast.Expr(self.expression(expr))]
+
+        value = self.expression(expr.value)
+        if expr.depth == -1:
+            name = self.assign_global(expr)
+            return [ast.Assign([store(name)], self.checked(expr, value))]
+
+        name, boxed = self.variable(expr)
+        if boxed:
+            target = ast.Attribute(load(name), "value", ast.Store())
+            return [ast.Assign([target], value)]
+        return [ast.Assign([store(name)], value)]
+
+    def visit_print(self, stmt: PrintStmt):
+        return [ast.Expr(call("_print", self.expression(stmt.expr)))]
+
+    def visit_expression(self, stmt: ExprStmt):
+        return self.effect(stmt.expr)
+
+    def visit_varstmt(self, stmt: VarStmt):
+        value = ast.Constant(None)
+        if stmt.initializer is not None:
+            value = self.expression(stmt.initializer)
+        if stmt.boxed:
+            value = call("_cell", value)
+        return [ast.Assign([store(self.define(stmt))], value)]
+
+    def define(self, stmt: VarStmt | FuncStmt) -> str:
+        if stmt.slot >= 0:
+            return self.local(0, stmt.slot)
+        name = mangle(stmt.name.lexeme)
+        self.globals.add(name)
+        return name
+
+    def visit_block(self, stmt: BlockStmt):
+        if not stmt.size:
+            return self.statements(stmt.statements)
+
+        self.scopes.append(self.reserve(stmt.size))
+        code = self.statements(stmt.statements)
+        self.top = self.scopes.pop()
+        return code
+
+    def visit_if(self, stmt: IfStmt):
+        orelse = []
+        if stmt.else_branch is not None:
+            orelse = self.statement(stmt.else_branch)
+        return [
+            ast.If(
+                self.truthy(stmt.condition), self.statement(stmt.then_branch), orelse
+            )
+        ]
+
+    def reset(self, loop: WhileStmt | ForStmt | RangeStmt) -> list[ast.stmt]:
+        # invariants are computed again each time the loop is entered
+        code = []
+        for invariant in loop.invariants:
+            name = self.invariants[id(invariant)] = self.temp()
+            code.append(ast.Assign([store(name)], load("_unset")))
+        return code
+
+    def body(self, stmt: Stmt, increment: Expr | None) -> list[ast.stmt]:
+        self.loops.append((increment, self.scopes[:]))
+        code = self.statement(stmt)
+        self.loops.pop()
+        return code
+
+    def visit_while(self, stmt: WhileStmt):
+        code = self.reset(stmt)
+        code.append(
+            ast.While(self.truthy(stmt.condition), self.body(stmt.body, None), [])
+        )
+        return code
+
+    def visit_for(self, stmt: ForStmt):
+        top = self.top
+        if stmt.size:
+            self.scopes.append(self.reserve(stmt.size))
+
+        code = []
+        if stmt.initializer is not None:
+            code += self.dispatch[stmt.initializer.kind](stmt.initializer)
+        code += self.reset(stmt)
+        condition = self.truthy(stmt.condition)
+        body = self.body(stmt.body, stmt.increment)
+        if stmt.increment is not None:
+            body += self.effect(stmt.increment)
+        code.append(ast.While(condition, body, []))
+
+        if stmt.size:
+            self.scopes.pop()
+        self.top = top
+        return code
+
+    def visit_range(self, stmt: RangeStmt):
+        top = self.top
+        step = ast.Constant(1.0) if stmt.step is None else self.expression(stmt.step)
+        numbers = call(
+            "_range",
+            ast.Constant(stmt.keyword.line),
+            self.expression(stmt.start),
+            self.expression(stmt.stop),
+            step,
+        )
+
+        self.scopes.append(self.reserve(1))
+        code = self.reset(stmt)
+        name = self.local(0, 0)
+        if stmt.boxed:
+            # each round has its own variable, closures keep theirs
+            counter = self.temp()
+            body = [ast.Assign([store(name)], call("_cell", load(counter)))]
+            body += self.body(stmt.body, None)
+        else:
+            counter = name
+            body = self.body(stmt.body, None)
+        loop = ast.For(store(counter), numbers, body, [])
+        loop.lineno = stmt.keyword.line
+        code.append(loop)
+
+        self.scopes.pop()
+        self.top = top
+        return code
+
+    def visit_function(self, stmt: FuncStmt):
+        if not stmt.parsed:
+            return self.deferred_function(stmt)
+
+        upvalues = [
+            load(self.local(depth, slot) if local else f"u{slot}")
+            for local, depth, slot in stmt.upvalues
+        ]
+
+        # a function of its own, with its own locals
+        outer = self.scopes, self.top, self.loops, self.invariants, self.globals
+        self.scopes, self.top, self.loops, self.invariants, self.globals = (
+            [0],
+            stmt.size,
+            [],
+            {},
+            set(),
+        )
+        try:
+            body = [
+                ast.Assign([store(f"v{slot}")], call("_cell", load(f"v{slot}")))
+                for slot in stmt.cells
+            ]
+            body += self.statements(stmt.body)
+            params = [f"v{slot}" for slot in range(len(stmt.params))]
+            name = self.temp() if stmt.slot >= 0 and stmt.boxed else None
+            function = self.function(name or "_", params, upvalues, body)
+        finally:
+            self.scopes, self.top, self.loops, self.invariants, self.globals = outer
+        function.lineno = stmt.name.line
+
+        if name is None:
+            # printed with its own name
+            name = function.name = self.define(stmt)
+            target = ast.Attribute(load(name), "__name__", ast.Store())
+            return [function, ast.Assign([target], ast.Constant(stmt.name.lexeme))]
+
+        # the function may capture itself, its cell is in place first
+        cell = self.define(stmt)
+        target = ast.Attribute(load(name), "__name__", ast.Store())
+        return [
+            ast.Assign([store(cell)], call("_cell")),
+            function,
+            ast.Assign([target], ast.Constant(stmt.name.lexeme)),
+            ast.Assign([ast.Attribute(load(cell), "value", ast.Store())], load(name)),
+        ]
+
+    def deferred_function(self, stmt: FuncStmt) -> list[ast.stmt]:
+        # only global functions are left unparsed, they capture nothing. The
+        # function compiles its body on its first call, then runs it
+        index = len(self.deferred)
+        self.deferred.append(stmt)
+        params = [f"v{slot}" for slot in range(len(stmt.params))]
+        compiled = call("_lazy", ast.Constant(index))
+        body = [ast.Return(ast.Call(compiled, [load(param) for param in params], []))]
+
+        name = self.define(stmt)
+        function = self.function(name, params, [], body)
+        function.lineno = stmt.name.line
+        target = ast.Attribute(load(name), "__name__", ast.Store())
+        return [
+            function,
+            ast.Assign([target], ast.Constant(stmt.name.lexeme)),
+            ast.Expr(call("_defer", ast.Constant(index), load(name))),
+        ]
+
+    def visit_return(self, stmt: ReturnStmt):
+        value = None if stmt.value is None else self.expression(stmt.value)
+        code = ast.Return(value)
+        code.lineno = stmt.keyword.line
+        return [code]
+
+    def visit_break(self, stmt: BreakStmt):
+        return [ast.Break()]
+
+    def visit_continue(self, stmt: ContinueStmt):
+        increment, scopes = self.loops[-1]
+        if increment is None:
+            return [ast.Continue()]
+
+        # its variables are found from the loop, not from the blocks in it
+        inner, self.scopes = self.scopes, scopes
+        try:
+            code = self.effect(increment)
+        finally:
+            self.scopes = inner
+        return code + [ast.Continue()]
+
+
+# --------------------
+# Runtime
+# --------------------
+
+# what operators fall back to, and what checks the callables
+operators = Interpreter()
+
+# floats counting with no rounding error, as ints do
+exact = 2.0**53
+
+
+def binary(op: str, line: int, left: object, right: object):
+    return operators.binary(Token(TokenType(op), op, None, line), left, right)
+
+
+def unary(op: str, line: int, right: object):
+    return operators.unary(Token(TokenType(op), op, None, line), right)
+
+
+def call_value(line: int, callee: object, *arguments: object):
+    paren = Token(TokenType.RIGHT_BRACE, ")", None, line)
+    if type(callee) is FunctionType:
+        arity = callee.__code__.co_argcount
+    elif isinstance(callee, HiEmCallable):
+        arity = callee.arity()
+    else:
+        raise InterpreterError("Can only call functions and classes.", paren)
+
+    if len(arguments) != arity:
+        raise InterpreterError(
+            f"Expected {arity} arguments but got {len(arguments)}.", paren
+        )
+    if type(callee) is FunctionType:
+        return callee(*arguments)
+    return callee.call(operators, list(arguments))
+
+
+def numbers(line: int, start: object, stop: object, step: object):
+    keyword = Token(TokenType.RANGE, "khoảng", None, line)
+    operators.check_number(keyword, start, stop, step)
+    if step == 0:
+        raise InterpreterError("Range step must not be zero.", keyword)
+
+    if all(
+        value.is_integer() and abs(value) < exact for value in (start, stop, step)
+    ) and (start != 0 or math.copysign(1.0, start) > 0):
+        return map(float, range(int(start), int(stop), int(step)))
+    return count(start, stop, step)
+
+
+def count(start: float, stop: float, step: float):
+    compare = operator.lt if step > 0 else operator.gt
+    counter = start
+    while compare(counter, stop):
+        yield counter
+        counter += step
+
+
+def show(value: object):
+    if type(value) is FunctionType:
+        print(f"<Fn({value.__name__})>")
+    else:
+        print(value)
+
+
+def store_cell(cell: Cell, value: object):
+    cell.value = value
+    return value
+
+
+class Deferred:
+    """Global functions transpiled before their bodies were parsed: each
+    is parsed, transpiled and compiled on its first call, its code then
+    takes the place of the function's"""
+
+    def __init__(self, declarations: list[FuncStmt], filename: str) -> None:
+        self.declarations = declarations
+        self.filename = filename
+        self.functions: list[FunctionType | None] = [None] * len(declarations)
+
+    def add(self, index: int, function: FunctionType):
+        self.functions[index] = function
+
+    def compile(self, index: int) -> FunctionType:
+        from .hi_em import HiEm
+
+        declaration, function = self.declarations[index], self.functions[index]
+        # the errors are reported as the body is parsed, only its own count
+        had_error, HiEm.had_error = HiEm.had_error, False
+        declaration.body
+        failed = HiEm.had_error
+        HiEm.had_error = had_error or failed
+        if failed:
+            raise InterpreterError("Function body has syntax errors.", declaration.name)
+
+        try:
+            module = Transpiler().global_function(declaration)
+            code = compile(module, self.filename, "exec")
+        except (RecursionError, MemoryError, SyntaxError):
+            raise InterpreterError(
+                "Function body is nested too deeply.", declaration.name
+            )
+        function.__code__ = next(
+            constant for constant in code.co_consts if type(constant) is CodeType
+        )
+        return function
+
+
+# the globals of transpiled code besides the variables of the program
+runtime = {
+    "_binary": binary,
+    "_unary": unary,
+    "_call": call_value,
+    "_range": numbers,
+    "_print": show,
+    "_store": store_cell,
+    "_cell": Cell,
+    "_function": FunctionType,
+    "_unset": object(),
+}
+
+
+def undefined(error: NameError) -> InterpreterError | None:
+    """The interpreter's error for a global read before it's defined"""
+    if not (error.name or "").startswith("h_"):
+        return None
+    name = demangle(error.name)
+    line = traceback.extract_tb(error.__traceback__)[-1].lineno
+    return InterpreterError(
+        f"Undefined variable '{name}'.", Token(TokenType.IDENTIFIER, name, None, line)
+    )
+
+
+def overflow(error: RecursionError, filename: str) -> InterpreterError:
+    """The VM's error for calls nested too deep, at the innermost call of
+    the program"""
+    lines = [
+        frame.lineno
+        for frame in traceback.extract_tb(error.__traceback__)
+        if frame.filename == filename
+    ]
+    paren = Token(TokenType.RIGHT_BRACE, ")", None, lines[-1] if lines else 0)
+    return InterpreterError("Stack overflow.", paren)
+
+
+class PythonInterpreter(Interpreter):
+    """Interpreter running programs transpiled by `Transpiler` as CPython
+    code, its visit methods only run what CPython can't compile"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        # path, source and optimization level of the script, to cache its
+        # code next to it
+        self.script: tuple[str, str, int] | None = None
+        # functions of the code whose bodies weren't parsed yet
+        self.deferred = Deferred([], "<script>")
+
+    def interpret(self, statements: list[Stmt]):
+        from .hi_em import HiEm
+
+        code = self.code(statements)
+        if code is None:
+            super().interpret(statements)
+            return
+
+        namespace = {
+            **runtime,
+            "_defer": self.deferred.add,
+            "_lazy": self.deferred.compile,
+            mangle("đồng_hồ"): ClockNative(),
+        }
+        try:
+            exec(code, namespace)
+        except InterpreterError as err:
+            HiEm.error_runtime(err)
+        except NameError as err:
+            error = undefined(err)
+            if error is None:
+                raise
+            HiEm.error_runtime(error)
+        except RecursionError as err:
+            HiEm.error_runtime(overflow(err, code.co_filename))
+
+    def code(self, statements: list[Stmt]) -> CodeType | None:
+        if self.script is not None:
+            path, source, level = self.script
+            code = cache.load_code(path, source, level)
+            if code is not None:
+                return code
+
+        filename = "<script>" if self.script is None else self.script[0]
+        transpiler = Transpiler()
+        try:
+            code = compile(transpiler.module(statements), filename, "exec")
+        except (RecursionError, MemoryError, SyntaxError):
+            # nested too deep, or more loops in each other than CPython
+            # allows
+            return None
+        self.deferred = Deferred(transpiler.deferred, filename)
+
+        # the code of deferred functions isn't in it
+        if self.script is not None and not transpiler.deferred:
+            cache.save_code(*self.script, code)
+        return code
@@ -0,0 +1,33 @@
+from array import array
+from bisect import bisect_right
+
+# instructions, operands and so jump targets are 32-bit words, so neither
+# the offsets of huge scripts nor their constants outgrow them
+max_word = 0xFFFFFFFF
+
+
+class Chunk:
+    """Bytecode of one function: its instructions and their operands, the
+    constants they refer to, and the line of every word, stored as the
+    offsets where the line changes and the line from there on"""
+
+    __slots__ = ("code", "constants", "starts", "lines")
+
+    def __init__(self) -> None:
+        self.code = array("I")
+        self.constants: list[object] = []
+        self.starts = array("I")
+        self.lines = array("I")
+
+    def write(self, word: int, line: int):
+        if not self.lines or self.lines[-1] != line:
+            self.starts.append(len(self.code))
+            self.lines.append(line)
+        self.code.append(word)
+
+    def add_constant(self, value: object) -> int:
+        self.constants.append(value)
+        return len(self.constants) - 1
+
+    def line(self, offset: int) -> int:
+        return self.lines[bisect_right(self.starts, offset) - 1]
@@ -0,0 +1,447 @@
+from ..parser.expr.visitor import VisitorExpr
+from ..parser.expr.expr import (
+    Expr,
+    VariableExpr,
+    AssignExpr,
+    CallExpr,
+    InvariantExpr,
+    InlineExpr,
+)
+from ..parser.hashcons import literal_key
+from ..parser.stmt.visitor import VisitorStmt
+from ..parser.stmt.stmt import (
+    Stmt,
+    PrintStmt,
+    ExprStmt,
+    VarStmt,
+    BlockStmt,
+    IfStmt,
+    WhileStmt,
+    ForStmt,
+    RangeStmt,
+    FuncStmt,
+    ReturnStmt,
+    BreakStmt,
+    ContinueStmt,
+)
+from ..parser.node_kind import NodeKind, dispatch_table
+from ..scanner.token_type import TokenType
+from .chunk import Chunk, max_word
+from .function import VMFunction
+from .opcode import OpCode
+
+BINARY = NodeKind.BINARY.value
+UNARY = NodeKind.UNARY.value
+GROUPING = NodeKind.GROUPING.value
+LITERAL = NodeKind.LITERAL.value
+LOGICAL = NodeKind.LOGICAL.value
+NUMBER_BINARY = NodeKind.NUMBER_BINARY.value
+NUMBER_UNARY = NodeKind.NUMBER_UNARY.value
+
+binary_opcodes = {
+    TokenType.PLUS: OpCode.ADD,
+    TokenType.MINUS: OpCode.SUBTRACT,
+    TokenType.STAR: OpCode.MULTIPLY,
+    TokenType.SLASH: OpCode.DIVIDE,
+    TokenType.GREATER: OpCode.GREATER,
+    TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+    TokenType.LESS: OpCode.LESS,
+    TokenType.LESS_EQUAL: OpCode.LESS_EQUAL,
+    TokenType.EQUAL_EQUAL: OpCode.EQUAL,
+    TokenType.BANG_EQUAL: OpCode.NOT_EQUAL,
+}
+unary_opcodes = {TokenType.MINUS: OpCode.NEGATE, TokenType.BANG: OpCode.NOT}
+
+
+class CompileError(RuntimeError):
+    """A chunk too large for its operands, at `line`"""
+
+    def __init__(self, message: str, line: int) -> None:
+        super().__init__(message)
+        self.line = line
+
+
+# what the explicit stack of `expression` holds besides nodes
+OPERATOR, JUMP, PATCH = range(3)
+
+
+def compile_script(statements: list[Stmt]) -> VMFunction:
+    """Compile resolved top-level statements into the function running
+    them, the functions they declare are compiled on their first call"""
+    function = VMFunction(None)
+    Compiler(function).script(statements)
+    return function
+
+
+class Compiler(VisitorExpr, VisitorStmt):
+    """Compiles one function into a chunk of bytecode.
+
+    Every local of the function has a slot of its frame: each scope the
+    resolver gave slots to is laid out after the scopes enclosing it, so a
+    (depth, slot) becomes the slot of the frame the scope starts at plus
+    the slot. Scopes that are never open at once share slots. Loops take
+    extra slots for their invariants and ranges for their counter, stop and
+    step. Captured variables hold cells, as for the interpreter, and are
+    read and written through them.
+    """
+
+    def __init__(self, function: VMFunction) -> None:
+        self.function = function
+        self.chunk = Chunk()
+        # first slot of each open scope, innermost last, and the first free
+        self.scopes: list[int] = []
+        self.top = 0
+        self.line = 0
+        # jumps of the `dừng` and `tiếp` of each loop compiled, and where
+        # the `tiếp` go when known already
+        self.loops: list[tuple[list[int], list[int], int | None]] = []
+        # InvariantExpr id -> slot holding its value
+        self.invariants: dict[int, int] = {}
+        self.constants: dict[tuple, int] = {}
+        self.dispatch = dispatch_table(self)
+
+    def script(self, statements: list[Stmt]):
+        self.statements(statements)
+        self.finish()
+
+    def function_body(self):
+        declaration = self.function.declaration
+        self.line = declaration.name.line
+        # parameters first, in the scope of the body
+        self.scopes.append(0)
+        self.reserve(declaration.size)
+        self.statements(declaration.body)
+        self.function.cells = list(declaration.cells)
+        self.finish()
+
+    def finish(self):
+        self.emit(OpCode.NIL, OpCode.RETURN)
+        self.function.chunk = self.chunk
+
+    # --------------------
+    # Code
+    # --------------------
+
+    def emit(self, *words: int):
+        for word in words:
+            self.chunk.write(word, self.line)
+
+    def emit_jump(self, opcode: OpCode) -> int:
+        # the offset of the target, patched once it's known
+        self.emit(opcode, 0)
+        return len(self.chunk.code) - 1
+
+    def patch(self, offset: int):
+        self.chunk.code[offset] = self.target(len(self.chunk.code))
+
+    def target(self, offset: int) -> int:
+        if offset > max_word:
+            raise CompileError("Too much code to jump over.", self.line)
+        return offset
+
+    def constant(self, value: object) -> int:
+        key = literal_key(value)
+        index = self.constants.get(key)
+        if index is None:
+            index = self.constants[key] = self.chunk.add_constant(value)
+            if index > max_word:
+                raise CompileError("Too many constants in one chunk.", self.line)
+        return index
+
+    def reserve(self, size: int) -> int:
+        base = self.top
+        self.top += size
+        self.function.size = max(self.function.size, self.top)
+        return base
+
+    def local(self, depth: int, slot: int) -> int:
+        return self.scopes[-1 - depth] + slot
+
+    # --------------------
+    # Expression
+    # --------------------
+
+    def expression(self, expr: Expr):
+        # operators are compiled with an explicit stack, as deep as they nest
+        todo: list = [expr]
+        while todo:
+            node = todo.pop()
+
+            if type(node) is tuple:
+                action, node = node
+                if action == OPERATOR:
+                    self.line = node.op.line
+                    if node.kind in (UNARY, NUMBER_UNARY):
+                        self.emit(unary_opcodes[node.op.type])
+                    else:
+                        self.emit(binary_opcodes[node.op.type])
+                elif action == JUMP:
+                    # the left operand is the value if it decides
+                    self.line = node.op.line
+                    if node.op.type == TokenType.OR:
+                        jump = self.emit_jump(OpCode.JUMP_IF_TRUE)
+                    else:
+                        jump = self.emit_jump(OpCode.JUMP_IF_FALSE)
+                    self.emit(OpCode.POP)
+                    todo += ((PATCH, jump), node.right)
+                else:
+                    self.patch(node)
+                continue
+
+            kind = node.kind
+            if kind == BINARY or kind == NUMBER_BINARY:
+                todo += ((OPERATOR, node), node.right, node.left)
+            elif kind == UNARY or kind == NUMBER_UNARY:
+                todo += ((OPERATOR, node), node.expr)
+            elif kind == GROUPING:
+                todo.append(node.expr)
+            elif kind == LOGICAL:
+                todo += ((JUMP, node), node.left)
+            elif kind == LITERAL:
+                self.literal(node.literal)
+            else:
+                self.dispatch[kind](node)
+
+    def literal(self, value: object):
+        if value is None:
+            self.emit(OpCode.NIL)
+        elif value is True:
+            self.emit(OpCode.TRUE)
+        elif value is False:
+            self.emit(OpCode.FALSE)
+        else:
+            self.emit(OpCode.CONSTANT, self.constant(value))
+
+    def visit_varexpr(self, expr: VariableExpr):
+        self.line = expr.name.line
+        if expr.depth == -1:
+            self.emit(OpCode.GET_GLOBAL, self.constant(expr.name.lexeme))
+        elif expr.depth == -2:
+            self.emit(OpCode.GET_UPVALUE, expr.slot)
+        elif expr.boxed:
+            self.emit(OpCode.GET_BOXED, self.local(expr.depth, expr.slot))
+        else:
+            self.emit(OpCode.GET_LOCAL, self.local(expr.depth, expr.slot))
+
+    def visit_assignexpr(self, expr: AssignExpr):
+        self.expression(expr.value)
+        self.line = expr.name.line
+        if expr.depth == -1:
+            self.emit(OpCode.SET_GLOBAL, self.constant(expr.name.lexeme))
+        elif expr.depth == -2:
+            self.emit(OpCode.SET_UPVALUE, expr.slot)
+        elif expr.boxed:
+            self.emit(OpCode.SET_BOXED, self.local(expr.depth, expr.slot))
+        else:
+            self.emit(OpCode.SET_LOCAL, self.local(expr.depth, expr.slot))
+
+    def visit_invariant(self, expr: InvariantExpr):
+        slot = self.invariants.get(id(expr))
+        if slot is None:
+            self.expression(expr.expr)
+            return
+
+        # the value once computed since the loop was entered
+        self.emit(OpCode.INVARIANT, slot, 0)
+        jump = len(self.chunk.code) - 1
+        self.expression(expr.expr)
+        self.emit(OpCode.SET_LOCAL, slot)
+        self.patch(jump)
+
+    def visit_inline(self, expr: InlineExpr):
+        # the arguments are the only locals the body sees
+        base = self.reserve(len(expr.arguments))
+        for slot, argument in enumerate(expr.arguments):
+            self.expression(argument)
+            self.emit(OpCode.DEFINE_LOCAL, base + slot)
+
+        scopes, self.scopes = self.scopes, [base]
+        self.expression(expr.expr)
+        self.scopes = scopes
+        self.top = base
+
+    def visit_call(self, expr: CallExpr):
+        self.expression(expr.calle)
+        for argument in expr.arguments:
+            self.expression(argument)
+        self.line = expr.paren.line
+        self.emit(OpCode.CALL, len(expr.arguments))
+
+    # --------------------
+    # Statement
+    # --------------------
+
+    def statements(self, statements: list[Stmt]):
+        for statement in statements:
+            self.dispatch[statement.kind](statement)
+
+    def visit_print(self, stmt: PrintStmt):
+        self.expression(stmt.expr)
+        self.emit(OpCode.PRINT)
+
+    def visit_expression(self, stmt: ExprStmt):
+        self.expression(stmt.expr)
+        self.emit(OpCode.POP)
+
+    def visit_varstmt(self, stmt: VarStmt):
+        if stmt.initializer is None:
+            self.emit(OpCode.NIL)
+        else:
+            self.expression(stmt.initializer)
+        self.line = stmt.name.line
+        self.define(stmt)
+
+    def define(self, stmt: VarStmt | FuncStmt):
+        if stmt.slot < 0:
+            self.emit(OpCode.DEFINE_GLOBAL, self.constant(stmt.name.lexeme))
+        elif stmt.boxed:
+            self.emit(OpCode.BOX, self.local(0, stmt.slot))
+        else:
+            self.emit(OpCode.DEFINE_LOCAL, self.local(0, stmt.slot))
+
+    def visit_block(self, stmt: BlockStmt):
+        if not stmt.size:
+            self.statements(stmt.statements)
+            return
+
+        self.scopes.append(self.reserve(stmt.size))
+        self.statements(stmt.statements)
+        self.top = self.scopes.pop()
+
+    def visit_if(self, stmt: IfStmt):
+        self.expression(stmt.condition)
+        otherwise = self.emit_jump(OpCode.POP_JUMP_IF_FALSE)
+        self.dispatch[stmt.then_branch.kind](stmt.then_branch)
+        if stmt.else_branch is None:
+            self.patch(otherwise)
+            return
+
+        end = self.emit_jump(OpCode.JUMP)
+        self.patch(otherwise)
+        self.dispatch[stmt.else_branch.kind](stmt.else_branch)
+        self.patch(end)
+
+    def reset(self, loop: WhileStmt | ForStmt | RangeStmt):
+        # invariants are computed again each time the loop is entered
+        for invariant in loop.invariants:
+            slot = self.invariants[id(invariant)] = self.reserve(1)
+            self.emit(OpCode.RESET, slot)
+
+    def body(self, stmt: Stmt, target: int | None) -> tuple[list[int], list[int]]:
+        # the jumps of the `dừng` and `tiếp` of the body
+        self.loops.append(([], [], target))
+        self.dispatch[stmt.kind](stmt)
+        breaks, continues, _ = self.loops.pop()
+        return breaks, continues
+
+    def visit_while(self, stmt: WhileStmt):
+        top = self.top
+        self.reset(stmt)
+
+        start = len(self.chunk.code)
+        self.expression(stmt.condition)
+        end = self.emit_jump(OpCode.POP_JUMP_IF_FALSE)
+        breaks, _ = self.body(stmt.body, start)
+        self.emit(OpCode.JUMP, self.target(start))
+
+        self.patch(end)
+        for jump in breaks:
+            self.patch(jump)
+        self.top = top
+
+    def visit_for(self, stmt: ForStmt):
+        top = self.top
+        if stmt.size:
+            self.scopes.append(self.reserve(stmt.size))
+        if stmt.initializer is not None:
+            self.dispatch[stmt.initializer.kind](stmt.initializer)
+        self.reset(stmt)
+
+        start = len(self.chunk.code)
+        self.expression(stmt.condition)
+        end = self.emit_jump(OpCode.POP_JUMP_IF_FALSE)
+        breaks, continues = self.body(stmt.body, None)
+        for jump in continues:
+            self.patch(jump)
+        if stmt.increment is not None:
+            self.expression(stmt.increment)
+            self.emit(OpCode.POP)
+        self.emit(OpCode.JUMP, self.target(start))
+
+        self.patch(end)
+        for jump in breaks:
+            self.patch(jump)
+        if stmt.size:
+            self.scopes.pop()
+        self.top = top
+
+    def visit_range(self, stmt: RangeStmt):
+        top = self.top
+        self.expression(stmt.start)
+        self.expression(stmt.stop)
+        if stmt.step is None:
+            self.literal(1.0)
+        else:
+            self.expression(stmt.step)
+
+        # the variable, then the counter, stop and step
+        self.line = stmt.keyword.line
+        base = self.reserve(4)
+        self.emit(OpCode.RANGE_INIT, base)
+        self.scopes.append(base)
+        self.reset(stmt)
+
+        start = len(self.chunk.code)
+        self.emit(OpCode.RANGE_NEXT, base, int(stmt.boxed), 0)
+        end = len(self.chunk.code) - 1
+        breaks, continues = self.body(stmt.body, None)
+        for jump in continues:
+            self.patch(jump)
+        self.emit(OpCode.RANGE_STEP, base, start)
+
+        self.patch(end)
+        for jump in breaks:
+            self.patch(jump)
+        self.scopes.pop()
+        self.top = top
+
+    def visit_function(self, stmt: FuncStmt):
+        self.line = stmt.name.line
+        if stmt.slot >= 0 and stmt.boxed:
+            # the function may capture itself, its cell is in place first
+            self.emit(OpCode.CELL, self.local(0, stmt.slot))
+
+        index = self.chunk.add_constant(VMFunction(stmt))
+        if index > max_word:
+            raise CompileError("Too many constants in one chunk.", self.line)
+        self.emit(OpCode.CLOSURE, index, len(stmt.upvalues))
+        for local, depth, slot in stmt.upvalues:
+            if local:
+                self.emit(1, self.local(depth, slot))
+            else:
+                self.emit(0, slot)
+
+        if stmt.slot >= 0 and stmt.boxed:
+            self.emit(OpCode.SET_BOXED, self.local(0, stmt.slot), OpCode.POP)
+        else:
+            self.define(stmt)
+
+    def visit_return(self, stmt: ReturnStmt):
+        if stmt.value is None:
+            self.emit(OpCode.NIL)
+        else:
+            self.expression(stmt.value)
+        self.line = stmt.keyword.line
+        self.emit(OpCode.RETURN)
+
+    def visit_break(self, stmt: BreakStmt):
+        self.line = stmt.keyword.line
+        self.loops[-1][0].append(self.emit_jump(OpCode.JUMP))
+
+    def visit_continue(self, stmt: ContinueStmt):
+        self.line = stmt.keyword.line
+        _, continues, target = self.loops[-1]
+        if target is None:
+            continues.append(self.emit_jump(OpCode.JUMP))
+        else:
+            self.emit(OpCode.JUMP, self.target(target))
@@ -0,0 +1,66 @@
+from .chunk import Chunk
+from .function import VMFunction
+from .opcode import OpCode, operands
+
+# instructions whose operand is a constant, and those jumping to the last
+with_constant = (
+    OpCode.CONSTANT,
+    OpCode.GET_GLOBAL,
+    OpCode.SET_GLOBAL,
+    OpCode.DEFINE_GLOBAL,
+    OpCode.CLOSURE,
+)
+jumps = (
+    OpCode.JUMP,
+    OpCode.JUMP_IF_FALSE,
+    OpCode.JUMP_IF_TRUE,
+    OpCode.POP_JUMP_IF_FALSE,
+    OpCode.INVARIANT,
+    OpCode.RANGE_NEXT,
+    OpCode.RANGE_STEP,
+)
+
+
+def disassemble(function: VMFunction) -> str:
+    """Listing of the instructions of `function` and of the functions it
+    declares, compiling those that aren't yet"""
+    if function.chunk is None:
+        function.compile()
+
+    lines = [f"== {function.name} =="]
+    offset = 0
+    while offset < len(function.chunk.code):
+        line, offset = instruction(function.chunk, offset)
+        lines.append(line)
+
+    for constant in function.chunk.constants:
+        if isinstance(constant, VMFunction):
+            lines += ("", disassemble(constant))
+    return "\n".join(lines)
+
+
+def instruction(chunk: Chunk, offset: int) -> tuple[str, int]:
+    """One instruction as `offset line name operands`, and the offset of
+    the next one"""
+    code = chunk.code
+    opcode = OpCode(code[offset])
+    count = operands.get(opcode, 0)
+    words = list(code[offset + 1 : offset + 1 + count])
+    end = offset + 1 + count
+
+    line = chunk.line(offset)
+    same = offset > 0 and chunk.line(offset - 1) == line
+    text = f"{offset:04d} {'   |' if same else f'{line:4d}'} {opcode.name:<18}"
+    text = (text + " ".join(str(word) for word in words)).rstrip()
+
+    if opcode in with_constant:
+        text += f" '{chunk.constants[words[0]]}'"
+    elif opcode in jumps:
+        text += f" -> {words[-1]:04d}"
+
+    if opcode == OpCode.CLOSURE:
+        for _ in range(words[1]):
+            local, index = code[end], code[end + 1]
+            text += f"\n{end:04d}    | {'local' if local else 'upvalue':>18} {index}"
+            end += 2
+    return text, end
@@ -0,0 +1,50 @@
+from ..parser.stmt.environment import Cell
+from ..parser.stmt.stmt import FuncStmt
+from .chunk import Chunk
+
+
+class VMFunction:
+    """A function declaration, compiled on its first call"""
+
+    __slots__ = ("declaration", "name", "arity", "chunk", "size", "cells")
+
+    def __init__(self, declaration: FuncStmt | None, name: str = "script") -> None:
+        self.declaration = declaration
+        self.name = name if declaration is None else declaration.name.lexeme
+        self.arity = 0 if declaration is None else len(declaration.params)
+        self.chunk: Chunk | None = None
+        # slots of the frame: parameters, locals of every scope that can be
+        # open at once and what the compiler keeps for itself
+        self.size = 0
+        # slots of the parameters captured by closures
+        self.cells: list[int] = []
+
+    def compile(self):
+        from ..hi_em import HiEm
+        from ..interpreter import InterpreterError
+        from .compiler import Compiler
+
+        # the errors are reported as the body is parsed
+        self.declaration.body
+        if HiEm.had_error:
+            raise InterpreterError(
+                "Function body has syntax errors.", self.declaration.name
+            )
+        Compiler(self).function_body()
+
+    def __str__(self) -> str:
+        return f"<Fn({self.name})>"
+
+
+class VMClosure:
+    """A function with the cells of the variables of enclosing functions it
+    uses"""
+
+    __slots__ = ("function", "upvalues")
+
+    def __init__(self, function: VMFunction, upvalues: list[Cell]) -> None:
+        self.function = function
+        self.upvalues = upvalues
+
+    def __str__(self) -> str:
+        return str(self.function)
@@ -0,0 +1,91 @@
+from enum import IntEnum
+
+
+class OpCode(IntEnum):
+    """Instructions of the VM, each followed in the code by the operands
+    listed in `operands`"""
+
+    CONSTANT = 0
+    NIL = 1
+    TRUE = 2
+    FALSE = 3
+    POP = 4
+
+    # variables: locals by index in the frame, upvalues by index in the
+    # closure, globals by the constant of their name
+    GET_LOCAL = 5
+    SET_LOCAL = 6
+    DEFINE_LOCAL = 7
+    GET_BOXED = 8
+    SET_BOXED = 9
+    BOX = 10
+    CELL = 11
+    GET_UPVALUE = 12
+    SET_UPVALUE = 13
+    GET_GLOBAL = 14
+    SET_GLOBAL = 15
+    DEFINE_GLOBAL = 16
+
+    # operators
+    EQUAL = 17
+    NOT_EQUAL = 18
+    GREATER = 19
+    GREATER_EQUAL = 20
+    LESS = 21
+    LESS_EQUAL = 22
+    ADD = 23
+    SUBTRACT = 24
+    MULTIPLY = 25
+    DIVIDE = 26
+    NOT = 27
+    NEGATE = 28
+
+    PRINT = 29
+
+    # jumps to the absolute offset of their operand
+    JUMP = 30
+    JUMP_IF_FALSE = 31
+    JUMP_IF_TRUE = 32
+    POP_JUMP_IF_FALSE = 33
+
+    # functions
+    CALL = 34
+    CLOSURE = 35
+    RETURN = 36
+
+    # loops
+    RESET = 37
+    INVARIANT = 38
+    RANGE_INIT = 39
+    RANGE_NEXT = 40
+    RANGE_STEP = 41
+
+
+# number of operands of each instruction, CLOSURE is then followed by two
+# for each of the upvalues its second operand counts
+operands = {
+    OpCode.CONSTANT: 1,
+    OpCode.GET_LOCAL: 1,
+    OpCode.SET_LOCAL: 1,
+    OpCode.DEFINE_LOCAL: 1,
+    OpCode.GET_BOXED: 1,
+    OpCode.SET_BOXED: 1,
+    OpCode.BOX: 1,
+    OpCode.CELL: 1,
+    OpCode.GET_UPVALUE: 1,
+    OpCode.SET_UPVALUE: 1,
+    OpCode.GET_GLOBAL: 1,
+    OpCode.SET_GLOBAL: 1,
+    OpCode.DEFINE_GLOBAL: 1,
+    OpCode.JUMP: 1,
+    OpCode.JUMP_IF_FALSE: 1,
+    OpCode.JUMP_IF_TRUE: 1,
+    OpCode.POP_JUMP_IF_FALSE: 1,
+    OpCode.CALL: 1,
+    OpCode.CLOSURE: 2,
+    OpCode.RESET: 1,
+    OpCode.INVARIANT: 2,
+    OpCode.RANGE_INIT: 1,
+    OpCode.RANGE_NEXT: 3,
+    OpCode.RANGE_STEP: 2,
+}
@@ -0,0 +1,398 @@
+from ..interpreter import Interpreter, InterpreterError
+from ..parser.stmt.callable import HiEmCallable, ClockNative
+from ..parser.stmt.environment import Cell, GlobalEnvironment
+from ..parser.stmt.stmt import Stmt
+from ..scanner.token import Token
+from ..scanner.token_type import TokenType
+from .chunk import Chunk
+from .compiler import CompileError, compile_script
+from .function import VMClosure
+from .opcode import OpCode
+
+CONSTANT = OpCode.CONSTANT.value
+NIL = OpCode.NIL.value
+TRUE = OpCode.TRUE.value
+FALSE = OpCode.FALSE.value
+POP = OpCode.POP.value
+GET_LOCAL = OpCode.GET_LOCAL.value
+SET_LOCAL = OpCode.SET_LOCAL.value
+DEFINE_LOCAL = OpCode.DEFINE_LOCAL.value
+GET_BOXED = OpCode.GET_BOXED.value
+SET_BOXED = OpCode.SET_BOXED.value
+BOX = OpCode.BOX.value
+CELL = OpCode.CELL.value
+GET_UPVALUE = OpCode.GET_UPVALUE.value
+SET_UPVALUE = OpCode.SET_UPVALUE.value
+GET_GLOBAL = OpCode.GET_GLOBAL.value
+SET_GLOBAL = OpCode.SET_GLOBAL.value
+DEFINE_GLOBAL = OpCode.DEFINE_GLOBAL.value
+EQUAL = OpCode.EQUAL.value
+NOT_EQUAL = OpCode.NOT_EQUAL.value
+GREATER = OpCode.GREATER.value
+GREATER_EQUAL = OpCode.GREATER_EQUAL.value
+LESS = OpCode.LESS.value
+LESS_EQUAL = OpCode.LESS_EQUAL.value
+ADD = OpCode.ADD.value
+SUBTRACT = OpCode.SUBTRACT.value
+MULTIPLY = OpCode.MULTIPLY.value
+DIVIDE = OpCode.DIVIDE.value
+NOT = OpCode.NOT.value
+NEGATE = OpCode.NEGATE.value
+PRINT = OpCode.PRINT.value
+JUMP = OpCode.JUMP.value
+JUMP_IF_FALSE = OpCode.JUMP_IF_FALSE.value
+JUMP_IF_TRUE = OpCode.JUMP_IF_TRUE.value
+POP_JUMP_IF_FALSE = OpCode.POP_JUMP_IF_FALSE.value
+CALL = OpCode.CALL.value
+CLOSURE = OpCode.CLOSURE.value
+RETURN = OpCode.RETURN.value
+RESET = OpCode.RESET.value
+INVARIANT = OpCode.INVARIANT.value
+RANGE_INIT = OpCode.RANGE_INIT.value
+RANGE_NEXT = OpCode.RANGE_NEXT.value
+RANGE_STEP = OpCode.RANGE_STEP.value
+
+# the token runtime errors of an instruction are reported at
+error_tokens = {
+    ADD: TokenType.PLUS,
+    SUBTRACT: TokenType.MINUS,
+    MULTIPLY: TokenType.STAR,
+    DIVIDE: TokenType.SLASH,
+    GREATER: TokenType.GREATER,
+    GREATER_EQUAL: TokenType.GREATER_EQUAL,
+    LESS: TokenType.LESS,
+    LESS_EQUAL: TokenType.LESS_EQUAL,
+    NEGATE: TokenType.MINUS,
+    GET_GLOBAL: TokenType.IDENTIFIER,
+    SET_GLOBAL: TokenType.IDENTIFIER,
+    CALL: TokenType.RIGHT_BRACE,
+    RANGE_INIT: TokenType.RANGE,
+}
+
+# value of an invariant's slot until it's computed
+UNSET = object()
+
+# most calls running at once
+max_frames = 10000
+
+
+class VM:
+    """Runs compiled programs with one value stack: a call's frame is the
+    callee, its arguments and its other locals on the stack, the operands
+    of its instructions above them. Values, errors and the order things
+    happen in are those of the interpreter, except that calling something
+    that isn't a function with the wrong number of arguments is a runtime
+    error."""
+
+    def __init__(self) -> None:
+        self.globals = GlobalEnvironment()
+        self.globals.define("đồng_hồ", ClockNative())
+        # the interpreter's operators for anything but numbers, and its errors
+        self.operators = Interpreter()
+        self.stack: list[object] = []
+
+    def interpret(self, statements: list[Stmt]):
+        try:
+            self.run(VMClosure(compile_script(statements), []))
+        except InterpreterError as err:
+            from ..hi_em import HiEm
+
+            HiEm.error_runtime(err)
+        except CompileError as err:
+            from ..hi_em import HiEm
+
+            HiEm.error(err.line, str(err))
+
+    def token(self, chunk: Chunk, ip: int, lexeme: str = "") -> Token:
+        opcode = chunk.code[ip]
+        return Token(error_tokens[opcode], lexeme, None, chunk.line(ip))
+
+    def run(self, closure: VMClosure) -> object:
+        stack = self.stack
+        operators = self.operators
+        cells = self.globals.cells
+        frames: list[tuple[VMClosure, int, int]] = []
+
+        stack.append(closure)
+        base = len(stack)
+        function = closure.function
+        stack.extend([None] * function.size)
+        chunk = function.chunk
+        code, constants, upvalues = chunk.code, chunk.constants, closure.upvalues
+        ip = 0
+
+        while True:
+            op = code[ip]
+
+            if op == GET_LOCAL:
+                stack.append(stack[base + code[ip + 1]])
+                ip += 2
+            elif op == CONSTANT:
+                stack.append(constants[code[ip + 1]])
+                ip += 2
+            elif op == POP:
+                stack.pop()
+                ip += 1
+            elif op == SET_LOCAL:
+                stack[base + code[ip + 1]] = stack[-1]
+                ip += 2
+            elif op == DEFINE_LOCAL:
+                stack[base + code[ip + 1]] = stack.pop()
+                ip += 2
+            elif op == ADD:
+                b = stack.pop()
+                a = stack[-1]
+                if type(a) is float and type(b) is float:
+                    stack[-1] = a + b
+                else:
+                    stack[-1] = operators.binary(self.token(chunk, ip), a, b)
+                ip += 1
+            elif op == SUBTRACT:
+                b = stack.pop()
+                a = stack[-1]
+                if type(a) is float and type(b) is float:
+                    stack[-1] = a - b
+                else:
+                    stack[-1] = operators.binary(self.token(chunk, ip), a, b)
+                ip += 1
+            elif op == MULTIPLY:
+                b = stack.pop()
+                a = stack[-1]
+                if type(a) is float and type(b) is float:
+                    stack[-1] = a * b
+                else:
+                    stack[-1] = operators.binary(self.token(chunk, ip), a, b)
+                ip += 1
+            elif op == LESS:
+                b = stack.pop()
+                a = stack[-1]
+                if type(a) is float and type(b) is float:
+                    stack[-1] = a < b
+                else:
+                    stack[-1] = operators.binary(self.token(chunk, ip), a, b)
+                ip += 1
+            elif op == POP_JUMP_IF_FALSE:
+                value = stack.pop()
+                if value is None or value is False:
+                    ip = code[ip + 1]
+                else:
+                    ip += 2
+            elif op == JUMP:
+                ip = code[ip + 1]
+            elif op == GET_GLOBAL:
+                name = constants[code[ip + 1]]
+                cell = cells.get(name)
+                if cell is None:
+                    raise InterpreterError(
+                        f"Undefined variable '{name}'.", self.token(chunk, ip, name)
+                    )
+                stack.append(cell.value)
+                ip += 2
+            elif op == SET_GLOBAL:
+                name = constants[code[ip + 1]]
+                cell = cells.get(name)
+                if cell is None:
+                    raise InterpreterError(
+                        f"Undefined variable '{name}'.", self.token(chunk, ip, name)
+                    )
+                cell.value = stack[-1]
+                ip += 2
+            elif op == GET_BOXED:
+                stack.append(stack[base + code[ip + 1]].value)
+                ip += 2
+            elif op == SET_BOXED:
+                stack[base + code[ip + 1]].value = stack[-1]
+                ip += 2
+            elif op == GET_UPVALUE:
+                stack.append(upvalues[code[ip + 1]].value)
+                ip += 2
+            elif op == SET_UPVALUE:
+                upvalues[code[ip + 1]].value = stack[-1]
+                ip += 2
+            elif op == CALL:
+                count = code[ip + 1]
+                callee = stack[-1 - count]
+                if type(callee) is VMClosure:
+                    function = callee.function
+                    if function.arity != count:
+                        raise InterpreterError(
+                            f"Expected {function.arity} arguments but got {count}.",
+                            self.token(chunk, ip),
+                        )
+                    if len(frames) >= max_frames:
+                        raise InterpreterError("Stack overflow.", self.token(chunk, ip))
+                    if function.chunk is None:
+                        function.compile()
+
+                    frames.append((closure, ip + 2, base))
+                    closure = callee
+                    base = len(stack) - count
+                    stack.extend([None] * (function.size - count))
+                    for slot in function.cells:
+                        stack[base + slot] = Cell(stack[base + slot])
+                    chunk = function.chunk
+                    code, constants, upvalues = (
+                        chunk.code,
+                        chunk.constants,
+                        callee.upvalues,
+                    )
+                    ip = 0
+                elif isinstance(callee, HiEmCallable):
+                    if callee.arity() != count:
+                        raise InterpreterError(
+                            f"Expected {callee.arity()} arguments but got {count}.",
+                            self.token(chunk, ip),
+                        )
+                    arguments = stack[len(stack) - count :]
+                    del stack[-1 - count :]
+                    stack.append(callee.call(self, arguments))
+                    ip += 2
+                else:
+                    raise InterpreterError(
+                        "Can only call functions and classes.", self.token(chunk, ip)
+                    )
+            elif op == RETURN:
+                value = stack.pop()
+                del stack[base - 1 :]
+                if not frames:
+                    return value
+                stack.append(value)
+                closure, ip, base = frames.pop()
+                chunk = closure.function.chunk
+                code, constants, upvalues = (
+                    chunk.code,
+                    chunk.constants,
+                    closure.upvalues,
+                )
+            elif op == NIL:
+                stack.append(None)
+                ip += 1
+            elif op == TRUE:
+                stack.append(True)
+                ip += 1
+            elif op == FALSE:
+                stack.append(False)
+                ip += 1
+            elif op == EQUAL:
+                b = stack.pop()
+                stack[-1] = stack[-1] == b
+                ip += 1
+            elif op == NOT_EQUAL:
+                b = stack.pop()
+                stack[-1] = not stack[-1] == b
+                ip += 1
+            elif op == GREATER:
+                b = stack.pop()
+                a = stack[-1]
+                if type(a) is float and type(b) is float:
+                    stack[-1] = a > b
+                else:
+                    stack[-1] = operators.binary(self.token(chunk, ip), a, b)
+                ip += 1
+            elif op == GREATER_EQUAL:
+                b = stack.pop()
+                a = stack[-1]
+                if type(a) is float and type(b) is float:
+                    stack[-1] = a >= b
+                else:
+                    stack[-1] = operators.binary(self.token(chunk, ip), a, b)
+                ip += 1
+            elif op == LESS_EQUAL:
+                b = stack.pop()
+                a = stack[-1]
+                if type(a) is float and type(b) is float:
+                    stack[-1] = a <= b
+                else:
+                    stack[-1] = operators.binary(self.token(chunk, ip), a, b)
+                ip += 1
+            elif op == DIVIDE:
+                b = stack.pop()
+                a = stack[-1]
+                if type(a) is float and type(b) is float:
+                    stack[-1] = a / b
+                else:
+                    stack[-1] = operators.binary(self.token(chunk, ip), a, b)
+                ip += 1
+            elif op == NOT:
+                value = stack[-1]
+                stack[-1] = value is None or value is False
+                ip += 1
+            elif op == NEGATE:
+                value = stack[-1]
+                if type(value) is float:
+                    stack[-1] = -value
+                else:
+                    stack[-1] = operators.unary(self.token(chunk, ip), value)
+                ip += 1
+            elif op == JUMP_IF_FALSE:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip = code[ip + 1]
+                else:
+                    ip += 2
+            elif op == JUMP_IF_TRUE:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip += 2
+                else:
+                    ip = code[ip + 1]
+            elif op == PRINT:
+                print(stack.pop())
+                ip += 1
+            elif op == DEFINE_GLOBAL:
+                self.globals.define(constants[code[ip + 1]], stack.pop())
+                ip += 2
+            elif op == BOX:
+                stack[base + code[ip + 1]] = Cell(stack.pop())
+                ip += 2
+            elif op == CELL:
+                stack[base + code[ip + 1]] = Cell()
+                ip += 2
+            elif op == CLOSURE:
+                function = constants[code[ip + 1]]
+                count = code[ip + 2]
+                captured = []
+                ip += 3
+                for _ in range(count):
+                    if code[ip]:
+                        captured.append(stack[base + code[ip + 1]])
+                    else:
+                        captured.append(upvalues[code[ip + 1]])
+                    ip += 2
+                stack.append(VMClosure(function, captured))
+            elif op == RESET:
+                stack[base + code[ip + 1]] = UNSET
+                ip += 2
+            elif op == INVARIANT:
+                value = stack[base + code[ip + 1]]
+                if value is UNSET:
+                    ip += 3
+                else:
+                    stack.append(value)
+                    ip = code[ip + 2]
+            elif op == RANGE_INIT:
+                step = stack.pop()
+                stop = stack.pop()
+                start = stack.pop()
+                slot = base + code[ip + 1]
+                keyword = self.token(chunk, ip, "khoảng")
+                operators.check_number(keyword, start, stop, step)
+                if step == 0:
+                    raise InterpreterError("Range step must not be zero.", keyword)
+                stack[slot + 1 : slot + 4] = start, stop, step
+                ip += 2
+            elif op == RANGE_NEXT:
+                slot = base + code[ip + 1]
+                counter, stop, step = stack[slot + 1 : slot + 4]
+                if counter < stop if step > 0 else counter > stop:
+                    # each round has its own variable, closures keep theirs
+                    stack[slot] = Cell(counter) if code[ip + 2] else counter
+                    ip += 4
+                else:
+                    ip = code[ip + 3]
+            elif op == RANGE_STEP:
+                slot = base + code[ip + 1]
+                stack[slot + 1] += stack[slot + 3]
+                ip = code[ip + 2]
+            else:
+                raise ValueError(f"Unknown opcode {op}.")
@@ -1,13 +1,30 @@
 # from hi_em.scanner.scanner import Scanner
 import click
-from hi_em.hi_em import HiEm
+from hi_em.hi_em import HiEm, engines
 
 
 @click.command()
 @click.option("--path", default=None)
-def main(path):
+@click.option("--stream", is_flag=True, help="Scan the file lazily, '-' reads stdin.")
+@click.option("--no-cache", is_flag=True, help="Don't read or write __hiemcache__.")
+@click.option("--lazy", is_flag=True, help="Parse function bodies on first call.")
+@click.option("-O", "level", count=True, help="Optimize, -OO hoists loop invariants.")
+@click.option(
+    "--engine",
+    type=click.Choice(list(engines)),
+    default="tree",
+    help="Walk the tree, or compile it to closures, bytecode or Python code.",
+)
+def main(path, stream, no_cache, lazy, level, engine):
     if path:
-        HiEm.run_file(path)
+        HiEm.run_file(
+            path,
+            stream,
+            use_cache=not no_cache,
+            lazy=lazy,
+            level=level,
+            engine=engine,
+        )
     else:
         HiEm.run_prompt()
 
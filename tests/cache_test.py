@@ -0,0 +1,25 @@
+import os
+import tempfile
+import unittest
+from hi_em import cache
+from hi_em.scanner.scanner import Scanner
+from hi_em.parser.parser import Parser
+
+
+class CacheTest(unittest.TestCase):
+    def test_round_trip(self):
+        source = 'đặt a = (3 + 2) / 4;\ntrong khi (a < 5) { in "a"; a = a + 1; }'
+        statements = Parser(Scanner(source).tokens).parse()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "script.hiem")
+            self.assertIsNone(cache.load(path, source))
+
+            cache.save(path, source, statements)
+            self.assertEqual(
+                [repr(statement) for statement in cache.load(path, source)],
+                [repr(statement) for statement in statements],
+            )
+
+            # any change to the source invalidates the entry
+            self.assertIsNone(cache.load(path, source + " "))
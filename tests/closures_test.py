@@ -0,0 +1,112 @@
+import contextlib
+import io
+import unittest
+from hi_em.hi_em import HiEm
+from hi_em.closures import ClosureInterpreter
+from hi_em.scanner.scanner import Scanner
+from hi_em.parser.parser import Parser
+from hi_em.resolver import resolve
+
+
+def run(source: str, level: int, engine: str) -> list[str]:
+    HiEm.had_error = HiEm.had_runtime_error = False
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        HiEm.run(source, level=level, engine=engine)
+    return output.getvalue().splitlines()
+
+
+PROGRAMS = [
+    """
+    hàm fib(n) { nếu (n < 2) trả về n; trả về fib(n - 1) + fib(n - 2); }
+    hàm sq(x) { trả về x * x; }
+    đặt s = 0;
+    lặp (đặt i = 0; i < 10; i = i + 1) s = s + sq(i) - fib(i);
+    in s;
+    in "a" + "b" == "ab";
+    in !nil hoặc sai;
+    in sai và 1;
+    """,
+    """
+    hàm counter() {
+        đặt n = 0;
+        hàm next() { n = n + 1; trả về n; }
+        trả về next;
+    }
+    đặt c = counter();
+    c(); c();
+    in c();
+    đặt fs = nil;
+    lặp (đặt i khoảng(0, 3)) { hàm f() { trả về i; } nếu (i == 1) fs = f; }
+    in fs();
+    """,
+    """
+    đặt x = 0;
+    trong khi (đúng) {
+        x = x + 1;
+        nếu (x < 3) tiếp;
+        lặp (đặt k khoảng(10, 0, -3)) { nếu (k < 5) dừng; in k; }
+        nếu (x >= 4) dừng;
+    }
+    { đặt a = 1; { đặt b = a + 1; a = b * 2; } in a; }
+    """,
+    """
+    đặt a = 1;
+    in a + "s";
+    """,
+    """
+    hàm f(a, b) { trả về a - b; }
+    in f(1);
+    """,
+    """
+    in -"x";
+    """,
+    """
+    in y;
+    """,
+    """
+    lặp (đặt i khoảng(0, 1, 0)) in i;
+    """,
+    """
+    hàm sum(n, acc) { nếu (n == 0) trả về acc; trả về sum(n - 1, acc + n); }
+    hàm find(n) { lặp (đặt k khoảng(0, 9)) { nếu (k == n) trả về sum(k, 0); } }
+    in sum(5000, 0);
+    in find(4);
+    in find(12);
+    trả về find(2);
+    in "after";
+    """,
+    """
+    hàm outer() {
+        đặt n = 5;
+        đặt g = nil;
+        lặp (đặt r = 0; r < 2; r = r + 1) {
+            lặp (đặt i = 0; i < n; i = i + 1) { nếu (g != nil) g(); in i; }
+            hàm h() { n = 2; }
+            g = h;
+        }
+    }
+    outer();
+    """,
+]
+
+
+class ClosuresTest(unittest.TestCase):
+    def test_same_output(self):
+        for source in PROGRAMS:
+            for level in range(3):
+                with self.subTest(source=source, level=level):
+                    self.assertEqual(
+                        run(source, level, "closure"), run(source, level, "tree")
+                    )
+
+    def test_deep_nesting(self):
+        # too deep to compile, the interpreter evaluates it
+        depth = 5000
+        source = "đặt x = " + "1 + (" * depth + "1" + ")" * depth + ";"
+        statements = Parser(Scanner(source).tokens).parse()
+        resolve(statements)
+        interpreter = ClosureInterpreter()
+        interpreter.interpret(statements)
+
+        self.assertEqual(interpreter.globals.cells["x"].value, depth + 1.0)
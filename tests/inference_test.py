@@ -0,0 +1,73 @@
+import contextlib
+import io
+import unittest
+from hi_em.hi_em import HiEm
+from hi_em.scanner.scanner import Scanner
+from hi_em.parser.parser import Parser
+from hi_em.parser.expr.expr import BinaryExpr, NumberBinaryExpr, NumberUnaryExpr
+from hi_em.resolver import resolve
+from hi_em.inference import infer
+
+
+def run(source: str, level: int) -> list[str]:
+    HiEm.had_error = HiEm.had_runtime_error = False
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        HiEm.run(source, level=level)
+    return output.getvalue().splitlines()
+
+
+def analyse(source: str):
+    statements = Parser(Scanner(source).tokens).parse()
+    resolve(statements)
+    infer(statements)
+    return statements
+
+
+class InferenceTest(unittest.TestCase):
+    def test_numbers(self):
+        source = """
+        hàm sum(n) {
+            đặt s = 0;
+            lặp (đặt i = 0; i < n; i = i + 1) s = s + -i;
+            trả về s;
+        }
+        """
+        body = analyse(source)[0].body
+        loop = body[1]
+        self.assertIs(type(loop.condition), BinaryExpr)
+        self.assertIs(type(loop.increment.value), NumberBinaryExpr)
+        increment = loop.body.expr.value
+        self.assertIs(type(increment), NumberBinaryExpr)
+        self.assertIs(type(increment.right), NumberUnaryExpr)
+
+    def test_changing_types(self):
+        source = """
+        đặt x = 1;
+        hàm f() { x = "s"; }
+        đặt i = 0;
+        trong khi (i < 3) { in x + 1; nếu (i > 0) f(); i = i + 1; }
+        """
+        statements = analyse(source)
+        self.assertIs(type(statements[3].body.statements[0].expr), BinaryExpr)
+        # the call may have changed the global counter too
+        self.assertIs(type(statements[3].body.statements[2].expr.value), BinaryExpr)
+
+        output = ["2.0", "2.0", "Operand must be a number.", "[line 5] Error at +"]
+        self.assertEqual(run(source, 1), output)
+        self.assertEqual(run(source, 0), output)
+
+    def test_jumps(self):
+        source = """
+        đặt x = 1;
+        lặp (đặt i = 0; i < 4; i = i + 1) {
+            nếu (i == 2) { x = "s"; dừng; }
+            x = x * 2;
+        }
+        in x + 1;
+        """
+        statements = analyse(source)
+        # the loop may end at its `dừng`, with a string that must raise
+        self.assertIs(type(statements[2].expr), BinaryExpr)
+        output = ["Operand must be a number.", "[line 7] Error at +"]
+        self.assertEqual(run(source, 1), output)
@@ -1,7 +1,16 @@
 import unittest
 from hi_em.scanner.scanner import Scanner
 from hi_em.parser.parser import Parser
-from hi_em.interpreter import Interpreter
+from hi_em.parser.ast_printer import ASTPrinter
+from hi_em.interpreter import Interpreter, warmup, backoff
+from hi_em.parser.expr.expr import (
+    BinaryExpr,
+    FloatBinaryExpr,
+    StringBinaryExpr,
+    LocalVariableExpr,
+    DirectCallExpr,
+)
+from hi_em.resolver import resolve
 
 
 class InterpreterTest(unittest.TestCase):
@@ -20,3 +29,182 @@ class InterpreterTest(unittest.TestCase):
         interpreter = Interpreter()
 
         self.assertEqual(interpreter.interpret(expr), 24 / 4)
+
+    def test_deep_nesting(self):
+        depth = 10000
+        cases = [
+            ("(" * depth + "1" + ")" * depth, 1.0, "( group " * depth),
+            ("1 + (" * depth + "1" + ")" * depth, depth + 1.0, "( PLUS 1.0 ( group "),
+            (" + ".join(["1"] * depth), float(depth), "( PLUS " * (depth - 1)),
+            ("-" * depth + "1", 1.0, "( MINUS " * depth),
+            ("sai hoặc " * depth + "đúng", True, None),
+        ]
+
+        for source, value, printed in cases:
+            expr = Parser(Scanner(source).tokens).expression()
+            self.assertEqual(Interpreter().evaluate(expr), value)
+            if printed is not None:
+                self.assertTrue(ASTPrinter().get_expr(expr).startswith(printed))
+
+    def test_frame_pool(self):
+        source = """
+        hàm fib(n) { nếu (n < 2) trả về n; trả về fib(n - 1) + fib(n - 2); }
+        hàm f(a) { đặt b = a * 2; trả về b; }
+        đặt x = fib(10) + f(1) + f(2);
+        """
+        statements = Parser(Scanner(source).tokens).parse()
+        resolve(statements)
+        interpreter = Interpreter()
+        interpreter.interpret(statements)
+
+        self.assertEqual(interpreter.globals.cells["x"].value, 61.0)
+        fib, f = (interpreter.globals.cells[name].value for name in ("fib", "f"))
+        # one frame per level of recursion, reset once released
+        self.assertEqual(len(fib.free_frames), 10)
+        self.assertEqual(len(f.free_frames), 1)
+        self.assertEqual(f.free_frames[0].values, [None, None])
+
+    def test_global_caches(self):
+        source = """
+        hàm a() { trả về 1; }
+        hàm b() { trả về 2; }
+        đặt f = a;
+        đặt x = 0;
+        đặt i = 0;
+        trong khi (i < 4) {
+            x = x * 10 + f();
+            nếu (i == 1) f = b;
+            i = i + 1;
+        }
+        """
+        statements = Parser(Scanner(source).tokens).parse()
+        resolve(statements)
+
+        for _ in range(2):
+            # a second run has other cells, the caches of the first don't apply
+            interpreter = Interpreter()
+            interpreter.interpret(statements)
+            self.assertEqual(interpreter.globals.cells["x"].value, 1122.0)
+
+    def test_counted_loops(self):
+        source = """
+        đặt s = 0;
+        đặt n = 3;
+        lặp (đặt i = 0; i < 4; i = i + 1) s = s * 10 + i;
+        lặp (đặt i = 0; i < n; i = i + 1) { n = 2; s = s + 1; }
+        lặp (đặt i khoảng(4, 0, -2)) s = s * 10 + i;
+        """
+        statements = Parser(Scanner(source).tokens).parse()
+        resolve(statements)
+        interpreter = Interpreter()
+        interpreter.interpret(statements)
+
+        # a bound that changes makes the loop generic
+        self.assertEqual((statements[2].step, statements[3].step), (1.0, None))
+        self.assertEqual(interpreter.globals.cells["s"].value, 12542.0)
+
+    def test_captured_bound(self):
+        # a function declared after the loop changes its bound
+        source = """
+        đặt s = 0;
+        hàm outer() {
+            đặt n = 5;
+            đặt g = nil;
+            lặp (đặt r = 0; r < 2; r = r + 1) {
+                lặp (đặt i = 0; i < n; i = i + 1) { nếu (g != nil) g(); s = s + 1; }
+                hàm h() { n = 2; }
+                g = h;
+            }
+        }
+        outer();
+        """
+        statements = Parser(Scanner(source).tokens).parse()
+        resolve(statements)
+        interpreter = Interpreter()
+        interpreter.interpret(statements)
+
+        loop = statements[1].body[2].body.statements[0]
+        self.assertIsNone(loop.step)
+        self.assertEqual(interpreter.globals.cells["s"].value, 7.0)
+
+    def test_break_continue(self):
+        source = """
+        đặt s = 0;
+        lặp (đặt i = 0; i < 10; i = i + 1) {
+            nếu (i == 1) tiếp;
+            nếu (i == 4) dừng;
+            s = s * 10 + i;
+        }
+        đặt j = 0;
+        trong khi (đúng) {
+            j = j + 1;
+            lặp (đặt k khoảng(0, 9)) { nếu (k == 1) dừng; s = s * 10 + 7; }
+            nếu (j == 2) dừng;
+        }
+        """
+        statements = Parser(Scanner(source).tokens).parse()
+        resolve(statements)
+        interpreter = Interpreter()
+        interpreter.interpret(statements)
+
+        # the counted loop stops natively, the inner one ends its round only
+        self.assertEqual(statements[1].step, 1.0)
+        self.assertEqual(interpreter.globals.cells["s"].value, 2377.0)
+        self.assertEqual(interpreter.globals.cells["j"].value, 2.0)
+
+    def test_return(self):
+        source = """
+        hàm sum(n, acc) { nếu (n == 0) trả về acc; trả về sum(n - 1, acc + n); }
+        hàm find(n) {
+            lặp (đặt i = 0; i < 10; i = i + 1) { nếu (i == n) trả về i * 2; }
+        }
+        đặt s = sum(20000, 0);
+        đặt a = find(3);
+        đặt b = find(20);
+        trả về sum(1, 1);
+        đặt c = 1;
+        """
+        statements = Parser(Scanner(source).tokens).parse()
+        resolve(statements)
+        interpreter = Interpreter()
+        interpreter.interpret(statements)
+
+        # tail calls deeper than the Python stack, returns out of loops, and
+        # a return ending the script
+        self.assertEqual(interpreter.globals.cells["s"].value, 200010000.0)
+        self.assertEqual(interpreter.globals.cells["a"].value, 6.0)
+        self.assertIsNone(interpreter.globals.cells["b"].value)
+        self.assertNotIn("c", interpreter.globals.cells)
+
+    def test_specialization(self):
+        source = """
+        hàm add(a, b) { trả về a + b; }
+        đặt s = 0;
+        đặt t = "";
+        lặp (đặt i = 0; i < 20; i = i + 1) { s = add(s, i); t = t + "x"; }
+        đặt u = add("a", "b");
+        """
+        statements = Parser(Scanner(source).tokens).parse()
+        resolve(statements)
+        interpreter = Interpreter()
+        interpreter.interpret(statements)
+
+        cells = interpreter.globals.cells
+        self.assertEqual((cells["s"].value, cells["u"].value), (190.0, "ab"))
+        self.assertEqual(cells["t"].value, "x" * 20)
+
+        # specialized for what they saw, the sum back to generic once it saw
+        # strings
+        body = statements[3].body.statements
+        call, concat = body[0].expr.value, body[1].expr.value
+        self.assertIs(type(call), DirectCallExpr)
+        self.assertIs(type(call.arguments[1]), LocalVariableExpr)
+        self.assertIs(type(concat), StringBinaryExpr)
+        add = statements[0].body[0].value
+        self.assertIs(type(add), BinaryExpr)
+        self.assertLess(add.counter, 0)
+
+        function = cells["add"].value
+        for _ in range(backoff + warmup):
+            function.call(interpreter, [1.0, 2.0])
+        self.assertIs(type(add), FloatBinaryExpr)
@@ -0,0 +1,86 @@
+import contextlib
+import io
+import unittest
+from hi_em.hi_em import HiEm
+from hi_em.scanner.scanner import Scanner
+from hi_em.parser.parser import Parser
+from hi_em.parser.node_kind import NodeKind
+from hi_em.optimizer import optimize
+
+
+def run(source: str, level: int) -> list[str]:
+    HiEm.had_error = HiEm.had_runtime_error = False
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        HiEm.run(source, level=level)
+    return output.getvalue().splitlines()
+
+
+class OptimizerTest(unittest.TestCase):
+    def test_folding(self):
+        source = 'in (1 + 2) * 3; in "a" + "b"; in sai hoặc "c"; in 1 / 0 == 1;'
+        statements = optimize(Parser(Scanner(source).tokens).parse())
+
+        self.assertEqual(
+            [statement.expr.literal for statement in statements[:3]],
+            [9.0, "ab", "c"],
+        )
+        # errors are left to be raised at runtime
+        self.assertEqual(statements[3].expr.left.kind, NodeKind.BINARY)
+
+    def test_dead_code(self):
+        source = """
+        nếu (đúng) in 1; còn không in 2;
+        trong khi (sai) in 3;
+        hàm f() { trả về 4; in 5; }
+        """
+        statements = optimize(Parser(Scanner(source).tokens).parse())
+
+        self.assertEqual(len(statements), 2)
+        self.assertEqual(statements[0].expr.literal, 1.0)
+        self.assertEqual(len(statements[1].body), 1)
+
+    def test_invariants(self):
+        source = """
+        đặt a = 2; đặt i = 0; đặt s = 0;
+        trong khi (i < a * 2) { s = s + a * a; i = i + 1; }
+        in s;
+        đặt b = "x";
+        trong khi (i > 0) { in i; nếu (i < 4) in -b; i = i - 1; }
+        """
+        statements = optimize(Parser(Scanner(source).tokens).parse(), 2)
+        self.assertEqual(len(statements[3].invariants), 2)
+
+        # hoisted values are computed on first use, errors happen in order
+        output = ["16.0", "4.0", "3.0", "Operand must be a number."]
+        self.assertEqual(run(source, 2)[:4], output)
+        self.assertEqual(run(source, 0)[:4], output)
+
+    def test_inlining(self):
+        source = """
+        in sq(1);
+        hàm sq(x) { trả về x * x; }
+        hàm add(a, b) { trả về a + b; }
+        hàm fact(n) { nếu (n < 2) trả về 1; trả về n * fact(n - 1); }
+        hàm twice(f) { trả về f; }
+        twice = nil;
+        { đặt a = 10; đặt x = 3; in add(sq(a), x); }
+        in twice;
+        """
+        statements = optimize(Parser(Scanner(source).tokens).parse(), 2)
+
+        # not before the declaration, nor when assigned
+        self.assertEqual(statements[0].expr.kind, NodeKind.CALL)
+        inlined = statements[6].statements[2].expr
+        self.assertEqual(inlined.kind, NodeKind.INLINE)
+        self.assertEqual(inlined.function.name.lexeme, "add")
+        self.assertEqual(inlined.arguments[0].kind, NodeKind.INLINE)
+
+        source = source.replace("in sq(1);", "")
+        self.assertEqual(run(source, 2), run(source, 0))
+        self.assertEqual(run(source, 2), ["103.0", "None"])
+
+        # a range variable of the same name is another binding
+        source = "hàm f(a) { trả về a + 1; }\nlặp (đặt f khoảng(0, 2)) in f(1);"
+        statements = optimize(Parser(Scanner(source).tokens).parse(), 2)
+        self.assertEqual(statements[1].body.expr.kind, NodeKind.CALL)
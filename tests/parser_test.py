@@ -1,7 +1,13 @@
 import unittest
 from hi_em.scanner.scanner import Scanner
+from hi_em.scanner.stream import TokenStream
 from hi_em.parser.parser import Parser
+from hi_em.parser.incremental import IncrementalParser
+from hi_em.parser.arena import Arena
+from hi_em.parser.hashcons import hash_cons
 from hi_em.parser.ast_printer import ASTPrinter
+from hi_em.resolver import resolve
+from hi_em.interpreter import Interpreter
 
 
 class ParserTest(unittest.TestCase):
@@ -12,3 +18,104 @@ class ParserTest(unittest.TestCase):
         self.assertEqual(
             ASTPrinter().get_expr(expr), "( SLASH ( group ( PLUS 3.0 2.0 ) ) 4.0 )"
         )
+
+    def test_token_stream(self):
+        source = "đặt a = (3 + 2) / 4; in a;"
+        statements = Parser(TokenStream(iter(Scanner(source).tokens))).parse()
+        self.assertEqual(
+            [repr(statement) for statement in statements],
+            [repr(statement) for statement in Parser(Scanner(source).tokens).parse()],
+        )
+
+    def test_incremental(self):
+        source = "đặt a = 1;\nđặt b = a;\nin 0;\nin a + b + 2;\nin b;"
+        incremental = IncrementalParser(source)
+        before = incremental.statements
+
+        position = source.index("2")
+        after = incremental.edit(position, position + 1, "(3 * 4)\n")
+        source = incremental.source
+
+        self.assertIs(after[0], before[0])
+        self.assertIs(after[4], before[4])
+        self.assertEqual(after[4].expr.name.line, 6)
+        self.assertEqual(
+            [repr(statement) for statement in after],
+            [repr(statement) for statement in Parser(Scanner(source).tokens).parse()],
+        )
+
+    def test_precedence(self):
+        scanner = Scanner("-1 + 2 * (3 - 4) / 5 < 6 == đúng")
+        expr = Parser(scanner.tokens).expression()
+        self.assertEqual(
+            ASTPrinter().get_expr(expr),
+            "( EQUAL_EQUAL ( LESS ( PLUS ( MINUS 1.0 ) ( SLASH ( STAR 2.0 "
+            "( group ( MINUS 3.0 4.0 ) ) ) 5.0 ) ) 6.0 ) True )",
+        )
+
+    def test_arena(self):
+        source = (
+            'hàm f(a) { trả về a * 2; }\nnếu (f(1) > 1) in "lớn"; còn không in nil;'
+        )
+        statements = Parser(Scanner(source).tokens).parse()
+        arena = Arena.encode(statements)
+
+        self.assertEqual(len(arena), 14)  # both 1s are one literal
+        decoded = arena.decode()
+        self.assertIs(
+            decoded[1].condition.right, decoded[1].condition.left.arguments[0]
+        )
+        self.assertEqual(repr(decoded[1]), repr(statements[1]))
+        self.assertEqual(
+            repr(decoded[0].body[0].value), repr(statements[0].body[0].value)
+        )
+
+    def test_arena_run(self):
+        source = """
+        hàm f(n) { đặt s = 0; lặp (đặt i = 0; i < n; i = i + 1) s = s + i; trả về s; }
+        đặt x = 0;
+        trong khi (x < 3) x = x + 1;
+        lặp (đặt i khoảng(0, 3)) x = x + f(i);
+        """
+        statements = Parser(Scanner(source).tokens).parse()
+        decoded = Arena.encode(statements).decode()
+        resolve(decoded)
+        interpreter = Interpreter()
+        interpreter.interpret(decoded)
+
+        self.assertEqual(interpreter.globals.cells["x"].value, 4.0)
+
+    def test_hash_cons(self):
+        source = "in 1 + 2; in (1 + 2) * 3; in 1 / nil; in 1 / nil; in a + 1;"
+        statements = hash_cons(Parser(Scanner(source).tokens).parse())
+
+        one_plus_two = statements[0].expr
+        self.assertIs(statements[1].expr.left.expr, one_plus_two)
+        self.assertIs(statements[4].expr.right, one_plus_two.left)
+        # a runtime error reports its own operator's line
+        self.assertIsNot(statements[2].expr, statements[3].expr)
+        self.assertIs(statements[2].expr.right, statements[3].expr.right)
+
+    def test_deep_nesting(self):
+        depth = 10000
+        source = "in " + "(1 + " * depth + "1" + ")" * depth + ";"
+        statements = hash_cons(Parser(Scanner(source).tokens).parse())
+        decoded = Arena.encode(statements).decode()
+
+        expr = decoded[0].expr
+        for _ in range(depth):
+            self.assertIs(expr.expr.left, decoded[0].expr.expr.left)
+            expr = expr.expr.right
+        self.assertEqual(expr.literal, 1.0)
+
+    def test_lazy_function(self):
+        source = "hàm f(a) { hàm g() { { trả về 1; } } trả về a + 1; }\nin f(1);"
+        statements = hash_cons(Parser(Scanner(source).tokens, lazy=True).parse())
+        function = statements[0]
+
+        self.assertFalse(function.parsed)
+        self.assertEqual(function.tokens[-2].lexeme, "}")
+        self.assertIs(function.body[1].value.right, statements[1].expr.arguments[0])
+        self.assertFalse(function.body[0].parsed)
+        eager = Parser(Scanner(source).tokens).parse()[0]
+        self.assertEqual(repr(function.body[1].value), repr(eager.body[1].value))
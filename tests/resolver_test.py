@@ -0,0 +1,112 @@
+import contextlib
+import io
+import unittest
+from hi_em.hi_em import HiEm
+from hi_em.scanner.scanner import Scanner
+from hi_em.parser.parser import Parser
+from hi_em.resolver import resolve
+
+
+def run(source: str) -> list[str]:
+    HiEm.had_error = HiEm.had_runtime_error = False
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        HiEm.run(source)
+    return output.getvalue().splitlines()
+
+
+class ResolverTest(unittest.TestCase):
+    def test_slots(self):
+        source = "đặt a = 1; { đặt b = a; { đặt a = b; b = a; } }"
+        statements = Parser(Scanner(source).tokens).parse()
+        resolve(statements)
+
+        outer, inner = statements[1], statements[1].statements[1]
+        self.assertEqual(statements[0].slot, -1)
+        self.assertEqual((outer.size, inner.size), (1, 1))
+        self.assertEqual(outer.statements[0].initializer.depth, -1)
+
+        assign = inner.statements[1].expr
+        self.assertEqual((assign.depth, assign.slot), (1, 0))
+        self.assertEqual((assign.value.depth, assign.value.slot), (0, 0))
+
+    def test_scopes(self):
+        source = """
+        đặt a = "toàn cục";
+        hàm fib(n) {
+            nếu (n < 2) trả về n;
+            trả về fib(n - 1) + fib(n - 2);
+        }
+        {
+            in a;
+            đặt a = "khối";
+            đặt a = a + " lại";
+            in a;
+            hàm f(a, b) { đặt c = a + b; { c = c * 2; } trả về c; }
+            in f(1, 2);
+        }
+        in a;
+        in fib(10);
+        """
+        self.assertEqual(
+            run(source), ["toàn cục", "khối lại", "6.0", "toàn cục", "55.0"]
+        )
+
+    def test_scope_elision(self):
+        source = "{ đặt a = 1; trong khi (a < 3) { { a = a + 1; } } in a; }"
+        statements = Parser(Scanner(source).tokens).parse()
+        resolve(statements)
+
+        body = statements[0].statements[1].body
+        self.assertEqual(
+            (statements[0].size, body.size, body.statements[0].size), (1, 0, 0)
+        )
+        assign = body.statements[0].statements[0].expr
+        self.assertEqual((assign.depth, assign.slot), (0, 0))
+        self.assertEqual(run(source), ["3.0"])
+
+    def test_closures(self):
+        source = """
+        hàm counter() {
+            đặt n = 0;
+            hàm inc() { n = n + 1; trả về n; }
+            trả về inc;
+        }
+        đặt c = counter();
+        c();
+        in c();
+        in counter()();
+        {
+            đặt x = "khối";
+            hàm show() { in x; }
+            x = "đổi";
+            show();
+        }
+        hàm adder(a) {
+            hàm add(b) { trả về a + b; }
+            a = a * 10;
+            trả về add;
+        }
+        in adder(2)(3);
+        """
+        self.assertEqual(run(source), ["2.0", "1.0", "đổi", "23.0"])
+
+    def test_captures(self):
+        source = """
+        hàm outer(a, b) {
+            đặt c = 1;
+            hàm mid() { hàm inner() { trả về a + c; } trả về inner; }
+        }
+        """
+        statements = Parser(Scanner(source).tokens).parse()
+        resolve(statements)
+
+        outer = statements[0]
+        mid = outer.body[1]
+        inner = mid.body[0]
+        # only what the bodies use is captured, through every level
+        self.assertEqual((outer.cells, outer.body[0].boxed), ([0], True))
+        self.assertEqual(mid.upvalues, [(True, 0, 0), (True, 0, 2)])
+        self.assertEqual(inner.upvalues, [(False, 0, 0), (False, 0, 1)])
+        use = inner.body[0].value.left
+        self.assertEqual((use.depth, use.slot), (-2, 0))
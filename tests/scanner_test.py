@@ -1,5 +1,9 @@
+import io
 import unittest
 from hi_em.scanner.scanner import Scanner
+from hi_em.scanner.stream import StreamScanner
+from hi_em.scanner.token_buffer import TokenBuffer
+from hi_em.scanner.token_type import TokenType
 
 
 class ScannerTest(unittest.TestCase):
@@ -37,6 +41,17 @@ class ScannerTest(unittest.TestCase):
             "Token(type = /, lexeme = /, literal = None, line = 2)",
         )
 
+    def test_trailing_whitespace(self):
+        from hi_em.hi_em import HiEm
+
+        HiEm.had_error = False
+        scanner = Scanner("/ \n \t ")
+
+        self.assertFalse(HiEm.had_error)
+        self.assertEqual(
+            [token.type for token in scanner.tokens], [TokenType.SLASH, TokenType.EOF]
+        )
+
     def test_string(self):
         scanner = Scanner('"le nguyen"')
 
@@ -75,3 +90,48 @@ class ScannerTest(unittest.TestCase):
             str(scanner.tokens[3]),
             "Token(type = while, lexeme = trong khi, literal = None, line = 1)",
         )
+
+    def test_keyword_prefix(self):
+        scanner = Scanner("còn lại trong khi lớp\ntrả về_x")
+
+        self.assertEqual(
+            [token.type for token in scanner.tokens],
+            [
+                TokenType.IDENTIFIER,
+                TokenType.IDENTIFIER,
+                TokenType.WHILE,
+                TokenType.CLASS,
+                TokenType.IDENTIFIER,
+                TokenType.IDENTIFIER,
+                TokenType.EOF,
+            ],
+        )
+
+        self.assertEqual(
+            str(scanner.tokens[5]),
+            "Token(type = identifier, lexeme = về_x, literal = None, line = 2)",
+        )
+
+    def test_stream(self):
+        source = 'hàm f(x) {\n trả về "a\nb" + 3.14;\n}\nlớp hiện tại còn không'
+
+        for chunk_size in (1, 3, 7, 64):
+            streamed = StreamScanner(io.StringIO(source), chunk_size)
+            self.assertEqual(
+                [str(token) for token in streamed],
+                [str(token) for token in Scanner(source).tokens],
+            )
+
+    def test_token_buffer(self):
+        source = 'đặt tên = "Dưa";\nin tên + 3.14;'
+        buffer = TokenBuffer(source)
+        tokens = Scanner(source).tokens
+
+        self.assertEqual(len(buffer), len(tokens))
+        self.assertEqual(
+            [str(token) for token in buffer], [str(token) for token in tokens]
+        )
+        self.assertIs(buffer[1].lexeme, buffer[6].lexeme)
+        # peeking again doesn't make another view
+        self.assertIs(buffer[2], buffer[2])
+        self.assertIs(buffer[3], buffer[3])
@@ -0,0 +1,166 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from hi_em import cache
+from hi_em.hi_em import HiEm
+from hi_em.scanner.scanner import Scanner
+from hi_em.parser.parser import Parser
+from hi_em.resolver import resolve
+from hi_em.transpiler import transpile, mangle, demangle
+
+
+def run(source: str, level: int, engine: str, lazy: bool = False) -> list[str]:
+    HiEm.had_error = HiEm.had_runtime_error = False
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        HiEm.run(source, lazy=lazy, level=level, engine=engine)
+    return output.getvalue().splitlines()
+
+
+PROGRAMS = [
+    """
+    hàm fib(n) { nếu (n < 2) trả về n; trả về fib(n - 1) + fib(n - 2); }
+    đặt s = 0;
+    lặp (đặt i = 0; i < 10; i = i + 1) { nếu (i == 7) tiếp; s = s + fib(i); }
+    in s;
+    in "a" + "b" != "ab" hoặc !nil;
+    in nil hoặc 0;
+    in 1 và "" và nil;
+    in fib;
+    in đồng_hồ;
+    """,
+    """
+    hàm counter(n) {
+        hàm next() { n = n + 1; trả về n; }
+        trả về next;
+    }
+    đặt c = counter(10);
+    c();
+    in c();
+    đặt fs = nil;
+    lặp (đặt i khoảng(0, 3)) { hàm f() { trả về i; } nếu (i == 1) fs = f; }
+    in fs();
+    lặp (đặt i khoảng(2.5, 0, -1)) in i;
+    """,
+    """
+    đặt x = 0;
+    trong khi (đúng) {
+        x = x + 1;
+        nếu (x < 3) tiếp;
+        lặp (đặt k khoảng(10, 0, -3)) { nếu (k < 5) dừng; in k; }
+        nếu (x >= 4) dừng;
+    }
+    { đặt a = 1; { đặt b = a + 1; a = b * 2; } in a; }
+    """,
+    """
+    hàm sq(x) { trả về x * x; }
+    đặt n = 3;
+    lặp (đặt i = 0; i < 3; i = i + 1) in sq(i) + n * 2;
+    in -n;
+    in 1 + "s";
+    """,
+    """
+    đặt tên_biến = 1;
+    in tên_biến;
+    in chưa_có;
+    """,
+    """
+    lặp (đặt i khoảng(0, 1, 0)) in i;
+    """,
+    """
+    lặp (đặt i = 0; i < 4; i = i + 1) { đặt x = 10; nếu (i == 1) tiếp; in i + x; }
+    hàm f() {
+        lặp (đặt i = 0; i < 3; i = i + 1) { đặt y = i; { đặt z = y; nếu (z == 0) tiếp; in z; } }
+    }
+    f();
+    """,
+]
+
+
+class TranspilerTest(unittest.TestCase):
+    def test_same_output(self):
+        for source in PROGRAMS:
+            for level in range(3):
+                with self.subTest(source=source, level=level):
+                    self.assertEqual(
+                        run(source, level, "python"), run(source, level, "tree")
+                    )
+
+    def test_lazy(self):
+        # bodies are parsed on their first call, a broken one never called
+        # doesn't stop the others
+        broken = "hàm unused() { đặt 1; }\n"
+        for source in PROGRAMS:
+            for level in range(3):
+                with self.subTest(source=source, level=level):
+                    self.assertEqual(
+                        run(broken + source, level, "python", lazy=True),
+                        run(broken + source, level, "tree", lazy=True),
+                    )
+        self.assertEqual(
+            run(broken + "in 1;\nunused();", 0, "python", lazy=True),
+            [
+                "1.0",
+                "[line: 1] Error at 'đặt': Expect variable name.",
+                "Function body has syntax errors.",
+                "[line 1] Error at identifier",
+            ],
+        )
+
+    def test_compiles(self):
+        # none of them is left to the interpreter
+        for source in PROGRAMS:
+            statements = Parser(Scanner(source).tokens).parse()
+            resolve(statements)
+            compile(transpile(statements), "<script>", "exec")
+
+    def test_errors(self):
+        self.assertEqual(
+            run("đặt a = 1;\nin a;\nb = 2;", 0, "python"),
+            ["1.0", "Undefined variable 'b'.", "[line 3] Error at identifier"],
+        )
+        self.assertEqual(
+            run("hàm f(a) { trả về a; } f(1, 2);", 0, "python"),
+            ["Expected 1 arguments but got 2.", "[line 1] Error at )"],
+        )
+        self.assertEqual(
+            run("đặt x = 1; x();", 0, "python"),
+            ["Can only call functions and classes.", "[line 1] Error at )"],
+        )
+        source = "hàm s(n) {\n trả về s(n + 1); }\ns(0);"
+        self.assertEqual(
+            run(source, 0, "python"), ["Stack overflow.", "[line 2] Error at )"]
+        )
+
+    def test_mangle(self):
+        for name in ("a", "đồng_hồ", "_x_", "__1ea1_", "ạb_c"):
+            with self.subTest(name=name):
+                self.assertTrue(mangle(name).isidentifier())
+                self.assertTrue(mangle(name).isascii())
+                self.assertEqual(demangle(mangle(name)), name)
+
+    def test_cache(self):
+        source = "đặt a = 2;\nin a * 3;"
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "script.hiem")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(source)
+
+            HiEm.had_error = HiEm.had_runtime_error = False
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                HiEm.run_file(path, level=1, engine="python")
+            self.assertEqual(output.getvalue(), "6.0\n")
+
+            # cached for this level only, and only for this source
+            self.assertIsNotNone(cache.load_code(path, source, 1))
+            self.assertIsNone(cache.load_code(path, source, 0))
+            self.assertIsNone(cache.load_code(path, source + " ", 1))
+
+    def test_deep_nesting(self):
+        # too deep to transpile, the interpreter runs it
+        depth = 5000
+        source = "in " + "1 + (" * depth + "1" + ")" * depth + ";"
+        self.assertEqual(run(source, 0, "python"), [str(depth + 1.0)])
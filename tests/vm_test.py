@@ -0,0 +1,118 @@
+import contextlib
+import io
+import unittest
+from hi_em.hi_em import HiEm
+from hi_em.scanner.scanner import Scanner
+from hi_em.parser.parser import Parser
+from hi_em.resolver import resolve
+from hi_em.vm.compiler import compile_script
+from hi_em.vm.disassembler import disassemble
+from hi_em.vm.vm import VM
+
+
+def run(source: str, level: int, engine: str) -> list[str]:
+    HiEm.had_error = HiEm.had_runtime_error = False
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        HiEm.run(source, level=level, engine=engine)
+    return output.getvalue().splitlines()
+
+
+def compile_source(source: str):
+    statements = Parser(Scanner(source).tokens).parse()
+    resolve(statements)
+    return statements, compile_script(statements)
+
+
+PROGRAMS = [
+    """
+    hàm fib(n) { nếu (n < 2) trả về n; trả về fib(n - 1) + fib(n - 2); }
+    đặt s = 0;
+    lặp (đặt i = 0; i < 10; i = i + 1) { nếu (i == 7) tiếp; s = s + fib(i); }
+    in s;
+    in "a" + "b" != "ab" hoặc !nil;
+    """,
+    """
+    hàm counter(n) {
+        hàm next() { n = n + 1; trả về n; }
+        trả về next;
+    }
+    đặt c = counter(10);
+    c();
+    in c();
+    đặt fs = nil;
+    lặp (đặt i khoảng(0, 3)) { hàm f() { trả về i; } nếu (i == 1) fs = f; }
+    in fs();
+    in fs;
+    """,
+    """
+    đặt x = 0;
+    trong khi (đúng) {
+        x = x + 1;
+        nếu (x < 3) tiếp;
+        lặp (đặt k khoảng(10, 0, -3)) { nếu (k < 5) dừng; in k; }
+        nếu (x >= 4) dừng;
+    }
+    { đặt a = 1; { đặt b = a + 1; a = b * 2; } in a; }
+    """,
+    """
+    hàm sq(x) { trả về x * x; }
+    đặt n = 3;
+    lặp (đặt i = 0; i < 3; i = i + 1) in sq(i) + n * 2;
+    in 1 + "s";
+    """,
+    """
+    lặp (đặt i khoảng(0, 1, 0)) in i;
+    """,
+]
+
+
+class VMTest(unittest.TestCase):
+    def test_same_output(self):
+        for source in PROGRAMS:
+            for level in range(3):
+                with self.subTest(source=source, level=level):
+                    self.assertEqual(
+                        run(source, level, "vm"), run(source, level, "tree")
+                    )
+
+    def test_calls(self):
+        source = "hàm f(a) { trả về a; } f(1, 2);"
+        self.assertEqual(
+            run(source, 0, "vm"),
+            ["Expected 1 arguments but got 2.", "[line 1] Error at )"],
+        )
+        self.assertEqual(
+            run("đặt x = 1; x();", 0, "vm"),
+            ["Can only call functions and classes.", "[line 1] Error at )"],
+        )
+
+    def test_disassemble(self):
+        _, script = compile_source("hàm f(a) { trả về a + 1; }\nin f(2);")
+        listing = disassemble(script).splitlines()
+
+        self.assertEqual(listing[0], "== script ==")
+        self.assertEqual(listing[1], "0000    1 CLOSURE           0 0 '<Fn(f)>'")
+        self.assertIn("0005    2 GET_GLOBAL        1 'f'", listing)
+        self.assertIn("== f ==", listing)
+        self.assertIn("0002    | CONSTANT          0 '1.0'", listing)
+        self.assertIn("0004    | ADD", listing)
+
+    def test_deep_nesting(self):
+        depth = 5000
+        source = "đặt x = " + "1 + (" * depth + "1" + ")" * depth + ";"
+        statements, _ = compile_source(source)
+        vm = VM()
+        vm.interpret(statements)
+
+        self.assertEqual(vm.globals.cells["x"].value, depth + 1.0)
+
+    def test_large_script(self):
+        # the loop jumps back past the first 65536 words
+        source = "đặt x = 0;\n" + "x = x + 1;\n" * 9000
+        source += "lặp (đặt i = 0; i < 3; i = i + 1) x = x + i;"
+        statements, _ = compile_source(source)
+        vm = VM()
+        vm.interpret(statements)
+
+        self.assertEqual(vm.globals.cells["x"].value, 9003.0)